@@ -0,0 +1,18 @@
+# This file is part of pymarc. It is subject to the license terms in the
+# LICENSE file found in the top-level directory of this distribution and at
+# https://opensource.org/licenses/BSD-2-Clause. pymarc may be copied, modified,
+# propagated, or distributed according to the terms contained in the LICENSE
+# file.
+
+"""Performance benchmarks of pymarc.
+
+:mod:`benchmarks.corpora` builds the record files the benchmarks run on, the
+files bundled with the tests and synthetic ones of any size,
+:mod:`benchmarks.run` times the main code paths on them and stores the results
+as JSON. Run from the top of the repository:
+
+.. code-block:: console
+
+    $ python -m benchmarks.run --records 5000 --output before.json
+    $ python -m benchmarks.run --records 5000 --compare before.json
+"""
@@ -0,0 +1,87 @@
+# This file is part of pymarc. It is subject to the license terms in the
+# LICENSE file found in the top-level directory of this distribution and at
+# https://opensource.org/licenses/BSD-2-Clause. pymarc may be copied, modified,
+# propagated, or distributed according to the terms contained in the LICENSE
+# file.
+
+"""Compare a column of a RecordBatch to the same values read from records.
+
+The synthetic UTF-8 corpus is read whole, then the values of the subfields
+``650 $a`` are collected:
+
+* ``records``: from the records of a ``MARCReader``.
+* ``read_batches``: with ``get_subfields`` on the batches of ``read_batches``.
+* ``filter``: the same, keeping the records with a ``020`` first.
+
+Each path reports its records per second and the peak memory of one run, with
+the records or batches held until the end of the run.
+
+.. code-block:: console
+
+    $ python -m benchmarks.batch --records 5000
+"""
+
+import argparse
+
+from pymarc import MARCReader
+from pymarc.batch import read_batches
+
+from benchmarks.corpora import _marc, utf8_records
+from benchmarks.run import measure
+
+
+def _records(data):
+    records = list(MARCReader(data))
+    return records, [
+        [
+            value
+            for field in record.get_fields("650")
+            for value in field.get_subfields("a")
+        ]
+        for record in records
+    ]
+
+
+def _batches(data, size):
+    batches = list(read_batches(data, size))
+    return batches, [batch.get_subfields("650", "a") for batch in batches]
+
+
+def _filter(data, size):
+    batches = list(read_batches(data, size))
+    return batches, [
+        batch.filter(batch.has_tag("020")).get_subfields("650", "a")
+        for batch in batches
+    ]
+
+
+def paths(data, size):
+    """Return the (name, path) to time."""
+    return [
+        ("records", lambda: _records(data)),
+        ("read_batches", lambda: _batches(data, size)),
+        ("filter", lambda: _filter(data, size)),
+    ]
+
+
+def main(argv=None):
+    """Run the comparison from the command line."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--records", type=int, default=2000, help="records to read")
+    parser.add_argument("--size", type=int, default=1000, help="records per batch")
+    parser.add_argument("--seed", type=int, default=0, help="synthetic records seed")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per path")
+    args = parser.parse_args(argv)
+
+    data = _marc(utf8_records(args.records, args.seed))
+    print("%-14s %7s %12s %9s" % ("path", "records", "records/s", "peak MiB"))
+    for name, path in paths(data, args.size):
+        seconds, peak = measure(path, args.repeat)
+        print(
+            "%-14s %7d %12.0f %9.1f"
+            % (name, args.records, args.records / seconds, peak / 1024**2)
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,278 @@
+# This file is part of pymarc. It is subject to the license terms in the
+# LICENSE file found in the top-level directory of this distribution and at
+# https://opensource.org/licenses/BSD-2-Clause. pymarc may be copied, modified,
+# propagated, or distributed according to the terms contained in the LICENSE
+# file.
+
+"""Record corpora for the benchmarks.
+
+A :class:`Corpus` is a named file content in one of the formats pymarc reads.
+The bundled corpora are test files, the synthetic ones are generated from a
+seed so that two runs, or two machines, time the same records:
+
+* ``utf8``: bibliographic records in UTF-8 with Latin, Cyrillic and CJK text.
+* ``marc8-cjk``: the same kind of records in MARC-8, with ANSEL diacritics and
+  EACC (CJK) escape sequences.
+* ``huge``: records of about 600 fields, 70000 bytes.
+* ``utf8.xml`` and ``utf8.json``: the ``utf8`` records as MARCXML and JSON.
+"""
+
+from collections import namedtuple
+from io import BytesIO, StringIO
+import os
+import random
+
+from pymarc import JSONWriter, XMLWriter
+from pymarc.constants import END_OF_FIELD, END_OF_RECORD, LEADER_LEN
+from pymarc.field import Field
+from pymarc.marc8_mapping import CODESETS
+from pymarc.record import Record
+
+Corpus = namedtuple("Corpus", ["name", "format", "data"])
+
+TEST_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "test"
+)
+
+BUNDLED = (
+    ("marc.dat", "marc"),
+    ("marc8.dat", "marc"),
+    ("batch.xml", "xml"),
+    ("batch.json", "json"),
+)
+
+ASCII_WORDS = (
+    "the library of congress catalog record history of science and art "
+    "notes on bibliographic control introduction to cataloging practice"
+).split()
+
+WORDS = (
+    ASCII_WORDS
+    + "café naïve façade über Zürich Ελληνικά русский язык 中文 日本語 한국어".split()
+)
+
+# MARC-8: ANSEL acute, grave and umlaut precede the letter they modify
+ANSEL_WORDS = [b"caf\xe2e", b"na\xe8ive", b"\xe1a la carte", b"M\xe8unchen"]
+
+# MARC-8: EACC characters, selected with ESC $ 1 and back to ASCII with ESC ( B
+EACC = sorted(CODESETS[0x31])
+EACC_START = b"\x1b$1"
+EACC_END = b"\x1b(B"
+
+END_OF_FIELD_BYTES = END_OF_FIELD.encode("ascii")
+END_OF_RECORD_BYTES = END_OF_RECORD.encode("ascii")
+
+SUBJECTS = ("650", "651", "600", "610")
+
+
+def _words(rng, low, high):
+    return " ".join(rng.choice(WORDS) for _ in range(rng.randint(low, high)))
+
+
+def _marc8_words(rng, low, high):
+    words = []
+    for _ in range(rng.randint(low, high)):
+        roll = rng.random()
+        if roll < 0.15:
+            words.append(rng.choice(ANSEL_WORDS))
+        elif roll < 0.3:
+            chars = [rng.choice(EACC) for _ in range(rng.randint(2, 6))]
+            words.append(
+                EACC_START + b"".join(c.to_bytes(3, "big") for c in chars) + EACC_END
+            )
+        else:
+            words.append(rng.choice(ASCII_WORDS).encode("ascii"))
+    return b" ".join(words)
+
+
+def _control_fields(rng, number):
+    return [
+        Field(tag="001", data="bench%09d" % number),
+        Field(tag="005", data="20201019%06d.0" % rng.randint(0, 235959)),
+        Field(
+            tag="008",
+            data="201019s%04d    nyu           000 0 eng d" % rng.randint(1900, 2020),
+        ),
+    ]
+
+
+def utf8_records(count, seed=0, subjects=(1, 6), notes=(0, 4)):
+    """Yield `count` synthetic UTF-8 records."""
+    rng = random.Random(seed)
+    for number in range(count):
+        record = Record(force_utf8=True)
+        record.leader[5:8] = "nam"
+        for field in _control_fields(rng, number):
+            record.add_field(field)
+        record.add_field(
+            Field("020", [" ", " "], ["a", "%010d" % rng.randint(0, 9999999999)])
+        )
+        record.add_field(Field("100", ["1", " "], ["a", _words(rng, 2, 3) + ","]))
+        record.add_field(
+            Field(
+                "245",
+                ["1", "0"],
+                [
+                    "a",
+                    _words(rng, 3, 10) + " :",
+                    "b",
+                    _words(rng, 2, 8) + " /",
+                    "c",
+                    _words(rng, 2, 4),
+                ],
+            )
+        )
+        record.add_field(
+            Field(
+                "260",
+                [" ", " "],
+                [
+                    "a",
+                    _words(rng, 1, 2) + " :",
+                    "b",
+                    _words(rng, 1, 3) + ",",
+                    "c",
+                    "%d." % rng.randint(1900, 2020),
+                ],
+            )
+        )
+        record.add_field(
+            Field(
+                "300",
+                [" ", " "],
+                ["a", "%d p. ;" % rng.randint(10, 900), "c", "24 cm."],
+            )
+        )
+        for _ in range(rng.randint(*notes)):
+            record.add_field(Field("500", [" ", " "], ["a", _words(rng, 5, 40) + "."]))
+        for _ in range(rng.randint(*subjects)):
+            record.add_field(
+                Field(
+                    rng.choice(SUBJECTS),
+                    [" ", "0"],
+                    ["a", _words(rng, 1, 3), "x", _words(rng, 1, 2) + "."],
+                )
+            )
+        yield record
+
+
+def _transmission(leader, fields):
+    """Return ISO 2709 bytes from a leader and (tag, data) bytes fields."""
+    directory = []
+    data = []
+    offset = 0
+    for tag, field in fields:
+        field += END_OF_FIELD_BYTES
+        directory.append(b"%s%04d%05d" % (tag, len(field), offset))
+        data.append(field)
+        offset += len(field)
+    directory = b"".join(directory) + END_OF_FIELD_BYTES
+    data = b"".join(data) + END_OF_RECORD_BYTES
+    base_address = LEADER_LEN + len(directory)
+    return (
+        b"%05d%s%05d%s"
+        % (base_address + len(data), leader[5:12], base_address, leader[17:])
+        + directory
+        + data
+    )
+
+
+def _subfields(indicators, *subfields):
+    return indicators + b"".join(b"\x1f" + subfield for subfield in subfields)
+
+
+def marc8_cjk_records(count, seed=0):
+    """Yield `count` synthetic MARC-8 records with diacritics and CJK text.
+
+    The records are yielded in transmission format, pymarc can't write MARC-8.
+    """
+    rng = random.Random(seed)
+    for number in range(count):
+        fields = [
+            (field.tag.encode("ascii"), field.data.encode("ascii"))
+            for field in _control_fields(rng, number)
+        ]
+        fields.append(
+            (b"100", _subfields(b"1 ", b"a" + _marc8_words(rng, 2, 3) + b","))
+        )
+        fields.append(
+            (
+                b"245",
+                _subfields(
+                    b"10",
+                    b"a" + _marc8_words(rng, 3, 10) + b" :",
+                    b"b" + _marc8_words(rng, 2, 8) + b" /",
+                ),
+            )
+        )
+        fields.append(
+            (
+                b"260",
+                _subfields(b"  ", b"a" + _marc8_words(rng, 1, 2) + b" :", b"c1999."),
+            )
+        )
+        for _ in range(rng.randint(0, 4)):
+            fields.append(
+                (b"500", _subfields(b"  ", b"a" + _marc8_words(rng, 5, 40) + b"."))
+            )
+        for _ in range(rng.randint(1, 6)):
+            fields.append(
+                (b"650", _subfields(b" 0", b"a" + _marc8_words(rng, 1, 3) + b"."))
+            )
+        yield _transmission(b"00000nam  2200000   4500", fields)
+
+
+def huge_records(count, seed=0):
+    """Yield `count` synthetic UTF-8 records of about 70000 bytes each."""
+    return utf8_records(count, seed, subjects=(300, 300), notes=(300, 300))
+
+
+def _marc(records):
+    return b"".join(record.as_marc() for record in records)
+
+
+def _xml(records):
+    out = BytesIO()
+    writer = XMLWriter(out)
+    for record in records:
+        writer.write(record)
+    writer.close(close_fh=False)
+    return out.getvalue()
+
+
+def _json(records):
+    out = StringIO()
+    writer = JSONWriter(out)
+    for record in records:
+        writer.write(record)
+    writer.close(close_fh=False)
+    return out.getvalue().encode("utf-8")
+
+
+def bundled():
+    """Return the corpora of the files bundled with the tests."""
+    corpora = []
+    for name, format in BUNDLED:
+        with open(os.path.join(TEST_DIR, name), "rb") as fh:
+            corpora.append(Corpus(name, format, fh.read()))
+    return corpora
+
+
+def synthetic(records, seed=0):
+    """Return the synthetic corpora, with `records` records each.
+
+    The ``huge`` corpus has a hundred times fewer records, but at least one.
+    """
+    utf8 = list(utf8_records(records, seed))
+    return [
+        Corpus("utf8", "marc", _marc(utf8)),
+        Corpus("marc8-cjk", "marc", b"".join(marc8_cjk_records(records, seed))),
+        Corpus("huge", "marc", _marc(huge_records(max(1, records // 100), seed))),
+        Corpus("utf8.xml", "xml", _xml(utf8)),
+        Corpus("utf8.json", "json", _json(utf8)),
+    ]
+
+
+def corpora(records, seed=0):
+    """Return all the corpora, bundled then synthetic."""
+    return bundled() + synthetic(records, seed)
@@ -0,0 +1,68 @@
+# This file is part of pymarc. It is subject to the license terms in the
+# LICENSE file found in the top-level directory of this distribution and at
+# https://opensource.org/licenses/BSD-2-Clause. pymarc may be copied, modified,
+# propagated, or distributed according to the terms contained in the LICENSE
+# file.
+
+"""Time the serialization of records as MARC-in-JSON, in records per second.
+
+The records of ``test/batch.json``, repeated ``--scale`` times, are
+serialized by:
+
+* ``dumps(as_dict)``: ``json.dumps(record.as_dict())``, for reference.
+* ``as_json``: the text written directly from the fields.
+* ``JSONWriter``: a writer escaping the characters that are not ASCII.
+* ``JSONWriter utf8``: a writer with ``ensure_ascii=False``.
+
+.. code-block:: console
+
+    $ python -m benchmarks.json_text --scale 1000
+"""
+
+import argparse
+from io import StringIO
+import json
+import os
+
+from pymarc import JSONReader, JSONWriter
+
+from benchmarks.corpora import TEST_DIR
+from benchmarks.run import measure
+
+
+def _write(records, ensure_ascii):
+    writer = JSONWriter(StringIO(), ensure_ascii=ensure_ascii)
+    for record in records:
+        writer.write(record)
+    writer.close(close_fh=False)
+
+
+def paths(records):
+    """Return the (name, path) to time."""
+    return [
+        ("dumps(as_dict)", lambda: [json.dumps(r.as_dict()) for r in records]),
+        ("as_json", lambda: [r.as_json() for r in records]),
+        ("JSONWriter", lambda: _write(records, True)),
+        ("JSONWriter utf8", lambda: _write(records, False)),
+    ]
+
+
+def main(argv=None):
+    """Run the benchmark from the command line."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--scale", type=int, default=500, help="times the records are repeated"
+    )
+    parser.add_argument("--repeat", type=int, default=3, help="runs per path")
+    args = parser.parse_args(argv)
+
+    with open(os.path.join(TEST_DIR, "batch.json")) as fh:
+        records = list(JSONReader(fh)) * args.scale
+    print("%-16s %7s %12s" % ("path", "records", "records/s"))
+    for name, path in paths(records):
+        seconds, _ = measure(path, args.repeat, memory=False)
+        print("%-16s %7d %12.0f" % (name, len(records), len(records) / seconds))
+
+
+if __name__ == "__main__":
+    main()
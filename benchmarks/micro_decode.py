@@ -0,0 +1,102 @@
+# This file is part of pymarc. It is subject to the license terms in the
+# LICENSE file found in the top-level directory of this distribution and at
+# https://opensource.org/licenses/BSD-2-Clause. pymarc may be copied, modified,
+# propagated, or distributed according to the terms contained in the LICENSE
+# file.
+
+"""Micro-benchmarks of the steps of Record.decode_marc.
+
+Each step is timed on its bulk path, used by decode_marc, and on the entry by
+entry or subfield by subfield path it falls back to for malformed data. Run
+from the top of the repository:
+
+.. code-block:: console
+
+    $ python benchmarks/micro_decode.py
+    $ python benchmarks/micro_decode.py --number 50 test/utf8_with_leader_flag.dat
+"""
+
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pymarc.constants import LEADER_LEN  # noqa: E402
+from pymarc.reader import iter_marc_chunks  # noqa: E402
+from pymarc.record import (  # noqa: E402
+    SUBFIELD_INDICATOR_BYTES,
+    Record,
+    _Marc8Decoder,
+    _parse_directory,
+    _parse_directory_entries,
+    _RawDecoder,
+    _Utf8Decoder,
+)
+
+DEFAULT_FILES = ("test/marc.dat", "test/utf8_with_leader_flag.dat")
+
+
+def load(path):
+    """Return the directories and data field bodies of the records of `path`."""
+    with open(path, "rb") as fh:
+        chunks = list(iter_marc_chunks(fh))
+    directories = []
+    bodies = []
+    for chunk in chunks:
+        base_address = int(chunk[12:17])
+        directory = chunk[LEADER_LEN : base_address - 1].decode("ascii")
+        directories.append(directory)
+        for tag, length, offset in _parse_directory(directory):
+            if tag < "010" and tag.isdigit():
+                continue
+            data = chunk[base_address + offset : base_address + offset + length - 1]
+            # the field data after the indicators
+            bodies.append(data[data.find(SUBFIELD_INDICATOR_BYTES) :])
+    return chunks, directories, bodies
+
+
+def benchmarks(path):
+    """Return the (name, callable) of the benchmarks of the file `path`."""
+    chunks, directories, bodies = load(path)
+    utf8 = chunks[0][9:10] == b"a"
+    decoder = _Utf8Decoder("utf-8") if utf8 else _Marc8Decoder("iso8859-1", True)
+    raw = _RawDecoder()
+
+    def run(function, items):
+        return lambda: [function(item) for item in items]
+
+    return [
+        ("directory, bulk", run(_parse_directory, directories)),
+        ("directory, by entry", run(_parse_directory_entries, directories)),
+        ("subfields, bulk", run(decoder.subfields, bodies)),
+        ("subfields, one by one", run(decoder.split_subfields, bodies)),
+        ("raw subfields, bulk", run(raw.subfields, bodies)),
+        ("raw subfields, one by one", run(raw.split_subfields, bodies)),
+        (
+            "decode_marc",
+            run(lambda chunk: Record(chunk, hide_utf8_warnings=True), chunks),
+        ),
+    ], len(chunks)
+
+
+def main(argv=None):
+    """Run the benchmarks and print the best time of each."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("files", nargs="*", default=DEFAULT_FILES)
+    parser.add_argument("--number", type=int, default=20, help="runs per timing")
+    parser.add_argument("--repeat", type=int, default=5, help="timings per step")
+    args = parser.parse_args(argv)
+
+    for path in args.files:
+        steps, count = benchmarks(path)
+        print("%s (%d records)" % (path, count))
+        for name, function in steps:
+            best = min(timeit.repeat(function, number=args.number, repeat=args.repeat))
+            per_record = best / args.number / count * 1e6
+            print("  %-28s %8.2f us/record" % (name, per_record))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+# This file is part of pymarc. It is subject to the license terms in the
+# LICENSE file found in the top-level directory of this distribution and at
+# https://opensource.org/licenses/BSD-2-Clause. pymarc may be copied, modified,
+# propagated, or distributed according to the terms contained in the LICENSE
+# file.
+
+"""Micro-benchmarks of the construction of fields, in fields per second.
+
+The fields of the records of a file are built again from their values with
+``Field()``, which normalizes its arguments, and with ``_new_field``, the
+constructor of the readers which trusts them; ``is_control_field`` is timed on
+the fields built. Run from the top of the repository:
+
+.. code-block:: console
+
+    $ python benchmarks/micro_fields.py
+    $ python benchmarks/micro_fields.py --number 50 test/utf8_with_leader_flag.dat
+"""
+
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pymarc.field import Field, _new_field  # noqa: E402
+from pymarc.reader import MARCReader  # noqa: E402
+
+DEFAULT_FILES = ("test/marc.dat", "test/utf8_with_leader_flag.dat")
+
+
+def load(path):
+    """Return the fields of the records of `path`."""
+    with open(path, "rb") as fh:
+        return [
+            field
+            for record in MARCReader(fh, hide_utf8_warnings=True)
+            for field in record.fields
+        ]
+
+
+def benchmarks(path):
+    """Return the (name, callable) of the benchmarks of the file `path`."""
+    fields = load(path)
+    control = [(f.tag, f.data) for f in fields if f.is_control_field()]
+    data = [
+        (f.tag, f.indicators, f.subfields) for f in fields if not f.is_control_field()
+    ]
+    integer = [(int(tag), indicators, subfields) for tag, indicators, subfields in data]
+
+    def build(function):
+        return lambda: (
+            [function(tag, data=value) for tag, value in control],
+            [function(*values) for values in data],
+        )
+
+    return [
+        ("Field()", build(Field)),
+        ("Field(), integer tags", lambda: [Field(*values) for values in integer]),
+        ("_new_field", build(_new_field)),
+        ("is_control_field", lambda: [field.is_control_field() for field in fields]),
+    ], len(fields)
+
+
+def main(argv=None):
+    """Run the benchmarks and print the best rate of each."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("files", nargs="*", default=DEFAULT_FILES)
+    parser.add_argument("--number", type=int, default=50, help="runs per timing")
+    parser.add_argument("--repeat", type=int, default=5, help="timings per step")
+    args = parser.parse_args(argv)
+
+    for path in args.files:
+        steps, count = benchmarks(path)
+        print("%s (%d fields)" % (path, count))
+        for name, function in steps:
+            best = min(timeit.repeat(function, number=args.number, repeat=args.repeat))
+            print("  %-24s %12.0f fields/s" % (name, args.number * count / best))
+
+
+if __name__ == "__main__":
+    main()
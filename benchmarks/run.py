@@ -0,0 +1,259 @@
+# This file is part of pymarc. It is subject to the license terms in the
+# LICENSE file found in the top-level directory of this distribution and at
+# https://opensource.org/licenses/BSD-2-Clause. pymarc may be copied, modified,
+# propagated, or distributed according to the terms contained in the LICENSE
+# file.
+
+"""Time the main code paths of pymarc on the benchmark corpora.
+
+For each corpus the records are decoded (``decode_marc``, ``parse_xml`` and
+``parse_xml_parallel`` or ``json_reader`` depending on its format), then
+encoded again with
+``as_marc``, ``record_to_xml`` and ``as_json``; MARC-8 corpora also time
+``marc8_to_unicode`` on the values of their subfields. Each path reports its
+records per second, best of ``--repeat`` runs, and the peak memory allocated
+during one run, measured separately with :mod:`tracemalloc`.
+
+.. code-block:: console
+
+    $ python -m benchmarks.run --records 2000 --output before.json
+    $ python -m benchmarks.run --records 2000 --compare before.json
+    $ python -m benchmarks.run --corpus utf8 --path decode_marc --repeat 10
+"""
+
+import argparse
+import datetime
+from io import BytesIO, StringIO
+import json
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+import warnings
+
+from pymarc import JSONReader, Record, marc8_to_unicode, parse_xml_to_array
+from pymarc.marcxml import parse_xml_parallel, record_to_xml
+from pymarc.reader import iter_marc_chunks
+
+from benchmarks.corpora import corpora
+
+PATHS = (
+    "decode_marc",
+    "parse_xml",
+    "parse_xml_parallel",
+    "json_reader",
+    "marc8_to_unicode",
+    "as_marc",
+    "record_to_xml",
+    "as_json",
+)
+
+
+def decoder(corpus):
+    """Return the name of the decoding path of `corpus` and the path itself."""
+    if corpus.format == "marc":
+        chunks = list(iter_marc_chunks(corpus.data))
+        return "decode_marc", lambda: [
+            Record(chunk, hide_utf8_warnings=True) for chunk in chunks
+        ]
+    if corpus.format == "xml":
+        return "parse_xml", lambda: parse_xml_to_array(BytesIO(corpus.data))
+    text = corpus.data.decode("utf-8")
+    return "json_reader", lambda: list(JSONReader(StringIO(text)))
+
+
+def paths(corpus):
+    """Return the records of `corpus` and its (name, path) to time."""
+    name, decode = decoder(corpus)
+    records = decode()
+    timed = [(name, decode)]
+
+    if corpus.format == "xml":
+        timed.append(
+            (
+                "parse_xml_parallel",
+                lambda: list(parse_xml_parallel(BytesIO(corpus.data))),
+            )
+        )
+
+    if corpus.format == "marc" and any(
+        chunk[9:10] != b"a" for chunk in iter_marc_chunks(corpus.data)
+    ):
+        values = [
+            [
+                value
+                for field in Record(chunk, to_unicode=False).fields
+                if not field.is_control_field()
+                for value in field.subfields[1::2]
+            ]
+            for chunk in iter_marc_chunks(corpus.data)
+        ]
+        timed.append(
+            (
+                "marc8_to_unicode",
+                lambda: [
+                    [marc8_to_unicode(value, True) for value in record]
+                    for record in values
+                ],
+            )
+        )
+        # pymarc doesn't write MARC-8, the decoded records are written as UTF-8
+        for record in records:
+            record.force_utf8 = True
+
+    timed.append(("as_marc", lambda: [record.as_marc() for record in records]))
+    timed.append(
+        (
+            "record_to_xml",
+            lambda: [record_to_xml(record, quiet=True) for record in records],
+        )
+    )
+    timed.append(("as_json", lambda: [record.as_json() for record in records]))
+    return records, timed
+
+
+def measure(path, repeat, memory=True):
+    """Return the best time of `repeat` runs of `path` and its peak memory."""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        path()
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    peak = None
+    if memory:
+        tracemalloc.start()
+        try:
+            path()
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    return best, peak
+
+
+def metadata(args):
+    """Describe the run, to tell apart results of different runs."""
+    try:
+        commit = (
+            subprocess.run(
+                ["git", "rev-parse", "--short", "HEAD"],
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+                check=True,
+            )
+            .stdout.decode("ascii")
+            .strip()
+        )
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "date": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "commit": commit,
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "records": args.records,
+        "seed": args.seed,
+        "repeat": args.repeat,
+    }
+
+
+def run(args):
+    """Run the benchmarks selected by `args`, yield their results."""
+    for corpus in corpora(args.records, args.seed):
+        if args.corpus and corpus.name not in args.corpus:
+            continue
+        records, timed = paths(corpus)
+        for name, path in timed:
+            if args.path and name not in args.path:
+                continue
+            seconds, peak = measure(path, args.repeat, not args.no_memory)
+            result = {
+                "corpus": corpus.name,
+                "path": name,
+                "records": len(records),
+                "bytes": len(corpus.data),
+                "seconds": seconds,
+                "records_per_second": len(records) / seconds if seconds else None,
+                "peak_memory": peak,
+            }
+            yield result
+
+
+def _key(result):
+    return result["corpus"], result["path"]
+
+
+def report(result, previous=None):
+    """Format a result as a line of the report, compared to `previous`."""
+    line = "%-12s %-18s %7d %12.0f" % (
+        result["corpus"],
+        result["path"],
+        result["records"],
+        result["records_per_second"] or 0,
+    )
+    if result["peak_memory"] is not None:
+        line += " %9.1f" % (result["peak_memory"] / 1024**2)
+    else:
+        line += " %9s" % "-"
+    if previous and previous.get("records_per_second"):
+        change = result["records_per_second"] / previous["records_per_second"] - 1
+        line += " %+7.1f%%" % (change * 100)
+    return line
+
+
+def main(argv=None):
+    """Run the benchmarks from the command line."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--records", type=int, default=1000, help="records per synthetic corpus"
+    )
+    parser.add_argument("--seed", type=int, default=0, help="synthetic corpora seed")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per path")
+    parser.add_argument(
+        "--corpus", action="append", help="only this corpus, repeatable"
+    )
+    parser.add_argument(
+        "--path", action="append", choices=PATHS, help="only this path, repeatable"
+    )
+    parser.add_argument(
+        "--no-memory", action="store_true", help="don't measure peak memory"
+    )
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--compare", help="JSON file of a previous run to compare to")
+    args = parser.parse_args(argv)
+
+    previous = {}
+    if args.compare:
+        with open(args.compare) as fh:
+            previous = {_key(result): result for result in json.load(fh)["results"]}
+
+    print(
+        "%-12s %-18s %7s %12s %9s%s"
+        % (
+            "corpus",
+            "path",
+            "records",
+            "records/s",
+            "peak MiB",
+            "  change" if previous else "",
+        )
+    )
+    results = []
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        for result in run(args):
+            results.append(result)
+            print(report(result, previous.get(_key(result))))
+            sys.stdout.flush()
+
+    if args.output:
+        with open(args.output, "w") as fh:
+            json.dump({"meta": metadata(args), "results": results}, fh, indent=2)
+            fh.write("\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+# This file is part of pymarc. It is subject to the license terms in the
+# LICENSE file found in the top-level directory of this distribution and at
+# https://opensource.org/licenses/BSD-2-Clause. pymarc may be copied, modified,
+# propagated, or distributed according to the terms contained in the LICENSE
+# file.
+
+"""Compare the MARCXML backends installed, in records per second.
+
+Each backend reads the synthetic ``utf8.xml`` corpus with
+``parse_xml_to_array`` and writes its records with ``record_to_xml`` and an
+``XMLWriter``. The SAX handler, which read MARCXML before the backends, is
+timed as ``sax`` for reference.
+
+.. code-block:: console
+
+    $ python -m benchmarks.xml_backends --records 2000 --repeat 5
+"""
+
+import argparse
+from io import BytesIO
+import sys
+
+from pymarc import XMLWriter, parse_xml_to_array, record_to_xml
+from pymarc.marcxml import XML_BACKENDS, XmlHandler, parse_xml, xml_backend
+
+from benchmarks.corpora import _xml, utf8_records
+from benchmarks.run import measure
+
+
+def backends():
+    """Return the names of the backends installed."""
+    names = []
+    for name in XML_BACKENDS:
+        try:
+            xml_backend(name)
+        except ImportError:
+            continue
+        names.append(name)
+    return names
+
+
+def _sax(data):
+    handler = XmlHandler()
+    parse_xml(BytesIO(data), handler)
+    return handler.records
+
+
+def _write(records, backend):
+    writer = XMLWriter(BytesIO(), backend=backend)
+    for record in records:
+        writer.write(record)
+    writer.close(close_fh=False)
+
+
+def paths(records, data):
+    """Yield the (backend, operation, path) to time."""
+    yield "sax", "parse", lambda: _sax(data)
+    # each path is timed before the next one is made, name is the current one
+    for name in backends():
+        yield name, "parse", lambda: parse_xml_to_array(BytesIO(data), backend=name)
+        yield name, "record_to_xml", lambda: [
+            record_to_xml(record, backend=name) for record in records
+        ]
+        yield name, "XMLWriter", lambda: _write(records, name)
+
+
+def main(argv=None):
+    """Run the comparison from the command line."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--records", type=int, default=1000, help="records to time")
+    parser.add_argument("--seed", type=int, default=0, help="synthetic records seed")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per path")
+    args = parser.parse_args(argv)
+
+    records = list(utf8_records(args.records, args.seed))
+    data = _xml(records)
+    print("%-8s %-14s %7s %12s" % ("backend", "operation", "records", "records/s"))
+    for name, operation, path in paths(records, data):
+        seconds, _ = measure(path, args.repeat, memory=False)
+        print(
+            "%-8s %-14s %7d %12.0f"
+            % (name, operation, len(records), len(records) / seconds)
+        )
+        sys.stdout.flush()
+
+
+if __name__ == "__main__":
+    main()
@@ -13,3 +13,6 @@ from .constants import *
 from .marc8 import marc8_to_unicode, MARC8ToUnicode
 from .marcxml import *
 from .marcjson import *
+from .sort import sort_records
+from .stats import Anomalies, Stats, LoggingHook
+from .pipeline import Pipeline
@@ -0,0 +1,13 @@
+# This file is part of pymarc. It is subject to the license terms in the
+# LICENSE file found in the top-level directory of this distribution and at
+# https://opensource.org/licenses/BSD-2-Clause. pymarc may be copied, modified,
+# propagated, or distributed according to the terms contained in the LICENSE
+# file.
+
+"""Run the pymarc command line tool, see :mod:`pymarc.cli`."""
+
+import sys
+
+from pymarc.cli import main
+
+sys.exit(main())
@@ -0,0 +1,566 @@
+# This file is part of pymarc. It is subject to the license terms in the
+# LICENSE file found in the top-level directory of this distribution and at
+# https://opensource.org/licenses/BSD-2-Clause. pymarc may be copied, modified,
+# propagated, or distributed according to the terms contained in the LICENSE
+# file.
+
+"""Batches of records packed in one contiguous buffer.
+
+Records are pickled compactly one by one, as their fields in transmission
+format (see :meth:`pymarc.Record.__reduce_ex__`). A :class:`RecordBatch` goes
+further and packs many records in a single buffer, which is sent to another
+process in one piece, or shared with it without being copied:
+
+.. code-block:: python
+
+    from multiprocessing import Process
+
+    from pymarc import MARCReader
+    from pymarc.batch import RecordBatch
+
+    def work(name):
+        batch = RecordBatch.from_shared_memory(name)
+        for record in batch:
+            print(record.title())
+        batch.close()
+
+    with open('records.dat', 'rb') as fh:
+        batch = RecordBatch(MARCReader(fh))
+    shm = batch.to_shared_memory()
+    process = Process(target=work, args=(shm.name,))
+    process.start()
+    process.join()
+    shm.close()
+    shm.unlink()
+
+A batch is also a table of the fields of its records, kept as flat arrays of
+tags, offsets and lengths next to the record data. Batches read by
+:func:`read_batches` hold the records of a file in transmission format as
+they are, nothing is decoded until a column is asked for:
+
+.. code-block:: python
+
+    from pymarc.batch import read_batches
+
+    with open('records.dat', 'rb') as fh:
+        for batch in read_batches(fh, size=10000):
+            books = batch.filter(batch.has_tag('020'))
+            for titles in books.get_subfields('245', 'a'):
+                print(titles)
+
+The buffer holds the offsets, flags and leaders of the records in native byte
+order, it is meant to be read on the machine which wrote it.
+"""
+
+from array import array
+from collections import Counter
+import pickle
+import struct
+
+from pymarc.constants import LEADER_LEN, SUBFIELD_INDICATOR
+from pymarc.exceptions import (
+    BaseAddressInvalid,
+    BaseAddressNotFound,
+    NoFieldsFound,
+    PymarcException,
+    RecordDirectoryInvalid,
+    RecordLeaderInvalid,
+)
+from pymarc.marc8 import MARC8ToUnicode, marc8_to_unicode
+from pymarc.reader import iter_marc_chunks
+from pymarc.record import (
+    FORCE_UTF8,
+    Record,
+    _pack_record,
+    _parse_directory,
+    _unpack_record,
+)
+
+# magic, number of records, number of fields, size of the packed records
+_HEADER = struct.Struct("<8sQQQ")
+_MAGIC = b"PYMARCB2"
+_TAG_LEN = 3
+_ENTRY_LEN = 12
+
+_SUBFIELD_INDICATOR = SUBFIELD_INDICATOR.encode("ascii")
+
+# flag of a record that couldn't be packed, stored as a pickle
+_PICKLED = 4
+# flag of a record appended in transmission format, decoded by Record
+_RAW = 8
+
+
+class RecordBatch:
+    """Records packed in one contiguous buffer, with a table of their fields.
+
+    Each record is kept as its leader, flags and transmission format, in three
+    buffers indexed by the offsets of the records. The directory entries of
+    the records are kept apart, in columns of their own: the tags, and the
+    start and length of the data of the fields, from the start of their
+    record. Records are rebuilt when they are accessed, by index or by
+    iterating over the batch, while the columns are read by :meth:`has_tag`,
+    :meth:`tags_present`, :meth:`get_subfields` and :meth:`get_data` without
+    building them. Records which can't be packed are pickled as usual, and
+    rebuilt whenever a column is read.
+
+    A batch made by :meth:`from_buffer` or :meth:`from_shared_memory` reads the
+    records straight from the buffer, the buffers are copied if a record is
+    appended to it.
+    """
+
+    def __init__(self, records=()):
+        """Pack `records`, an iterable of records, in a new batch."""
+        self.offsets = array("Q", [0])
+        self.field_offsets = array("Q", [0])
+        self.starts = array("I")
+        self.lengths = array("I")
+        self.flags = bytearray()
+        self.leaders = bytearray()
+        self.tags = bytearray()
+        self.data = bytearray()
+        self._shm = None
+        for record in records:
+            self.append(record)
+
+    def _columns(self):
+        """Return the buffers of the batch, in the order of to_bytes."""
+        return (
+            self.offsets,
+            self.field_offsets,
+            self.starts,
+            self.lengths,
+            self.flags,
+            self.leaders,
+            self.tags,
+            self.data,
+        )
+
+    def append(self, record):
+        """Add `record` at the end of the batch."""
+        packed = _pack_record(record) if record.__dict__.get("pos") == 0 else None
+        if packed is None:
+            data = pickle.dumps(record, pickle.HIGHEST_PROTOCOL)
+            self._append(bytes(LEADER_LEN), data, _PICKLED, ())
+        else:
+            leader, data, flags = packed
+            self._append(leader.encode("ascii"), data, flags, _directory(data))
+
+    def append_marc(self, marc, force_utf8=False):
+        """Add the record `marc`, in transmission format, as it is.
+
+        The leader and directory of `marc` are checked as
+        :meth:`Record.decode_marc <pymarc.record.Record.decode_marc>` does,
+        raising the same exceptions, but the fields are only decoded when
+        the record is rebuilt or its columns read; `force_utf8` then decodes
+        them as UTF-8 whatever the leader says.
+        """
+        entries = _directory(marc)
+        leader = bytes(marc[:LEADER_LEN])
+        # raises UnicodeDecodeError as Leader.from_bytes
+        leader.decode("ascii")
+        flags = _RAW | FORCE_UTF8 if force_utf8 else _RAW
+        self._append(leader, marc, flags, entries)
+
+    def _append(self, leader, data, flags, entries):
+        """Add a record: its leader, data, flags and (tag, start, length)."""
+        if not isinstance(self.data, bytearray):
+            self._copy()
+        for tag, start, length in entries:
+            self.tags += tag
+            self.starts.append(start)
+            self.lengths.append(length)
+        self.field_offsets.append(len(self.lengths))
+        self.flags.append(flags)
+        self.leaders += leader
+        self.data += data
+        self.offsets.append(len(self.data))
+
+    def _copy(self):
+        """Copy the buffers read by from_buffer, to append records to them."""
+        self.offsets = array("Q", self.offsets)
+        self.field_offsets = array("Q", self.field_offsets)
+        self.starts = array("I", self.starts)
+        self.lengths = array("I", self.lengths)
+        self.flags = bytearray(self.flags)
+        self.leaders = bytearray(self.leaders)
+        self.tags = bytearray(self.tags)
+        self.data = bytearray(self.data)
+
+    def __len__(self):
+        """Return the number of records in the batch."""
+        return len(self.flags)
+
+    def _index(self, index):
+        """Return `index` as a positive index, check it is in the batch."""
+        count = len(self.flags)
+        if index < 0:
+            index += count
+        if not 0 <= index < count:
+            raise IndexError("record index out of range")
+        return index
+
+    def record(self, index, **kwargs):
+        """Return the record at `index`.
+
+        The records added by :meth:`append_marc` are decoded by
+        :class:`Record <pymarc.record.Record>`, with `kwargs` as its
+        options: `to_unicode`, `hide_utf8_warnings`, `utf8_handling`...
+        """
+        index = self._index(index)
+        data = bytes(self.data[self.offsets[index] : self.offsets[index + 1]])
+        flags = self.flags[index]
+        if flags & _PICKLED:
+            return pickle.loads(data)
+        if flags & _RAW:
+            return Record(data, force_utf8=bool(flags & FORCE_UTF8), **kwargs)
+        start = index * LEADER_LEN
+        leader = bytes(self.leaders[start : start + LEADER_LEN]).decode("ascii")
+        return _unpack_record(leader, data, flags)
+
+    def __getitem__(self, index):
+        """Return the record at `index`, see :meth:`record`."""
+        return self.record(index)
+
+    def __iter__(self):
+        """Iterate over the records of the batch."""
+        for index in range(len(self.flags)):
+            yield self.record(index)
+
+    def _fields(self, tag):
+        """Yield the (record index, field index) of the fields `tag`.
+
+        The tags of all the fields are searched at once, the fields of the
+        pickled records are not in the columns, see _pickled.
+        """
+        tag = tag.encode("ascii")
+        if len(tag) != _TAG_LEN:
+            # it could only match part of a tag
+            return
+        tags = bytes(self.tags)
+        field_offsets = self.field_offsets
+        index = 0
+        position = tags.find(tag)
+        while position != -1:
+            if position % _TAG_LEN:
+                position = tags.find(tag, position + 1)
+                continue
+            field = position // _TAG_LEN
+            while field_offsets[index + 1] <= field:
+                index += 1
+            yield index, field
+            position = tags.find(tag, position + _TAG_LEN)
+
+    def _pickled(self):
+        """Yield the index and record of the records which were pickled."""
+        for index, flags in enumerate(self.flags):
+            if flags & _PICKLED:
+                yield index, self.record(index)
+
+    def _field_data(self, index, field):
+        """Return the data of a field, without its terminator."""
+        start = self.offsets[index] + self.starts[field]
+        return bytes(self.data[start : start + self.lengths[field]])
+
+    def _decoder(self, index):
+        """Return the function decoding the values of the record at `index`."""
+        coding_scheme = self.data[self.offsets[index] + 9]
+        if coding_scheme == ord("a") or self.flags[index] & FORCE_UTF8:
+            return _decode_utf8
+        converter = MARC8ToUnicode(quiet=True)
+        return lambda value: marc8_to_unicode(value, converter=converter)
+
+    def has_tag(self, tag):
+        """Return, for each record, whether it has a field `tag`.
+
+        The list of booleans returned can be given to :meth:`filter`.
+        """
+        mask = [False] * len(self.flags)
+        for index, _ in self._fields(tag):
+            mask[index] = True
+        for index, record in self._pickled():
+            mask[index] = tag in record
+        return mask
+
+    def tags_present(self):
+        """Return a Counter of the number of records having each tag."""
+        tags = bytes(self.tags)
+        field_offsets = self.field_offsets
+        present = Counter()
+        for index in range(len(self.flags)):
+            start = field_offsets[index] * _TAG_LEN
+            end = field_offsets[index + 1] * _TAG_LEN
+            present.update(
+                {tags[i : i + _TAG_LEN] for i in range(start, end, _TAG_LEN)}
+            )
+        present = Counter({tag.decode("ascii"): n for tag, n in present.items()})
+        for index, record in self._pickled():
+            present.update({field.tag for field in record.fields})
+        return present
+
+    def get_subfields(self, tag, code):
+        """Return, for each record, the values of the subfields `code` of `tag`.
+
+        The values of each record are listed in the order of its fields, as
+        ``record.get_fields(tag)`` then ``field.get_subfields(code)`` would.
+        The records in transmission format are decoded from UTF-8 or MARC-8
+        according to their leader, replacing the bytes which can't be.
+        """
+        values = [[] for _ in range(len(self.flags))]
+        code_bytes = code.encode("utf-8")
+        decoders = {}
+        for index, field in self._fields(tag):
+            decode = decoders.get(index)
+            if decode is None:
+                decode = decoders[index] = self._decoder(index)
+            subfields = self._field_data(index, field).split(_SUBFIELD_INDICATOR)
+            for subfield in subfields[1:]:
+                if subfield.startswith(code_bytes):
+                    values[index].append(decode(subfield[len(code_bytes) :]))
+        for index, record in self._pickled():
+            values[index] = [
+                value
+                for field in record.get_fields(tag)
+                if not field.is_control_field()
+                for value in field.get_subfields(code)
+            ]
+        return values
+
+    def get_data(self, tag):
+        """Return, for each record, the data of its first control field `tag`.
+
+        None is returned for the records without such a field.
+        """
+        values = [None] * len(self.flags)
+        for index, field in self._fields(tag):
+            if values[index] is None:
+                data = self._field_data(index, field)
+                values[index] = self._decoder(index)(data)
+        for index, record in self._pickled():
+            fields = record.get_fields(tag)
+            values[index] = getattr(fields[0], "data", None) if fields else None
+        return values
+
+    def take(self, indexes):
+        """Return a new batch of the records at `indexes`, in that order.
+
+        The records are copied as they are, without being rebuilt.
+        """
+        batch = RecordBatch()
+        for index in indexes:
+            index = self._index(index)
+            first, last = self.field_offsets[index], self.field_offsets[index + 1]
+            batch.tags += self.tags[first * _TAG_LEN : last * _TAG_LEN]
+            batch.starts.extend(self.starts[first:last])
+            batch.lengths.extend(self.lengths[first:last])
+            batch.field_offsets.append(len(batch.lengths))
+            batch.flags.append(self.flags[index])
+            batch.leaders += self.leaders[index * LEADER_LEN : (index + 1) * LEADER_LEN]
+            batch.data += self.data[self.offsets[index] : self.offsets[index + 1]]
+            batch.offsets.append(len(batch.data))
+        return batch
+
+    def filter(self, mask):
+        """Return a new batch of the records for which `mask` is true.
+
+        `mask` holds a boolean for each record, like those returned by
+        :meth:`has_tag`:
+
+        .. code-block:: python
+
+            serials = batch.filter(
+                [leader[7:8] == b's' for leader in batch.get_leaders()]
+            )
+        """
+        return self.take(index for index, keep in enumerate(mask) if keep)
+
+    def get_leaders(self):
+        """Return the leaders of the records, as bytes."""
+        leaders = bytes(self.leaders)
+        return [
+            leaders[start : start + LEADER_LEN]
+            for start in range(0, len(leaders), LEADER_LEN)
+        ]
+
+    def __reduce__(self):
+        """Pickle the batch as its buffer."""
+        return RecordBatch.from_buffer, (self.to_bytes(),)
+
+    @property
+    def nbytes(self):
+        """The size of the buffer of the batch, see :meth:`to_bytes`."""
+        return _HEADER.size + sum(
+            memoryview(column).nbytes for column in self._columns()
+        )
+
+    def write_into(self, buffer):
+        """Write the batch at the start of `buffer`, a writable buffer.
+
+        `buffer` must hold at least :attr:`nbytes` bytes.
+        """
+        view = memoryview(buffer).cast("B")
+        position = _HEADER.size
+        view[:position] = _HEADER.pack(
+            _MAGIC, len(self.flags), len(self.lengths), len(self.data)
+        )
+        for column in self._columns():
+            column = memoryview(column).cast("B")
+            view[position : position + len(column)] = column
+            position += len(column)
+        view.release()
+
+    def to_bytes(self):
+        """Return the buffer of the batch, as bytes."""
+        buffer = bytearray(self.nbytes)
+        self.write_into(buffer)
+        return bytes(buffer)
+
+    @classmethod
+    def from_buffer(cls, buffer):
+        """Return the batch written in `buffer`, without copying it.
+
+        `buffer` is any object supporting the buffer protocol: bytes, an mmap,
+        the buffer of a shared memory block... It must not change while the
+        batch is used.
+        """
+        view = memoryview(buffer).cast("B")
+        magic, count, field_count, size = _HEADER.unpack_from(view)
+        if magic != _MAGIC:
+            raise ValueError("not a buffer of RecordBatch")
+        batch = cls.__new__(cls)
+        batch._shm = None
+        columns = []
+        position = _HEADER.size
+        for itemsize, length in (
+            ("Q", count + 1),
+            ("Q", count + 1),
+            ("I", field_count),
+            ("I", field_count),
+            ("B", count),
+            ("B", count * LEADER_LEN),
+            ("B", field_count * _TAG_LEN),
+            ("B", size),
+        ):
+            end = position + length * array(itemsize).itemsize
+            columns.append(view[position:end].cast(itemsize))
+            position = end
+        (
+            batch.offsets,
+            batch.field_offsets,
+            batch.starts,
+            batch.lengths,
+            batch.flags,
+            batch.leaders,
+            batch.tags,
+            batch.data,
+        ) = columns
+        return batch
+
+    def to_shared_memory(self, name=None):
+        """Write the batch in a new shared memory block and return the block.
+
+        The block is a :class:`multiprocessing.shared_memory.SharedMemory`,
+        called `name` or given a new name. Other processes read the batch
+        with :meth:`from_shared_memory` and the name of the block; closing and
+        unlinking it is up to the caller.
+        """
+        from multiprocessing.shared_memory import SharedMemory
+
+        shm = SharedMemory(name=name, create=True, size=self.nbytes)
+        self.write_into(shm.buf)
+        return shm
+
+    @classmethod
+    def from_shared_memory(cls, name):
+        """Return the batch in the shared memory block `name`.
+
+        The batch reads the records from the block, :meth:`close` detaches
+        it from the block when it is no longer used.
+        """
+        from multiprocessing.shared_memory import SharedMemory
+
+        shm = SharedMemory(name=name)
+        batch = cls.from_buffer(shm.buf)
+        batch._shm = shm
+        return batch
+
+    def close(self):
+        """Release the buffer read by the batch, which is then empty.
+
+        The shared memory block of a batch made by :meth:`from_shared_memory`
+        is closed.
+        """
+        for column in self._columns():
+            if isinstance(column, memoryview):
+                column.release()
+        shm = self._shm
+        self.__init__()
+        if shm is not None:
+            shm.close()
+
+
+def _decode_utf8(value):
+    """Decode a value of a UTF-8 record, replacing what can't be decoded."""
+    return value.decode("utf-8", "replace")
+
+
+def _directory(marc):
+    """Return the (tag, start, length) of the fields of `marc`.
+
+    The start of the data of a field is counted from the start of the record,
+    and its length leaves out the field terminator; both are bound to the
+    record, as its fields would be sliced by Record.decode_marc.
+    """
+    if len(marc) < LEADER_LEN:
+        raise RecordLeaderInvalid
+    base_address = int(marc[12:17])
+    if base_address <= 0:
+        raise BaseAddressNotFound
+    if base_address >= len(marc):
+        raise BaseAddressInvalid
+    directory = bytes(marc[LEADER_LEN : base_address - 1]).decode("ascii")
+    if len(directory) % _ENTRY_LEN != 0:
+        raise RecordDirectoryInvalid
+    size = len(marc)
+    entries = []
+    for tag, length, offset in _parse_directory(directory):
+        start = min(base_address + offset, size)
+        end = min(max(start + length - 1, start), size)
+        entries.append((tag.encode("ascii"), start, end - start))
+    if not entries:
+        raise NoFieldsFound
+    return entries
+
+
+def read_batches(marc_target, size=1000, force_utf8=False, permissive=False):
+    """Yield the records of `marc_target` in batches of `size` records.
+
+    `marc_target` is raw MARC or an object that responds to read(), as for
+    :class:`MARCReader <pymarc.reader.MARCReader>`. The records are added to
+    the batches in transmission format with :meth:`RecordBatch.append_marc`;
+    those found invalid are skipped if `permissive` is true.
+    """
+    batch = RecordBatch()
+    for chunk in iter_marc_chunks(marc_target):
+        try:
+            batch.append_marc(chunk, force_utf8)
+        except (PymarcException, UnicodeDecodeError, ValueError):
+            if not permissive:
+                raise
+            continue
+        if len(batch) == size:
+            yield batch
+            batch = RecordBatch()
+    if len(batch):
+        yield batch
+
+
+def batches(records, size=1000):
+    """Yield the records of `records` in batches of `size` records."""
+    batch = RecordBatch()
+    for record in records:
+        batch.append(record)
+        if len(batch) == size:
+            yield batch
+            batch = RecordBatch()
+    if len(batch):
+        yield batch
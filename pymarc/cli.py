@@ -0,0 +1,705 @@
+# This file is part of pymarc. It is subject to the license terms in the
+# LICENSE file found in the top-level directory of this distribution and at
+# https://opensource.org/licenses/BSD-2-Clause. pymarc may be copied, modified,
+# propagated, or distributed according to the terms contained in the LICENSE
+# file.
+
+"""The ``pymarc`` command line tool.
+
+.. code-block:: console
+
+    $ pymarc count dump.mrc
+    $ pymarc convert dump.mrc dump.xml --workers 4 --progress
+    $ pymarc cat dump.mrc --id ocm12345 --id ocm67890
+    $ pymarc head -n 2 dump.xml
+    $ pymarc grep 'pragmatic' dump.mrc --field 245a
+    $ pymarc stats dump.mrc
+    $ pymarc index dump.mrc > dump.idx
+    $ pymarc split dump.mrc 'part-%02d.mrc' --shards 8
+    $ pymarc validate dump.mrc --workers 4 --json
+
+It can also be run as ``python -m pymarc``. Files are read and written as
+streams, in any of the formats of FORMATS, guessed from their extension or
+given with ``--from`` and ``--to``; ``-`` is standard input or output. The
+records of an NDJSON file written as NDJSON are copied as the lines they were
+read from, line endings included.
+
+Records that fail to decode stop the command, unless ``--permissive`` is
+given: they are then counted and skipped. Either way the command exits with
+status 1 and reports the number of failures on standard error.
+"""
+
+import argparse
+import collections
+import json
+import multiprocessing
+import re
+import sys
+import time
+
+from pymarc.marcxml import xml_backend
+from pymarc.pipeline import (
+    BATCH_SIZE,
+    FORMATS,
+    _batches,
+    _decode,
+    _units,
+    guess_format,
+)
+from pymarc.split import record_offsets, split_file
+from pymarc.stats import Stats
+from pymarc.validate import validate_file
+
+# seconds between two progress reports
+PROGRESS_INTERVAL = 1.0
+
+
+class CommandError(Exception):
+    """An error reported to the user without traceback."""
+
+    pass
+
+
+# reading
+
+
+def _open_input(path):
+    if path == "-":
+        return sys.stdin.buffer
+    return open(path, "rb")
+
+
+# writing
+
+
+def serialize(record, format):
+    """Return `record` as bytes in `format`, as written by the pymarc writers."""
+    if format == "marc":
+        return record.as_marc()
+    if format == "xml":
+        return xml_backend().record_to_xml(record, quiet=True, encoding="utf-8")
+    if format in ("json", "ndjson"):
+        data = record.as_json(separators=(",", ":")).encode("utf-8")
+        return data + b"\n" if format == "ndjson" else data
+    return str(record).encode("utf-8")
+
+
+class _Output:
+    """Writes serialized records with the framing of their format."""
+
+    FRAMING = {
+        "marc": (b"", b"", b""),
+        "xml": (
+            b'<?xml version="1.0" encoding="UTF-8"?>'
+            b'<collection xmlns="http://www.loc.gov/MARC21/slim">',
+            b"",
+            b"</collection>",
+        ),
+        "json": (b"[", b",", b"]"),
+        "ndjson": (b"", b"", b""),
+        "mrk": (b"", b"\n", b""),
+    }
+
+    def __init__(self, path, format):
+        """Open `path`, standard output for ``-``, and write the header."""
+        self.close_fh = path != "-"
+        if self.close_fh:
+            self.file_handle = open(path, "wb")
+        else:
+            self.file_handle = sys.stdout.buffer
+        self.header, self.separator, self.footer = self.FRAMING[format]
+        self.file_handle.write(self.header)
+        self.count = 0
+
+    def write(self, data):
+        """Write a serialized record."""
+        if self.count:
+            self.file_handle.write(self.separator)
+        self.file_handle.write(data)
+        self.count += 1
+
+    def close(self):
+        """Write the footer and close the file, but not standard output."""
+        self.file_handle.write(self.footer)
+        if self.close_fh:
+            self.file_handle.close()
+        else:
+            self.file_handle.flush()
+
+
+# tasks, run on each record, possibly in a worker process, with the unit it
+# was decoded from and the format of the unit, see _units
+
+
+class Count:
+    """Accept every record."""
+
+    def __call__(self, record, unit=None, format=None):
+        """Return True."""
+        return True
+
+
+class Serialize:
+    """Return the records matching `ids` (all if None) serialized in `format`."""
+
+    def __init__(self, format, ids=None):
+        """Serialize in `format` the records with a 001 in `ids`."""
+        self.format = format
+        self.ids = ids
+
+    def __call__(self, record, unit=None, format=None):
+        """Return the serialized record, or None if it is not selected."""
+        if self.ids is not None:
+            field = record["001"]
+            if field is None or field.data not in self.ids:
+                return None
+        return self.serialize(record, unit, format)
+
+    def serialize(self, record, unit, format):
+        """Return `record` serialized, or the NDJSON line it was read from as is."""
+        if format == self.format == "ndjson":
+            return unit if unit.endswith(b"\n") else unit + b"\n"
+        return serialize(record, self.format)
+
+
+class Grep(Serialize):
+    """Return the records with a field matching `pattern`, serialized.
+
+    `field` is a tag optionally followed by a subfield code; without it all
+    the fields are searched. `pattern` is a regular expression, or a plain
+    string if `fixed_strings` is set.
+    """
+
+    def __init__(
+        self,
+        format,
+        pattern,
+        field=None,
+        ignore_case=False,
+        invert=False,
+        fixed_strings=False,
+    ):
+        """Compile `pattern`."""
+        super().__init__(format)
+        if fixed_strings:
+            pattern = re.escape(pattern)
+        self.regex = re.compile(pattern, re.IGNORECASE if ignore_case else 0)
+        self.tag = field[:3] if field else None
+        self.code = field[3:4] if field else None
+        self.invert = invert
+
+    def values(self, record):
+        """Yield the values of `record` searched for the pattern."""
+        fields = record.get_fields(self.tag) if self.tag else record.fields
+        for field in fields:
+            if self.code:
+                yield from field.get_subfields(self.code)
+            else:
+                yield field.value()
+
+    def __call__(self, record, unit=None, format=None):
+        """Return the serialized record if it matches, None otherwise."""
+        found = any(self.regex.search(value) for value in self.values(record))
+        if found == self.invert:
+            return None
+        return self.serialize(record, unit, format)
+
+
+class Summarize:
+    """Return what stats needs to know about a record."""
+
+    def __call__(self, record, unit=None, format=None):
+        """Return the leader values and the (tag, codes) of the fields."""
+        leader = record.leader
+        return (
+            leader[6],
+            leader[7],
+            leader[9],
+            [
+                (field.tag, "".join(code for code, value in field))
+                for field in record.fields
+            ],
+        )
+
+
+_worker = None
+
+
+def _init_worker(task, format, options):
+    global _worker
+    _worker = (task, format, options, Stats())
+
+
+def _run(task, format, options, stats, unit):
+    """Decode a unit and run `task` on its record, never raising.
+
+    The anomalies of the records, which aren't reported, are counted in
+    `stats` rather than logged.
+    """
+    try:
+        return True, task(_decode(unit, format, options, stats), unit, format)
+    except Exception as ex:
+        return False, "%s: %s" % (type(ex).__name__, ex)
+
+
+def _run_batch(units):
+    task, format, options, stats = _worker
+    return [_run(task, format, options, stats, unit) for unit in units]
+
+
+def _process(units, task, format, options, workers):
+    """Yield the (ok, result) of `task` for each unit, in order.
+
+    With several workers batches of units are sent to a process pool, at most
+    two per worker being in flight so that memory use stays bounded.
+    """
+    if workers <= 1:
+        stats = Stats()
+        for unit in units:
+            yield _run(task, format, options, stats, unit)
+        return
+    with multiprocessing.Pool(workers, _init_worker, (task, format, options)) as pool:
+        pending = collections.deque()
+        for batch in _batches(units, BATCH_SIZE):
+            pending.append(pool.apply_async(_run_batch, (batch,)))
+            if len(pending) >= 2 * workers:
+                yield from pending.popleft().get()
+        while pending:
+            yield from pending.popleft().get()
+
+
+class Progress:
+    """Counts records and failures, reporting progress on standard error."""
+
+    def __init__(self, enabled):
+        """Start counting; nothing is reported unless `enabled`."""
+        self.enabled = enabled
+        self.records = 0
+        self.failures = 0
+        self.start = self.last = time.monotonic()
+
+    def rate(self):
+        """Return the records per second since the start."""
+        elapsed = time.monotonic() - self.start
+        return self.records / elapsed if elapsed > 0 else 0.0
+
+    def update(self, ok):
+        """Count a record, failed if not `ok`."""
+        self.records += 1
+        if not ok:
+            self.failures += 1
+        if self.enabled:
+            now = time.monotonic()
+            if now - self.last >= PROGRESS_INTERVAL:
+                self.last = now
+                sys.stderr.write(
+                    "\r%d records, %d failed, %.0f records/s"
+                    % (self.records, self.failures, self.rate())
+                )
+                sys.stderr.flush()
+
+    def finish(self):
+        """Report the totals, return the exit status."""
+        if self.enabled:
+            sys.stderr.write(
+                "\r%d records, %d failed in %.1fs, %.0f records/s\n"
+                % (
+                    self.records,
+                    self.failures,
+                    time.monotonic() - self.start,
+                    self.rate(),
+                )
+            )
+        elif self.failures:
+            sys.stderr.write("%d records, %d failed\n" % (self.records, self.failures))
+        return 1 if self.failures else 0
+
+
+def _results(args, task, limit=None, positions=None):
+    """Yield the results of `task` for the records of the input files.
+
+    Failures are counted, and stop everything unless ``--permissive``.
+    `limit` stops after that many non None results, `positions` only keeps
+    the records at those positions (starting at 1) in the input.
+    """
+    options = {
+        "force_utf8": args.utf8,
+        "utf8_handling": args.utf8_handling,
+        "file_encoding": args.encoding,
+    }
+    progress = args.progress
+    found = 0
+    for path in args.files:
+        format = args.from_format or guess_format(path)
+        with _open_input(path) as file_handle:
+            units = _units(file_handle, format, options)
+            if positions is not None:
+                units = (
+                    unit
+                    for position, unit in enumerate(units, 1)
+                    if position in positions
+                )
+            for ok, result in _process(units, task, format, options, args.workers):
+                progress.update(ok)
+                if not ok:
+                    if not args.permissive:
+                        raise CommandError(
+                            "%s: record %d: %s" % (path, progress.records, result)
+                        )
+                    continue
+                if result is None:
+                    continue
+                yield result
+                found += 1
+                if limit is not None and found >= limit:
+                    return
+
+
+def _write(args, task, limit=None, positions=None):
+    output = _Output(args.output, args.to_format)
+    try:
+        for data in _results(args, task, limit, positions):
+            output.write(data)
+    finally:
+        output.close()
+
+
+# commands
+
+
+def count(args):
+    """Count the records of the input files."""
+    total = sum(1 for result in _results(args, Count()))
+    print(total)
+
+
+def convert(args):
+    """Convert a file to another format."""
+    args.files = [args.input]
+    if args.to_format is None:
+        args.to_format = guess_format(args.output)
+    _write(args, Serialize(args.to_format))
+
+
+def cat(args):
+    """Write the records, or the selected ones, of the input files."""
+    ids = set(args.id or ())
+    if args.id_file:
+        with open(args.id_file) as fh:
+            ids.update(line.strip() for line in fh if line.strip())
+    positions = set(args.record) if args.record else None
+    limit = len(positions) if positions else None
+    _write(args, Serialize(args.to_format, ids or None), limit, positions)
+
+
+def head(args):
+    """Write the first records of the input files."""
+    if args.number > 0:
+        _write(args, Serialize(args.to_format), args.number)
+
+
+def grep(args):
+    """Write the records with a field matching a regular expression or a string."""
+    task = Grep(
+        args.to_format,
+        args.pattern,
+        args.field,
+        args.ignore_case,
+        args.invert,
+        args.fixed_strings,
+    )
+    if args.count:
+        print(sum(1 for result in _results(args, task)))
+    else:
+        _write(args, task)
+
+
+def stats(args):
+    """Report on the content of the input files."""
+    types = collections.Counter()
+    levels = collections.Counter()
+    coding = collections.Counter()
+    occurrences = collections.Counter()
+    records_with = collections.Counter()
+    subfields = collections.defaultdict(collections.Counter)
+    fields_per_record = []
+    for leader6, leader7, leader9, fields in _results(args, Summarize()):
+        types[leader6] += 1
+        levels[leader7] += 1
+        coding[leader9] += 1
+        fields_per_record.append(len(fields))
+        for tag, codes in fields:
+            occurrences[tag] += 1
+            subfields[tag].update(codes)
+        records_with.update(set(tag for tag, codes in fields))
+
+    report = {
+        "records": len(fields_per_record),
+        "fields_per_record": {
+            "min": min(fields_per_record, default=0),
+            "max": max(fields_per_record, default=0),
+            "mean": (
+                sum(fields_per_record) / len(fields_per_record)
+                if fields_per_record
+                else 0
+            ),
+        },
+        "type_of_record": dict(types),
+        "bibliographic_level": dict(levels),
+        "coding_scheme": dict(coding),
+        "tags": {
+            tag: {
+                "records": records_with[tag],
+                "occurrences": occurrences[tag],
+                "subfields": dict(sorted(subfields[tag].items())),
+            }
+            for tag in sorted(occurrences)
+        },
+    }
+    if args.json:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+        return
+    print("records: %d" % report["records"])
+    print(
+        "fields per record: min %(min)d, max %(max)d, mean %(mean).1f"
+        % report["fields_per_record"]
+    )
+    for name in ("type_of_record", "bibliographic_level", "coding_scheme"):
+        values = sorted(report[name].items())
+        print("%s: %s" % (name, ", ".join("%r: %d" % value for value in values)))
+    print("%-5s %9s %11s  subfields" % ("tag", "records", "occurrences"))
+    for tag, entry in report["tags"].items():
+        print(
+            "%-5s %9d %11d  %s"
+            % (
+                tag,
+                entry["records"],
+                entry["occurrences"],
+                " ".join("$%s:%d" % item for item in entry["subfields"].items()),
+            )
+        )
+
+
+def index(args):
+    """Write the key, offset and length of each record, without decoding them."""
+    format = args.from_format or guess_format(args.input)
+    if format not in ("marc", "xml", "ndjson"):
+        raise CommandError("index: %s files can not be indexed" % format)
+    output = sys.stdout if args.output == "-" else open(args.output, "w")
+    try:
+        with _open_input(args.input) as file_handle:
+            for key, offset, length in record_offsets(file_handle, format, args.key):
+                args.progress.update(True)
+                output.write(
+                    "%s\t%d\t%d\n" % (key.decode("utf-8", "replace"), offset, length)
+                )
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+
+def split(args):
+    """Split a file into shards."""
+    format = args.from_format or guess_format(args.input)
+    if format not in ("marc", "xml", "ndjson"):
+        raise CommandError("split: %s files can not be split" % format)
+    for path in split_file(
+        args.input,
+        args.template,
+        format=format,
+        records=args.records,
+        size=args.size,
+        shards=args.shards,
+        key=args.key,
+    ):
+        print(path)
+
+
+def validate(args):
+    """Check the structure of MARC21 files, without decoding their records."""
+    reports = {}
+    for path in args.files:
+        format = args.from_format or guess_format(path)
+        if format != "marc":
+            raise CommandError("validate: only MARC21 files can be validated")
+        if path == "-":
+            report = validate_file(sys.stdin.buffer.read())
+        else:
+            report = validate_file(path, workers=args.workers)
+        args.progress.records += report.records
+        args.progress.failures += report.invalid
+        reports[path] = report
+
+    if args.json:
+        json.dump(
+            {path: report.as_dict() for path, report in reports.items()},
+            sys.stdout,
+            indent=2,
+        )
+        print()
+        return
+    for path, report in reports.items():
+        for problem in report.problems:
+            print(
+                "%s\t%d\t%s\t%s\t%s"
+                % (
+                    path,
+                    problem.offset,
+                    problem.code,
+                    problem.tag or "",
+                    problem.detail or "",
+                )
+            )
+
+
+# command line
+
+
+def _parser():
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument(
+        "-f", "--from", dest="from_format", choices=FORMATS, help="input format"
+    )
+    common.add_argument(
+        "--permissive",
+        action="store_true",
+        help="skip the records which can't be decoded",
+    )
+    common.add_argument(
+        "--progress",
+        action="store_true",
+        help="report progress and throughput on standard error",
+    )
+    common.add_argument(
+        "--utf8", action="store_true", help="decode MARC21 records as UTF-8"
+    )
+    common.add_argument(
+        "--utf8-handling",
+        default="strict",
+        choices=("strict", "replace", "ignore"),
+        help="how to handle invalid UTF-8",
+    )
+    common.add_argument(
+        "--encoding",
+        default="iso8859-1",
+        help="encoding of MARC21 records not in UTF-8; iso8859-1 means MARC-8",
+    )
+
+    parallel = argparse.ArgumentParser(add_help=False)
+    parallel.add_argument(
+        "-j",
+        "--workers",
+        type=int,
+        default=1,
+        help="number of worker processes decoding records",
+    )
+
+    output = argparse.ArgumentParser(add_help=False)
+    output.add_argument("-t", "--to", dest="to_format", choices=FORMATS, default="mrk")
+    output.add_argument("-o", "--output", default="-", help="output file")
+
+    parser = argparse.ArgumentParser(
+        prog="pymarc", description="Work with files of MARC records."
+    )
+    commands = parser.add_subparsers(dest="command", metavar="command")
+    commands.required = True
+
+    def add(function, parents, **kwargs):
+        command = commands.add_parser(
+            function.__name__,
+            parents=parents,
+            help=function.__doc__.rstrip("."),
+            description=function.__doc__,
+            **kwargs
+        )
+        command.set_defaults(function=function)
+        return command
+
+    command = add(count, [common, parallel])
+    command.add_argument("files", nargs="+", metavar="file")
+
+    command = add(convert, [common, parallel])
+    command.add_argument("input")
+    command.add_argument("output")
+    command.add_argument("-t", "--to", dest="to_format", choices=FORMATS)
+
+    command = add(cat, [common, parallel, output])
+    command.add_argument("files", nargs="+", metavar="file")
+    command.add_argument(
+        "--id", action="append", help="only the record with this 001, repeatable"
+    )
+    command.add_argument("--id-file", help="only the records with a 001 listed there")
+    command.add_argument(
+        "-r",
+        "--record",
+        type=int,
+        action="append",
+        help="only the record at this position, from 1, repeatable",
+    )
+
+    command = add(head, [common, parallel, output])
+    command.add_argument("files", nargs="+", metavar="file")
+    command.add_argument(
+        "-n", "--number", type=int, default=10, help="number of records"
+    )
+
+    command = add(grep, [common, parallel, output])
+    command.add_argument("pattern")
+    command.add_argument("files", nargs="+", metavar="file")
+    command.add_argument(
+        "-k", "--field", help="tag and optional subfield code to search, e.g. 245a"
+    )
+    command.add_argument("-i", "--ignore-case", action="store_true")
+    command.add_argument(
+        "-F",
+        "--fixed-strings",
+        action="store_true",
+        help="search the pattern as a plain string, not a regular expression",
+    )
+    command.add_argument(
+        "-v", "--invert", action="store_true", help="records which don't match"
+    )
+    command.add_argument(
+        "-c", "--count", action="store_true", help="only count matching records"
+    )
+
+    command = add(stats, [common, parallel])
+    command.add_argument("files", nargs="+", metavar="file")
+    command.add_argument("--json", action="store_true", help="report as JSON")
+
+    command = add(index, [common])
+    command.add_argument("input")
+    command.add_argument("-o", "--output", default="-", help="output file")
+    command.add_argument("-k", "--key", default="001", help="tag and subfield code")
+
+    command = add(split, [common])
+    command.add_argument("input")
+    command.add_argument("template", help="shard paths, e.g. part-%%03d.mrc")
+    group = command.add_mutually_exclusive_group(required=True)
+    group.add_argument("--records", type=int, help="records per shard")
+    group.add_argument("--size", type=int, help="maximum bytes per shard")
+    group.add_argument("--shards", type=int, help="number of shards, on --key")
+    command.add_argument("-k", "--key", default="001", help="tag and subfield code")
+
+    command = add(validate, [common, parallel])
+    command.add_argument("files", nargs="+", metavar="file")
+    command.add_argument("--json", action="store_true", help="report as JSON")
+    return parser
+
+
+def main(argv=None):
+    """Run the command line tool, return its exit status."""
+    args = _parser().parse_args(argv)
+    args.progress = Progress(args.progress)
+    try:
+        args.function(args)
+    except CommandError as ex:
+        args.progress.finish()
+        sys.stderr.write("pymarc: %s\n" % ex)
+        return 1
+    except BrokenPipeError:
+        # the output was closed early, e.g. piped to head
+        sys.stderr.close()
+        return 1
+    return args.progress.finish()
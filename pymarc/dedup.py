@@ -0,0 +1,284 @@
+# This file is part of pymarc. It is subject to the license terms in the
+# LICENSE file found in the top-level directory of this distribution and at
+# https://opensource.org/licenses/BSD-2-Clause. pymarc may be copied, modified,
+# propagated, or distributed according to the terms contained in the LICENSE
+# file.
+
+"""Duplicate detection with normalized match keys.
+
+A :class:`MatchIndex` is built from a first set of records, then a second set is
+streamed against it:
+
+.. code-block:: python
+
+    from pymarc.dedup import build_index, find_matches
+
+    with open('catalog.dat', 'rb') as fh:
+        index = build_index(fh)
+    with open('vendor.dat', 'rb') as fh:
+        for match in find_matches(index, fh):
+            print(match.record_id, match.kind, match.matcher, match.matched_id)
+
+Keys are stored as 64-bit digests rather than strings so that the index stays
+small; with `max_keys` set the index spills to an on-disk sqlite database once
+that many keys are held in memory.
+"""
+
+from collections import namedtuple
+import hashlib
+import os
+import re
+import sqlite3
+import tempfile
+import unicodedata
+
+from pymarc.reader import MARCReader
+from pymarc.record import isbn_regex
+
+EXACT = "exact"
+CANDIDATE = "candidate"
+
+Matcher = namedtuple("Matcher", ["name", "keys", "kind"])
+Matcher.__doc__ = """A match key definition.
+
+* `name` identifies the matcher in reports.
+* `keys` is a callable returning an iterable of normalized keys for a record.
+* `kind` is EXACT for identifiers, CANDIDATE for keys that need review.
+"""
+
+Match = namedtuple("Match", ["record_id", "matched_id", "matcher", "kind", "key"])
+Match.__doc__ = """A match found by :func:`find_matches`."""
+
+issn_regex = re.compile(r"([0-9]{4})-?([0-9]{3}[0-9xX])")
+oclc_regex = re.compile(r"^\s*\((?:OCoLC|OCLC)\)\D*0*([0-9]+)")
+punctuation_regex = re.compile(r"[^\w\s]+")
+whitespace_regex = re.compile(r"\s+")
+
+
+def isbn_keys(record):
+    """Return the ISBNs from all 020 $a, normalized like `Record.isbn()`."""
+    keys = []
+    for field in record.get_fields("020"):
+        for value in field.get_subfields("a"):
+            match = isbn_regex.search(value)
+            if match:
+                keys.append(match.group(1).replace("-", "").upper())
+    return keys
+
+
+def issn_keys(record):
+    """Return the ISSNs from all 022 $a, without hyphen."""
+    keys = []
+    for field in record.get_fields("022"):
+        for value in field.get_subfields("a"):
+            match = issn_regex.search(value)
+            if match:
+                keys.append((match.group(1) + match.group(2)).upper())
+    return keys
+
+
+def oclc_keys(record):
+    """Return the OCLC numbers from 035 $a, without prefix or leading zeros."""
+    keys = []
+    for field in record.get_fields("035"):
+        for value in field.get_subfields("a"):
+            match = oclc_regex.match(value)
+            if match:
+                keys.append(match.group(1))
+    return keys
+
+
+def normalize_text(text):
+    """Normalize `text` for matching: unaccented, lowercase, no punctuation."""
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    text = punctuation_regex.sub(" ", text.lower())
+    return whitespace_regex.sub(" ", text).strip()
+
+
+def title_author_year_keys(record):
+    """Return a composite key of title, author and publication year.
+
+    Built from :func:`Record.title`, :func:`Record.author` and
+    :func:`Record.pubyear`; no key is returned for a record without title.
+    """
+    title = record.title()
+    if not title:
+        return []
+    author = record.author() or ""
+    year = re.sub(r"\D", "", record.pubyear() or "")[:4]
+    return ["%s/%s/%s" % (normalize_text(title), normalize_text(author), year)]
+
+
+DEFAULT_MATCHERS = (
+    Matcher("isbn", isbn_keys, EXACT),
+    Matcher("issn", issn_keys, EXACT),
+    Matcher("oclc", oclc_keys, EXACT),
+    Matcher("title_author_year", title_author_year_keys, CANDIDATE),
+)
+
+
+def default_record_id(record):
+    """Return the 001 of `record`, or None."""
+    field = record["001"]
+    if field is None:
+        return None
+    return field.data
+
+
+def _digest(matcher_name, key):
+    """Hash a match key to a signed 64-bit integer."""
+    digest = hashlib.blake2b(
+        ("%s\x1f%s" % (matcher_name, key)).encode("utf-8"), digest_size=8
+    ).digest()
+    return int.from_bytes(digest, "big", signed=True)
+
+
+class MatchIndex:
+    """A hash index of match keys to record ids.
+
+    * `matchers` is a sequence of :class:`Matcher`, DEFAULT_MATCHERS by default.
+    * `path` is the sqlite database to spill keys to; a temporary file is used
+      if spilling is needed and no path is given.
+    * `max_keys` is the number of keys held in memory before spilling to disk;
+      with None everything stays in memory.
+    """
+
+    def __init__(self, matchers=DEFAULT_MATCHERS, path=None, max_keys=None):
+        """Initialize an empty index."""
+        self.matchers = tuple(matchers)
+        self.path = path
+        self.max_keys = max_keys
+        self.key_count = 0
+        self._keys = {}
+        self._memory_count = 0
+        self._db = None
+        self._tempfile = None
+        if path is not None:
+            self._open_db()
+
+    def _open_db(self):
+        if self.path is None:
+            fd, self._tempfile = tempfile.mkstemp(prefix="pymarc-dedup-")
+            os.close(fd)
+            self.path = self._tempfile
+        self._db = sqlite3.connect(self.path)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS match_keys (digest INTEGER, record_id)"
+        )
+        self._db.execute(
+            "CREATE INDEX IF NOT EXISTS match_keys_digest ON match_keys (digest)"
+        )
+
+    def _spill(self):
+        """Move the in-memory keys to the sqlite database."""
+        if self._db is None:
+            self._open_db()
+        self._db.executemany(
+            "INSERT INTO match_keys VALUES (?, ?)",
+            (
+                (digest, record_id)
+                for digest, record_ids in self._keys.items()
+                for record_id in record_ids
+            ),
+        )
+        self._db.commit()
+        self._keys = {}
+        self._memory_count = 0
+
+    def keys(self, record):
+        """Yield the (matcher, key) pairs of `record`."""
+        for matcher in self.matchers:
+            for key in matcher.keys(record):
+                if key:
+                    yield matcher, key
+
+    def add(self, record, record_id):
+        """Index all the match keys of `record` under `record_id`."""
+        for matcher, key in self.keys(record):
+            self._keys.setdefault(_digest(matcher.name, key), []).append(record_id)
+            self._memory_count += 1
+            self.key_count += 1
+        if self.max_keys is not None and self._memory_count >= self.max_keys:
+            self._spill()
+
+    def get(self, matcher_name, key):
+        """Return the ids of the records indexed with `key` by the named matcher."""
+        digest = _digest(matcher_name, key)
+        record_ids = list(self._keys.get(digest, ()))
+        if self._db is not None:
+            record_ids.extend(
+                row[0]
+                for row in self._db.execute(
+                    "SELECT record_id FROM match_keys WHERE digest = ?", (digest,)
+                )
+            )
+        return record_ids
+
+    def matches(self, record, record_id=None):
+        """Return the :class:`Match` list of `record` against the index.
+
+        A record matched through several keys is reported once per key. Since
+        keys are hashed, a match has a tiny chance of being a collision.
+        """
+        found = []
+        for matcher, key in self.keys(record):
+            for matched_id in self.get(matcher.name, key):
+                found.append(
+                    Match(record_id, matched_id, matcher.name, matcher.kind, key)
+                )
+        return found
+
+    def close(self):
+        """Close the on-disk database, removing it if it was temporary."""
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+        if self._tempfile is not None:
+            os.remove(self._tempfile)
+            self._tempfile = None
+
+    def __len__(self):
+        return self.key_count
+
+
+def _records(marc_target):
+    """Iterate over the records of `marc_target`, a reader or something to read."""
+    if hasattr(marc_target, "read") or isinstance(marc_target, bytes):
+        return MARCReader(marc_target)
+    return iter(marc_target)
+
+
+def build_index(
+    marc_target, matchers=DEFAULT_MATCHERS, record_id=default_record_id, **kwargs
+):
+    """Build a :class:`MatchIndex` from the records of `marc_target`.
+
+    `marc_target` is anything :class:`MARCReader <pymarc.reader.MARCReader>`
+    accepts, or an iterable of records. `record_id` is a callable giving the id
+    a record is indexed under; records without id are indexed under their
+    position in the file. Other keyword arguments (`path`, `max_keys`) are
+    passed to :class:`MatchIndex`.
+    """
+    index = MatchIndex(matchers, **kwargs)
+    for position, record in enumerate(_records(marc_target)):
+        if record is None:
+            continue
+        rid = record_id(record)
+        index.add(record, position if rid is None else rid)
+    return index
+
+
+def find_matches(index, marc_target, record_id=default_record_id, kinds=None):
+    """Stream the records of `marc_target` against `index`, yielding matches.
+
+    `kinds` restricts the reported matches to EXACT or CANDIDATE ones. Only
+    one record of `marc_target` is held in memory at a time.
+    """
+    for position, record in enumerate(_records(marc_target)):
+        if record is None:
+            continue
+        rid = record_id(record)
+        for match in index.matches(record, position if rid is None else rid):
+            if kinds is None or match.kind in kinds:
+                yield match
@@ -0,0 +1,293 @@
+# This file is part of pymarc. It is subject to the license terms in the
+# LICENSE file found in the top-level directory of this distribution and at
+# https://opensource.org/licenses/BSD-2-Clause. pymarc may be copied, modified,
+# propagated, or distributed according to the terms contained in the LICENSE
+# file.
+
+"""Record-level diff and patch.
+
+:func:`diff_records` compares two records field by field, keeping track of the
+field order, and returns a patch: a list of operations that
+:func:`apply_patch` replays on the old record to get the new one. A patch
+only contains lists, strings and integers so it can be serialized as JSON.
+
+Operations are applied in order, positions refer to the record being patched:
+
+* ``["L", leader]`` sets the leader.
+* ``["-", pos, tag]`` removes the field at `pos`.
+* ``["+", pos, field]`` inserts `field`, in MARC-in-JSON, at `pos`.
+* ``["~", pos, tag, changes]`` changes the field at `pos`, `changes` being:
+
+  * ``["=", data]`` sets the data of a control field.
+  * ``["i", ind1, ind2]`` sets the indicators.
+  * ``["-", pos]`` removes the subfield at `pos`.
+  * ``["+", pos, code, value]`` inserts a subfield at `pos`.
+  * ``["~", pos, value]`` sets the value of the subfield at `pos`.
+
+.. code-block:: python
+
+    patch = diff_records(yesterday, today)
+    apply_patch(yesterday, patch)  # yesterday now has the content of today
+
+:func:`diff_files` streams the differences between two files sorted by 001
+(see :func:`pymarc.sort.sort_records`) as a patch file, :func:`patch_file`
+applies it.
+"""
+
+from difflib import SequenceMatcher
+import json
+
+from pymarc.leader import Leader
+from pymarc.marcjson import dict_to_field, dict_to_record
+from pymarc.reader import iter_marc_chunks
+from pymarc.record import Record
+from pymarc.sort import field_key
+
+
+def field_to_dict(field):
+    """Convert a field to its MARC-in-JSON representation."""
+    if field.is_control_field():
+        return {field.tag: field.data}
+    return {
+        field.tag: {
+            "ind1": field.indicator1,
+            "ind2": field.indicator2,
+            "subfields": [{code: value} for code, value in field],
+        }
+    }
+
+
+def _signature(field):
+    """Hashable content of a field, used to align the fields of two records."""
+    if field.is_control_field():
+        return (field.tag, field.data)
+    return (field.tag, tuple(field.indicators), tuple(field.subfields))
+
+
+def _align(old, new):
+    """Yield the opcodes aligning the `old` and `new` sequences.
+
+    Replaced blocks are split into pairs of matching items, then removals and
+    insertions of the leftovers.
+    """
+    matcher = SequenceMatcher(None, old, new, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            yield "=", i2 - i1, None, None
+        elif tag == "replace":
+            for k in range(min(i2 - i1, j2 - j1)):
+                yield "~", 1, i1 + k, j1 + k
+            for i in range(i1 + j2 - j1, i2):
+                yield "-", 1, i, None
+            for j in range(j1 + i2 - i1, j2):
+                yield "+", 1, None, j
+        elif tag == "delete":
+            for i in range(i1, i2):
+                yield "-", 1, i, None
+        else:
+            for j in range(j1, j2):
+                yield "+", 1, None, j
+
+
+def diff_fields(old, new):
+    """Return the changes turning the field `old` into `new`, which share a tag."""
+    if old.is_control_field():
+        if old.data == new.data:
+            return []
+        return [["=", new.data]]
+
+    changes = []
+    if old.indicators[:2] != new.indicators[:2]:
+        changes.append(["i", new.indicator1, new.indicator2])
+    old_pairs = list(old)
+    new_pairs = list(new)
+    pos = 0
+    for op, count, i, j in _align(old_pairs, new_pairs):
+        if op == "=":
+            pos += count
+        elif op == "-":
+            changes.append(["-", pos])
+        elif op == "+":
+            changes.append(["+", pos, new_pairs[j][0], new_pairs[j][1]])
+            pos += 1
+        elif old_pairs[i][0] == new_pairs[j][0]:
+            changes.append(["~", pos, new_pairs[j][1]])
+            pos += 1
+        else:
+            changes.append(["-", pos])
+            changes.append(["+", pos, new_pairs[j][0], new_pairs[j][1]])
+            pos += 1
+    return changes
+
+
+def diff_records(old, new):
+    """Return the patch turning the record `old` into `new`.
+
+    An empty list means the records are equal. Leader positions 0-4 and 12-16,
+    which :func:`Record.as_marc <pymarc.record.Record.as_marc>` recomputes,
+    are not compared.
+    """
+    patch = []
+    old_leader, new_leader = str(old.leader), str(new.leader)
+    if old_leader[5:12] + old_leader[17:] != new_leader[5:12] + new_leader[17:]:
+        patch.append(["L", new_leader])
+
+    old_fields, new_fields = old.fields, new.fields
+    pos = 0
+    for op, count, i, j in _align(
+        [_signature(f) for f in old_fields], [_signature(f) for f in new_fields]
+    ):
+        if op == "=":
+            pos += count
+        elif op == "-":
+            patch.append(["-", pos, old_fields[i].tag])
+        elif op == "+":
+            patch.append(["+", pos, field_to_dict(new_fields[j])])
+            pos += 1
+        elif old_fields[i].tag == new_fields[j].tag:
+            changes = diff_fields(old_fields[i], new_fields[j])
+            patch.append(["~", pos, old_fields[i].tag, changes])
+            pos += 1
+        else:
+            patch.append(["-", pos, old_fields[i].tag])
+            patch.append(["+", pos, field_to_dict(new_fields[j])])
+            pos += 1
+    return patch
+
+
+def _check_tag(field, tag, pos):
+    """Make sure a patch operation targets the expected field."""
+    if field.tag != tag:
+        raise ValueError(
+            "patch expects %s at position %d, found %s" % (tag, pos, field.tag)
+        )
+
+
+def apply_patch(record, patch):
+    """Apply `patch`, made by :func:`diff_records`, to `record` in place.
+
+    Returns the record. Raises ValueError if the patch does not fit the record.
+    """
+    fields = record.fields
+    for operation in patch:
+        op = operation[0]
+        if op == "L":
+            record.leader = Leader(operation[1])
+        elif op == "-":
+            _check_tag(fields[operation[1]], operation[2], operation[1])
+            del fields[operation[1]]
+        elif op == "+":
+            fields.insert(operation[1], dict_to_field(operation[2]))
+        elif op == "~":
+            field = fields[operation[1]]
+            _check_tag(field, operation[2], operation[1])
+            _apply_field_changes(field, operation[3])
+        else:
+            raise ValueError("unknown patch operation %r" % op)
+    return record
+
+
+def _apply_field_changes(field, changes):
+    """Apply the changes of a ``"~"`` patch operation to `field`."""
+    for change in changes:
+        op = change[0]
+        if op == "=":
+            field.data = change[1]
+        elif op == "i":
+            field.indicators = [change[1], change[2]]
+        elif op == "-":
+            del field.subfields[change[1] * 2 : change[1] * 2 + 2]
+        elif op == "+":
+            field.add_subfield(change[2], change[3], change[1])
+        elif op == "~":
+            field.subfields[change[1] * 2 + 1] = change[2]
+        else:
+            raise ValueError("unknown field patch operation %r" % op)
+
+
+def _keyed_records(marc_target, key, **kwargs):
+    """Yield (key, chunk, record) for the records of a file sorted by `key`."""
+    last_key = None
+    for chunk in iter_marc_chunks(marc_target):
+        record = Record(chunk, **kwargs)
+        record_key = key(record)
+        if last_key is not None and record_key <= last_key:
+            raise ValueError(
+                "records are not sorted by key: %r after %r" % (record_key, last_key)
+            )
+        last_key = record_key
+        yield record_key, chunk, record
+
+
+def diff_files(old_target, new_target, out, key="001", **kwargs):
+    """Write the differences between two MARC files to `out` as a patch file.
+
+    Both files must be sorted on `key` (a callable or field path, see
+    :func:`pymarc.sort.field_key`) without duplicates; they are read as streams
+    and joined on that key. `out` is a text file-like object which receives
+    one JSON object per line:
+
+    * ``{"id": key, "op": "delete"}`` for a record only in the old file.
+    * ``{"id": key, "op": "add", "record": {...}}`` for a record only in the
+      new file, in MARC-in-JSON.
+    * ``{"id": key, "op": "change", "patch": [...]}`` for a changed record.
+
+    Other keyword arguments are passed to :class:`Record
+    <pymarc.record.Record>`. Returns the number of lines written.
+    """
+    if not callable(key):
+        key = field_key(key)
+    old_records = _keyed_records(old_target, key, **kwargs)
+    new_records = _keyed_records(new_target, key, **kwargs)
+    old = next(old_records, None)
+    new = next(new_records, None)
+    count = 0
+    while old is not None or new is not None:
+        if new is None or (old is not None and old[0] < new[0]):
+            entry = {"id": old[0], "op": "delete"}
+            old = next(old_records, None)
+        elif old is None or new[0] < old[0]:
+            entry = {"id": new[0], "op": "add", "record": new[2].as_dict()}
+            new = next(new_records, None)
+        else:
+            # identical bytes need no diff at all
+            patch = [] if old[1] == new[1] else diff_records(old[2], new[2])
+            entry = {"id": new[0], "op": "change", "patch": patch} if patch else None
+            old = next(old_records, None)
+            new = next(new_records, None)
+        if entry is not None:
+            out.write(json.dumps(entry, separators=(",", ":")) + "\n")
+            count += 1
+    return count
+
+
+def patch_file(marc_target, patch_target, writer, key="001", **kwargs):
+    """Apply a patch file made by :func:`diff_files` to a MARC file.
+
+    `marc_target` is the old file, sorted on `key`, `patch_target` a text
+    file-like object with the patch and `writer` a :class:`Writer
+    <pymarc.writer.Writer>` receiving the records of the new file. The writer
+    is not closed.
+    """
+    if not callable(key):
+        key = field_key(key)
+    records = _keyed_records(marc_target, key, **kwargs)
+    current = next(records, None)
+    for line in patch_target:
+        if not line.strip():
+            continue
+        entry = json.loads(line)
+        while current is not None and current[0] < entry["id"]:
+            writer.write(current[2])
+            current = next(records, None)
+        if entry["op"] == "add":
+            writer.write(dict_to_record(entry["record"]))
+            continue
+        if current is None or current[0] != entry["id"]:
+            raise ValueError("record %r not found" % entry["id"])
+        if entry["op"] == "change":
+            writer.write(apply_patch(current[2], entry["patch"]))
+        current = next(records, None)
+    while current is not None:
+        writer.write(current[2])
+        current = next(records, None)
@@ -86,3 +86,16 @@ class BadLeaderValue(PymarcException):
     """Error when setting a leader value."""
 
     pass
+
+
+class MARCMakerLineInvalid(PymarcException):
+    """A line of a MARCMaker file is not a field."""
+
+    def __init__(self, line_number, line):
+        """Keep the number and text of the invalid line."""
+        super().__init__(line_number, line)
+        self.line_number = line_number
+        self.line = line
+
+    def __str__(self):
+        return "Invalid MARCMaker line %d: %r" % (self.line_number, self.line)
@@ -6,11 +6,27 @@
 
 """The pymarc.field file."""
 
+import hashlib
 import logging
+import sys
 
 from pymarc.constants import SUBFIELD_INDICATOR, END_OF_FIELD
 from pymarc.marc8 import marc8_to_unicode
 
+END_OF_FIELD_BYTES = END_OF_FIELD.encode("ascii")
+
+# the attributes of the fields kept by _field_text, _control, _raw and _index
+# are caches
+_CONTROL_FIELD_STATE = frozenset(("tag", "_control", "data"))
+_DATA_FIELD_STATE = frozenset(
+    ("tag", "_control", "indicators", "subfields", "_raw", "_index")
+)
+
+# the tags already normalized by Field mapped to their interned string and
+# whether they are control field tags, see _tag_entry
+_TAGS = {}
+_TAGS_SIZE = 4096
+
 
 class Field:
     """Field() pass in the field tag, indicators and subfields for the tag.
@@ -34,6 +50,17 @@ class Field:
         field = Field(tag='001', data='fol05731351')
     """
 
+    # raw UTF-8 bytes of a data field as read from a record, without the end
+    # of field, with copies of the indicators and subfields they were decoded
+    # to: the bytes are only used while the field still has those values
+    _raw = None
+
+    # lazily built index of subfield codes, see `_subfield_index`
+    _index = None
+
+    # whether the field was made as a control field, see `is_control_field`
+    _control = None
+
     def __init__(self, tag, indicators=None, subfields=None, data=u""):
         """Initialize a field `tag`."""
         if indicators is None:
@@ -42,22 +69,47 @@ class Field:
             subfields = []
         indicators = [str(x) for x in indicators]
 
-        # attempt to normalize integer tags if necessary
+        # normalize the tag, integer tags in particular, see _tag_entry
         try:
-            self.tag = "%03i" % int(tag)
-        except ValueError:
-            self.tag = "%03s" % tag
+            self.tag, self._control = _TAGS[tag]
+        except (KeyError, TypeError):
+            self.tag, self._control = _tag_entry(tag)
 
-        # assume controlfields are numeric only; replicates ruby-marc behavior
-        if self.tag < "010" and self.tag.isdigit():
+        if self._control:
             self.data = data
         else:
             self.indicators = indicators
             self.subfields = subfields
 
+    def __reduce_ex__(self, protocol):
+        """Pickle the field compactly, as its tag and data in transmission format.
+
+        Fields which can't be rebuilt exactly from them, see `_field_text`,
+        are pickled as usual.
+        """
+        text = _field_text(self)
+        if text is None:
+            return super().__reduce_ex__(protocol)
+        return _field_from_text, (self.tag, text)
+
+    def __copy__(self):
+        """Return a shallow copy of the field, like copy.copy does by default."""
+        field = self.__class__.__new__(self.__class__)
+        field.__dict__.update(self.__dict__)
+        return field
+
     def __iter__(self):
-        self.__pos = 0
-        return self
+        """Iterate over the (code, value) tuples of the subfields.
+
+        Each call returns a new iterator, so a field can be iterated over in
+        nested loops or from several threads at once.
+        """
+        try:
+            subfields = iter(self.subfields)
+        except AttributeError:
+            return iter(())
+        # pairs consecutive items of the same iterator
+        return zip(subfields, subfields)
 
     def __str__(self):
         """String representation of the field.
@@ -95,9 +147,9 @@ class Field:
 
         Handy for quick lookups.
         """
-        subfields = self.get_subfields(subfield)
-        if len(subfields) > 0:
-            return subfields[0]
+        positions = self._subfield_index().get(subfield)
+        if positions:
+            return self.subfields[positions[0] * 2 + 1]
         return None
 
     def __contains__(self, subfield):
@@ -108,8 +160,7 @@ class Field:
             'a' in field
 
         """
-        subfields = self.get_subfields(subfield)
-        return len(subfields) > 0
+        return subfield in self._subfield_index()
 
     def __setitem__(self, code, value):
         """Set the values of the subfield code in a field.
@@ -120,26 +171,46 @@ class Field:
 
         Raises KeyError if there is more than one subfield code.
         """
-        subfields = self.get_subfields(code)
-        if len(subfields) > 1:
+        positions = self._subfield_index().get(code, ())
+        if len(positions) > 1:
             raise KeyError("more than one code '%s'" % code)
-        elif len(subfields) == 0:
+        elif len(positions) == 0:
             raise KeyError("no code '%s'" % code)
-        num_code = len(self.subfields) // 2
-        while num_code >= 0:
-            if self.subfields[(num_code * 2) - 2] == code:
-                self.subfields[(num_code * 2) - 1] = value
-                break
-            num_code -= 1
-
-    def __next__(self):
-        if not hasattr(self, "subfields"):
-            raise StopIteration
-        while self.__pos < len(self.subfields):
-            subfield = (self.subfields[self.__pos], self.subfields[self.__pos + 1])
-            self.__pos += 2
-            return subfield
-        raise StopIteration
+        self.subfields[positions[0] * 2 + 1] = value
+
+    def _subfield_index(self):
+        """Returns a dict of the positions of each subfield code in the field.
+
+        The index is built on first use with the codes it was built from, and
+        rebuilt whenever the codes of the subfields differ, however the
+        subfields were changed.
+        """
+        try:
+            codes = self.subfields[0::2]
+        except AttributeError:
+            return {}
+        index = self._index
+        if index is None or index[0] != codes:
+            positions = {}
+            for position, code in enumerate(codes):
+                if code in positions:
+                    positions[code].append(position)
+                else:
+                    positions[code] = [position]
+            index = self._index = (codes, positions)
+        return index[1]
+
+    def pairs(self):
+        """Returns the subfields as a list of (code, value) tuples.
+
+        .. code-block:: python
+
+            for code, value in field.pairs():
+                print(code, value)
+
+        A control field has no subfields and returns an empty list.
+        """
+        return list(self)
 
     def value(self):
         """Returns the field as a string w/ tag, indicators, and subfield indicators."""
@@ -162,11 +233,13 @@ class Field:
             print(field.get_subfields('a'))
             print(field.get_subfields('a', 'b', 'z'))
         """
-        values = []
-        for subfield in self:
-            if subfield[0] in codes:
-                values.append(subfield[1])
-        return values
+        index = self._subfield_index()
+        subfields = self.subfields if index else ()
+        if len(codes) == 1:
+            positions = index.get(codes[0], ())
+        else:
+            positions = sorted(p for code in set(codes) for p in index.get(code, ()))
+        return [subfields[position * 2 + 1] for position in positions]
 
     def add_subfield(self, code, value, pos=None):
         """Adds a subfield code/value to the end of a field or at a position (pos).
@@ -197,25 +270,26 @@ class Field:
 
         If no subfield is found with the specified code None is returned.
         """
-        try:
-            index = self.subfields.index(code)
-            if index % 2 == 0:
-                value = self.subfields.pop(index + 1)
-                self.subfields.pop(index)
-                return value
-            else:
-                return None
-        except ValueError:
+        positions = self._subfield_index().get(code)
+        if not positions:
             return None
+        index = positions[0] * 2
+        value = self.subfields.pop(index + 1)
+        self.subfields.pop(index)
+        return value
 
     def is_control_field(self):
         """Returns true or false if the field is considered a control field.
 
-        Control fields lack indicators and subfields.
+        Control fields lack indicators and subfields. Whether a field is one is
+        decided by its tag when the field is made, changing the tag later
+        doesn't turn a data field into a control field or the reverse.
         """
-        if self.tag < "010" and self.tag.isdigit():
-            return True
-        return False
+        control = self._control
+        if control is None:
+            # a field made without Field(), e.g. unpickled from older pymarc
+            return self.tag < "010" and self.tag.isdigit()
+        return control
 
     def as_marc(self, encoding):
         """Used during conversion of a field to raw marc."""
@@ -230,6 +304,25 @@ class Field:
     # alias for backwards compatibility
     as_marc21 = as_marc
 
+    def _canonical(self):
+        """The field serialized as UTF-8 MARC21, from the raw bytes if possible."""
+        raw = self._raw
+        if raw is not None and raw[1] == self.indicators and raw[2] == self.subfields:
+            return raw[0] + END_OF_FIELD_BYTES
+        return self.as_marc(encoding="utf-8")
+
+    def fingerprint(self):
+        """Returns a stable digest of the tag and content of the field.
+
+        Two fields with the same tag, indicators and subfields have the same
+        fingerprint. Fields read from a UTF-8 record with `keep_raw` set are
+        hashed straight from their raw bytes as long as their indicators and
+        subfields are unchanged, however they are modified.
+        """
+        digest = hashlib.blake2b(self.tag.encode("utf-8"), digest_size=16)
+        digest.update(self._canonical())
+        return digest.hexdigest()
+
     def format_field(self):
         """Returns the field as a string w/ tag, indicators, and subfield indicators.
 
@@ -281,6 +374,112 @@ class Field:
         self.indicators[1] = value
 
 
+def _field_text(field):
+    """Return the data of `field` in transmission format, as a string.
+
+    The indicators and subfields are written as they are, without end of
+    field. None is returned for a field that _field_from_text wouldn't rebuild
+    exactly: one of a subclass of Field or with other attributes, whose values
+    are not strings, indicators and subfield codes not one character long, or
+    data holding subfield indicators.
+    """
+    if type(field) is not Field or type(field.tag) is not str:
+        return None
+    state = field.__dict__.keys()
+    control = field.is_control_field()
+    # _field_from_text tells control fields by their tag
+    if control != (field.tag < "010" and field.tag.isdigit()):
+        return None
+    try:
+        if control:
+            if state <= _CONTROL_FIELD_STATE and type(field.data) is str:
+                return field.data
+            return None
+        if not state <= _DATA_FIELD_STATE:
+            return None
+        first, second = field.indicators
+        subfields = field.subfields
+        codes = subfields[0::2]
+        if (
+            len(first) != 1
+            or len(second) != 1
+            or len(subfields) % 2
+            or len("".join(codes)) != len(codes)
+        ):
+            return None
+        text = first + second
+        text += "".join(
+            [
+                SUBFIELD_INDICATOR + code + value
+                for code, value in zip(codes, subfields[1::2])
+            ]
+        )
+    except (TypeError, ValueError):
+        return None
+    if text.count(SUBFIELD_INDICATOR) != len(codes):
+        return None
+    return text
+
+
+def _field_from_text(tag, text):
+    """Return the field `tag` of data `text`, as returned by `_field_text`."""
+    field = Field.__new__(Field)
+    # the tag is kept as it is, only interned if it's already normalized
+    field.tag, field._control = _TAGS.get(tag) or (
+        tag,
+        tag < "010" and tag.isdigit(),
+    )
+    if field._control:
+        field.data = text
+    else:
+        parts = text.split(SUBFIELD_INDICATOR)
+        field.indicators = list(parts[0])
+        field.subfields = [item for part in parts[1:] for item in (part[0], part[1:])]
+    return field
+
+
+def _tag_entry(tag):
+    """Return `tag` normalized as Field does and whether it's a control field tag.
+
+    Integer tags are written with 3 digits, other tags padded to 3 characters.
+    Control fields are assumed to have numeric tags only, which replicates
+    ruby-marc behavior. The tag returned is interned, and the tags which were
+    already normalized are added to the table shared by all the fields, so
+    that looking them up is enough the next time.
+    """
+    # attempt to normalize integer tags if necessary
+    try:
+        normalized = "%03i" % int(tag)
+    except ValueError:
+        normalized = "%03s" % tag
+    normalized = sys.intern(normalized)
+    entry = (normalized, normalized < "010" and normalized.isdigit())
+    if type(tag) is str and tag == normalized and len(_TAGS) < _TAGS_SIZE:
+        _TAGS[normalized] = entry
+    return entry
+
+
+def _new_field(tag, indicators=None, subfields=None, data="", cls=Field):
+    """Return a new `cls` field, as Field() would but trusting its arguments.
+
+    The readers build the values of the fields themselves: the indicators
+    are already strings and the lists given are kept as they are. The tag is
+    normalized like Field does, through the shared table of tags.
+    """
+    field = cls.__new__(cls)
+    try:
+        field.tag, control = _TAGS[tag]
+    except KeyError:
+        field.tag, control = _tag_entry(tag)
+    field._control = control
+    if control:
+        field.data = data
+    else:
+        field.indicators = [] if indicators is None else indicators
+        field.subfields = [] if subfields is None else subfields
+    return field
+
+
 class RawField(Field):
     """MARC field that keeps data in raw, undecoded byte strings.
 
@@ -292,11 +491,19 @@ class RawField(Field):
         if encoding is not None:
             logging.warn("Attempt to force a RawField into encoding %s", encoding)
         if self.is_control_field():
-            return self.data + END_OF_FIELD
+            return self.data + END_OF_FIELD_BYTES
         marc = self.indicator1.encode("ascii") + self.indicator2.encode("ascii")
         for subfield in self:
-            marc += SUBFIELD_INDICATOR.encode("ascii") + subfield[0] + subfield[1]
-        return marc + END_OF_FIELD
+            marc += (
+                SUBFIELD_INDICATOR.encode("ascii")
+                + subfield[0].encode("ascii")
+                + subfield[1]
+            )
+        return marc + END_OF_FIELD_BYTES
+
+    def _canonical(self):
+        """The field as raw MARC21, which is already bytes."""
+        return self.as_marc()
 
 
 def map_marc8_field(f):
@@ -5,9 +5,17 @@
 # file.
 
 """The pymarc.leader file."""
+import re
+
 from pymarc.constants import LEADER_LEN
 from pymarc.exceptions import BadLeaderValue, RecordLeaderInvalid
 
+# single character strings for each byte value, to read a position without
+# decoding
+_CHARS = tuple(chr(i) for i in range(256))
+
+_non_ascii = re.compile(rb"[\x80-\xff]").search
+
 
 class Leader(object):
     """Mutable leader.
@@ -31,6 +39,7 @@ class Leader(object):
         leader[5] # returns the status "a"
         leader[5] = "b" # sets the status to "b"
         str(leader)  # "00475bas a2200169 i 4500"
+        leader == "00475bas a2200169 i 4500"  # True
 
     Usually the leader is accessed through the `leader` property of a record.
 
@@ -45,6 +54,10 @@ class Leader(object):
     When creating/updating a `Record` please note that `record_length` and
     `base_address` will only be generated in the marc21 output of
     :func:`record.as_marc() <pymarc.record.Record.as_marc>`
+
+    The leader is stored as a fixed 24 bytes `bytearray` which setters update in
+    place, characters outside latin-1 being replaced by ``?``. A leader can be
+    built straight from a raw record with :func:`Leader.from_bytes`.
     """
 
     def __init__(self, leader):
@@ -52,7 +65,53 @@ class Leader(object):
         """Leader is initialized with a string."""
         if len(leader) != LEADER_LEN:
             raise RecordLeaderInvalid
-        self.leader = leader
+        self._set_data(bytearray(leader.encode("latin-1", "replace")))
+
+    @classmethod
+    def from_bytes(cls, data):
+        # type: (bytes) -> Leader
+        """Build a leader from the first 24 bytes of `data`, e.g. a raw record.
+
+        The bytes are copied as is, without decoding them to a string first.
+        Raises RecordLeaderInvalid if they are too short and UnicodeDecodeError if
+        they are not ASCII.
+        """
+        if len(data) < LEADER_LEN:
+            raise RecordLeaderInvalid
+        raw = bytearray(data[:LEADER_LEN])
+        non_ascii = _non_ascii(raw)
+        if non_ascii:
+            raise UnicodeDecodeError(
+                "ascii", bytes(raw), non_ascii.start(), non_ascii.end(), "not ASCII"
+            )
+        leader = cls.__new__(cls)
+        leader._set_data(raw)
+        return leader
+
+    def _set_data(self, data):
+        # type: (bytearray)
+        """Use `data` as the leader content and refresh the cached values."""
+        self._data = data
+        self._str = None
+        self._type_of_record = _CHARS[data[6]]
+        self._bibliographic_level = _CHARS[data[7]]
+        self._coding_scheme = _CHARS[data[9]]
+
+    @property
+    def leader(self):
+        # type: () -> str
+        """The leader as a string."""
+        if self._str is None:
+            self._str = self._data.decode("latin-1")
+        return self._str
+
+    @leader.setter
+    def leader(self, value):
+        # type: (str)
+        """Replace the whole leader by a 24 characters string."""
+        if len(value) != LEADER_LEN:
+            raise RecordLeaderInvalid
+        self._set_data(bytearray(value.encode("latin-1", "replace")))
 
     def __getitem__(self, item):
         # type: (str) -> str
@@ -60,8 +119,10 @@ class Leader(object):
 
         leader[:4] == leader.length
         """
-        if isinstance(item, slice) or isinstance(item, int):
-            return self.leader[item]
+        if isinstance(item, int):
+            return _CHARS[self._data[item]]
+        if isinstance(item, slice):
+            return self._data[item].decode("latin-1")
         return getattr(self, item)
 
     def __setitem__(self, item, value):
@@ -79,11 +140,35 @@ class Leader(object):
         else:
             setattr(self, item, value)
 
+    def __len__(self):
+        # type: () -> int
+        """The length of a leader, always 24."""
+        return LEADER_LEN
+
     def __str__(self):
         # type: () -> str
         """A string representation of the leader."""
         return self.leader
 
+    def __eq__(self, other):
+        # type: (object) -> bool
+        """A leader is equal to another leader or a string of the same value."""
+        if isinstance(other, Leader):
+            return self._data == other._data
+        if isinstance(other, str):
+            return self.leader == other
+        return NotImplemented
+
+    def __hash__(self):
+        # type: () -> int
+        """The hash of the leader as a string, which it is equal to."""
+        return hash(self.leader)
+
+    def __bytes__(self):
+        # type: () -> bytes
+        """The leader as bytes, as found in a raw record."""
+        return bytes(self._data)
+
     def _replace_values(self, position, value):
         # type: (int, str) -> str
         """Replaces the values in the leader at `position` by `value`."""
@@ -94,13 +179,19 @@ class Leader(object):
             raise BadLeaderValue(
                 "%s is too long to be inserted at %d" % (value, position)
             )
-        self.leader = self.leader[:position] + value + self.leader[after:]
+        data = self._data
+        data[position:after] = value.encode("latin-1", "replace")
+        self._str = None
+        if position <= 9 and after > 6:
+            self._type_of_record = _CHARS[data[6]]
+            self._bibliographic_level = _CHARS[data[7]]
+            self._coding_scheme = _CHARS[data[9]]
 
     @property
     def record_length(self):
         # type: () -> str
         """Record length (00-04)."""
-        return self.leader[:5]
+        return self[:5]
 
     @record_length.setter
     def record_length(self, value):
@@ -114,7 +205,7 @@ class Leader(object):
     def record_status(self):
         # type: () -> str
         """Record status (05)."""
-        return self.leader[5]
+        return self[5]
 
     @record_status.setter
     def record_status(self, value):
@@ -128,7 +219,7 @@ class Leader(object):
     def type_of_record(self):
         # type: () -> str
         """Type of record (06)."""
-        return self.leader[6]
+        return self._type_of_record
 
     @type_of_record.setter
     def type_of_record(self, value):
@@ -142,7 +233,7 @@ class Leader(object):
     def bibliographic_level(self):
         # type: () -> str
         """Bibliographic level (07)."""
-        return self.leader[7]
+        return self._bibliographic_level
 
     @bibliographic_level.setter
     def bibliographic_level(self, value):
@@ -156,7 +247,7 @@ class Leader(object):
     def type_of_control(self):
         # type: () -> str
         """Type of control (08)."""
-        return self.leader[8]
+        return self[8]
 
     @type_of_control.setter
     def type_of_control(self, value):
@@ -170,7 +261,7 @@ class Leader(object):
     def coding_scheme(self):
         # type: () -> str
         """Character coding scheme (09)."""
-        return self.leader[9]
+        return self._coding_scheme
 
     @coding_scheme.setter
     def coding_scheme(self, value):
@@ -186,7 +277,7 @@ class Leader(object):
     def indicator_count(self):
         # type: () -> str
         """Indicator count (10)."""
-        return self.leader[10]
+        return self[10]
 
     @indicator_count.setter
     def indicator_count(self, value):
@@ -200,7 +291,7 @@ class Leader(object):
     def subfield_code_count(self):
         # type: () -> str
         """Subfield code count (11)."""
-        return self.leader[11]
+        return self[11]
 
     @subfield_code_count.setter
     def subfield_code_count(self, value):
@@ -214,7 +305,7 @@ class Leader(object):
     def base_address(self):
         # type: () -> str
         """Base address of data (12-16)."""
-        return self.leader[12:17]
+        return self[12:17]
 
     @base_address.setter
     def base_address(self, value):
@@ -230,7 +321,7 @@ class Leader(object):
     def encoding_level(self):
         # type: () -> str
         """Encoding level (17)."""
-        return self.leader[17]
+        return self[17]
 
     @encoding_level.setter
     def encoding_level(self, value):
@@ -244,7 +335,7 @@ class Leader(object):
     def cataloging_form(self):
         # type: () -> str
         """Descriptive cataloging form (18)."""
-        return self.leader[18]
+        return self[18]
 
     @cataloging_form.setter
     def cataloging_form(self, value):
@@ -260,7 +351,7 @@ class Leader(object):
     def multipart_ressource(self):
         # type: () -> str
         """Multipart resource record level (19)."""
-        return self.leader[19]
+        return self[19]
 
     @multipart_ressource.setter
     def multipart_ressource(self, value):
@@ -276,7 +367,7 @@ class Leader(object):
     def length_of_field_length(self):
         # type: () -> str
         """Length of the length-of-field portion (20)."""
-        return self.leader[20]
+        return self[20]
 
     @length_of_field_length.setter
     def length_of_field_length(self, value):
@@ -292,7 +383,7 @@ class Leader(object):
     def starting_character_position_length(self):
         # type: () -> str
         """Length of the starting-character-position portion (21)."""
-        return self.leader[21]
+        return self[21]
 
     @starting_character_position_length.setter
     def starting_character_position_length(self, value):
@@ -309,7 +400,7 @@ class Leader(object):
     def implementation_defined_length(self):
         # type: () -> str
         """Length of the implementation-defined portion (22)."""
-        return self.leader[22]
+        return self[22]
 
     @implementation_defined_length.setter
     def implementation_defined_length(self, value):
@@ -15,16 +15,20 @@ import unicodedata
 from pymarc import marc8_mapping
 
 
-def marc8_to_unicode(marc8, hide_utf8_warnings=False):
+def marc8_to_unicode(marc8, hide_utf8_warnings=False, converter=None):
     """Pass in a string, and get back a Unicode object.
 
+    A `converter` can be passed in to avoid creating one per call, it is
+    reset to the default character sets first.
+
     .. code-block:: python
 
         print marc8_to_unicode(record.title())
     """
-    # XXX: might be good to stash away a converter somehow
-    # instead of always re-creating it
-    converter = MARC8ToUnicode(quiet=hide_utf8_warnings)
+    if converter is None:
+        converter = MARC8ToUnicode(quiet=hide_utf8_warnings)
+    else:
+        converter.reset()
     try:
         return converter.translate(marc8)
     except IndexError:
@@ -78,6 +82,11 @@ class MARC8ToUnicode:
         self.g1_set = set([b")", b"-", b"$"])
         self.quiet = quiet
 
+    def reset(self):
+        """Go back to the default G0 and G1 character sets."""
+        self.g0 = self.basic_latin
+        self.g1 = self.ansel
+
     def translate(self, marc8_string):
         """Translate."""
         # don't choke on empty marc8_string
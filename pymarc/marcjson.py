@@ -4,48 +4,135 @@
 # propagated, or distributed according to the terms contained in the LICENSE
 # file.
 
-"""From JSON to MARC21."""
+"""From JSON to MARC21.
 
-from pymarc import Field, Record, JSONReader
+The records are decoded one at a time from the file, which can be read
+without holding it all in memory:
+
+.. code-block:: python
+
+    for record in iter_json_records('batch.json'):
+        print(record.title())
+"""
+
+import codecs
+from io import StringIO
+import json
+import os
+import re
+
+from pymarc.field import _new_field
+from pymarc.record import Record
+
+# what may come between two records: white space, and the brackets and commas
+# of an array
+_SEPARATORS = re.compile(r"[\s,\[\]]*")
+
+
+def dict_to_field(field_dict):
+    """Return the Field of `field_dict`, a MARC-in-JSON field."""
+    tag, value = next(iter(field_dict.items()))
+    if isinstance(value, dict):
+        # flatten m-i-j dict to list in pymarc
+        subfields = [
+            item
+            for subfield in value["subfields"]
+            for code_value in subfield.items()
+            for item in code_value
+        ]
+        indicators = [str(value["ind1"]), str(value["ind2"])]
+        return _new_field(tag, indicators, subfields)
+    return _new_field(tag, data=value)
+
+
+def dict_to_record(record_dict):
+    """Return the Record of `record_dict`, a MARC-in-JSON record, left unchanged."""
+    record = Record()
+    record.leader = record_dict["leader"]
+    record.fields.extend(map(dict_to_field, record_dict["fields"]))
+    return record
+
+
+def _open(json_file):
+    """Return a file handle of `json_file`: a handle, a path, or JSON text."""
+    if hasattr(json_file, "read") and callable(json_file.read):
+        return json_file
+    if os.path.exists(json_file):
+        return open(json_file, "r", encoding="utf-8")
+    return StringIO(json_file)
+
+
+def iter_json_objects(json_file, block_size=1 << 16, max_size=1 << 24):
+    """Yield the records of `json_file` as they are decoded, as dictionaries.
+
+    `json_file` is a text or binary file-like object, a path or the JSON text
+    itself, holding an array of records, a single record, or records one per
+    line. The file is read by blocks of `block_size` characters, only the
+    record being decoded is kept in memory. JSONDecodeError is raised for
+    invalid JSON, at the latest once more than `max_size` characters are
+    read without completing a record.
+    """
+    file_handle = _open(json_file)
+    decoder = json.JSONDecoder(strict=False)
+    utf8 = codecs.getincrementaldecoder("utf-8")()
+    buffer = ""
+    position = 0
+    eof = False
+    try:
+        while True:
+            position = _SEPARATORS.match(buffer, position).end()
+            if position < len(buffer):
+                try:
+                    record_dict, position = decoder.raw_decode(buffer, position)
+                except json.JSONDecodeError:
+                    # incomplete until the whole file has been read, unless
+                    # it's already longer than any record
+                    if eof or len(buffer) - position > max_size:
+                        raise
+                else:
+                    yield record_dict
+                    continue
+            elif eof:
+                return
+            # read at least as much as is waiting, for big records
+            data = file_handle.read(max(block_size, len(buffer) - position))
+            if isinstance(data, bytes):
+                data = utf8.decode(data, not data)
+            eof = not data
+            buffer = buffer[position:] + data
+            position = 0
+    finally:
+        if file_handle is not json_file:
+            file_handle.close()
+
+
+def iter_json_records(json_file, block_size=1 << 16, max_size=1 << 24):
+    """Yield the records of `json_file` as they are decoded.
+
+    See :func:`iter_json_objects` for what `json_file` can be.
+    """
+    for record_dict in iter_json_objects(json_file, block_size, max_size):
+        yield dict_to_record(record_dict)
 
 
 class JsonHandler:
-    """Handle JSON."""
+    """Handle JSON.
+
+    You can subclass JsonHandler and add your own process_record method that'll
+    be passed a pymarc.Record as it becomes available.
+    """
 
     def __init__(self):
         """Init."""
         self.records = []
-        self._record = None
-        self._field = None
-        self._text = []
 
     def element(self, element_dict, name=None):
-        """Converts a JSON `element_dict` to pymarc fields."""
-        if not name:
-            self._record = Record()
-            self.element(element_dict, "leader")
-        elif name == "leader":
-            self._record.leader = element_dict[name]
-            self.element(element_dict, "fields")
-        elif name == "fields":
-            fields = iter(element_dict[name])
-            for field in fields:
-                tag, remaining = field.popitem()
-                self._field = Field(tag)
-                if self._field.is_control_field():
-                    self._field.data = remaining
-                else:
-                    self.element(remaining, "subfields")
-                    self._field.indicators.extend(
-                        [remaining["ind1"], remaining["ind2"]]
-                    )
-                self._record.add_field(self._field)
-            self.process_record(self._record)
-        elif name == "subfields":
-            subfields = iter(element_dict[name])
-            for subfield in subfields:
-                code, text = subfield.popitem()
-                self._field.add_subfield(code, text)
+        """Converts a JSON record `element_dict` to a pymarc record.
+
+        `element_dict` is not modified. `name` is ignored, it is kept for
+        compatibility.
+        """
+        self.process_record(dict_to_record(element_dict))
 
     def elements(self, dict_list):
         """Sends `dict_list` to `element`."""
@@ -62,6 +149,4 @@ class JsonHandler:
 
 def parse_json_to_array(json_file):
     """JSON to elements."""
-    json_reader = JSONReader(json_file)
-    handler = JsonHandler()
-    return handler.elements(json_reader.records)
+    return list(iter_json_records(json_file))
@@ -4,14 +4,31 @@
 # propagated, or distributed according to the terms contained in the LICENSE
 # file.
 
-"""From XML to MARC21 and back again."""
+"""From XML to MARC21 and back again.
 
+MARCXML is read and written by a backend: ``lxml`` when it is installed, or
+``stdlib``, using :mod:`xml.parsers.expat` and :mod:`xml.etree.ElementTree`.
+Both give the same records and the same XML; the default is the fastest one
+available, :func:`set_xml_backend` changes it and the functions below also
+take a `backend` argument:
+
+.. code-block:: python
+
+    records = parse_xml_to_array('file.xml', backend='stdlib')
+"""
+
+from collections import deque
+from io import BytesIO, TextIOBase
+import multiprocessing
+import re
 import unicodedata
+from xml.parsers import expat
 from xml.sax import make_parser
 from xml.sax.handler import ContentHandler, feature_namespaces
 import xml.etree.ElementTree as ET
 
-from pymarc import Field, MARC8ToUnicode, Record
+from pymarc import MARC8ToUnicode, Record
+from pymarc.field import _new_field
 
 
 XSI_NS = "http://www.w3.org/2001/XMLSchema-instance"
@@ -55,12 +72,12 @@ class XmlHandler(ContentHandler):
             self._record = Record()
         elif element == "controlfield":
             tag = attrs.getValue((None, u"tag"))
-            self._field = Field(tag)
+            self._field = _new_field(tag)
         elif element == "datafield":
             tag = attrs.getValue((None, u"tag"))
             ind1 = attrs.get((None, u"ind1"), u" ")
             ind2 = attrs.get((None, u"ind2"), u" ")
-            self._field = Field(tag, [ind1, ind2])
+            self._field = _new_field(tag, [ind1, ind2])
         elif element == "subfield":
             self._subfield_code = attrs[(None, "code")]
 
@@ -111,7 +128,320 @@ def parse_xml(xml_file, handler):
     parser.parse(xml_file)
 
 
-def map_xml(function, *files):
+def _expat_parser(process_record, strict=False, normalize_form=None):
+    """Return an expat parser calling `process_record` with each record.
+
+    The records are built like by XmlHandler, without the overhead of SAX.
+    """
+    parser = expat.ParserCreate(namespace_separator=" ")
+    parser.buffer_text = True
+    prefix = MARC_XML_NS + " "
+    text = []
+    record = field = subfield_code = None
+
+    def local_name(name):
+        if " " in name:
+            if strict and not name.startswith(prefix):
+                return None
+            return name.rpartition(" ")[2]
+        return None if strict else name
+
+    def start(name, attrs):
+        nonlocal record, field, subfield_code
+        element = local_name(name)
+        if element is None:
+            return
+        text.clear()
+        if element == "record":
+            record = Record()
+        elif element == "controlfield":
+            field = _new_field(attrs["tag"])
+        elif element == "datafield":
+            field = _new_field(
+                attrs["tag"], [attrs.get("ind1", " "), attrs.get("ind2", " ")]
+            )
+        elif element == "subfield":
+            subfield_code = attrs["code"]
+
+    def end(name):
+        nonlocal record, field, subfield_code
+        element = local_name(name)
+        if element is None:
+            return
+        if normalize_form is not None:
+            value = unicodedata.normalize(normalize_form, "".join(text))
+        else:
+            value = "".join(text)
+
+        if element == "record":
+            process_record(record)
+            record = None
+        elif element == "leader":
+            record.leader = value
+        elif element == "controlfield":
+            field.data = value
+            record.add_field(field)
+            field = None
+        elif element == "datafield":
+            record.add_field(field)
+            field = None
+        elif element == "subfield":
+            field.subfields.append(subfield_code)
+            field.subfields.append(value)
+            subfield_code = None
+
+        text.clear()
+
+    parser.StartElementHandler = start
+    parser.EndElementHandler = end
+    parser.CharacterDataHandler = text.append
+    return parser
+
+
+class StdlibXmlBackend:
+    """Reads MARCXML with :mod:`xml.parsers.expat`, writes it with ElementTree."""
+
+    name = "stdlib"
+
+    # bytes fed to the parser at a time
+    block_size = 1 << 16
+
+    def iter_records(self, xml_file, strict=False, normalize_form=None):
+        """Yield the records of `xml_file`, a path or a file-like object."""
+        records = []
+        parser = _expat_parser(records.append, strict, normalize_form)
+        if hasattr(xml_file, "read"):
+            file_handle = xml_file
+        else:
+            file_handle = open(xml_file, "rb")
+        try:
+            while True:
+                data = file_handle.read(self.block_size)
+                if not data:
+                    break
+                parser.Parse(data, False)
+                if records:
+                    yield from records
+                    records.clear()
+            parser.Parse(b"", True)
+            yield from records
+        finally:
+            if file_handle is not xml_file:
+                file_handle.close()
+
+    def record_to_xml_node(self, record, quiet=False, namespace=False):
+        """Return `record` as an :mod:`xml.etree.ElementTree` element."""
+        # helper for converting non-unicode data to unicode
+        # TODO: maybe should set g0 and g1 appropriately using 066 $a and $b?
+        marc8 = MARC8ToUnicode(quiet=quiet)
+
+        def translate(data):
+            if type(data) == str:
+                return data
+            else:
+                return marc8.translate(data)
+
+        root = ET.Element("record")
+        if namespace:
+            root.set("xmlns", MARC_XML_NS)
+            root.set("xmlns:xsi", XSI_NS)
+            root.set("xsi:schemaLocation", MARC_XML_SCHEMA)
+        leader = ET.SubElement(root, "leader")
+        leader.text = str(record.leader)
+        for field in record:
+            if field.is_control_field():
+                control_field = ET.SubElement(root, "controlfield")
+                control_field.set("tag", field.tag)
+                control_field.text = translate(field.data)
+            else:
+                data_field = ET.SubElement(root, "datafield")
+                data_field.set("ind1", field.indicators[0])
+                data_field.set("ind2", field.indicators[1])
+                data_field.set("tag", field.tag)
+                for subfield in field:
+                    data_subfield = ET.SubElement(data_field, "subfield")
+                    data_subfield.set("code", subfield[0])
+                    data_subfield.text = translate(subfield[1])
+
+        return root
+
+    def record_to_xml(self, record, quiet=False, namespace=False, encoding="us-ascii"):
+        """Return `record` as a ``<record>`` element, in bytes of `encoding`."""
+        node = self.record_to_xml_node(record, quiet, namespace)
+        return ET.tostring(node, encoding=encoding)
+
+
+class LxmlBackend(StdlibXmlBackend):
+    """Reads and writes MARCXML with lxml.
+
+    The XML written is the same as the one of ElementTree: the few records
+    lxml would write differently, or not at all, are written by the
+    stdlib backend.
+    """
+
+    name = "lxml"
+
+    def __init__(self):
+        """Raises ImportError if lxml is not installed."""
+        from lxml import etree
+
+        self.etree = etree
+
+    def iter_records(self, xml_file, strict=False, normalize_form=None):
+        """Yield the records of `xml_file`, a path or a file-like object."""
+        if isinstance(xml_file, TextIOBase):
+            # lxml parses bytes
+            yield from StdlibXmlBackend.iter_records(
+                self, xml_file, strict, normalize_form
+            )
+            return
+        tag = "{%s}record" % MARC_XML_NS if strict else "{*}record"
+        for event, element in self.etree.iterparse(
+            xml_file,
+            events=("end",),
+            tag=tag,
+            remove_comments=True,
+            remove_pis=True,
+            huge_tree=True,
+        ):
+            yield self._element_to_record(element, strict, normalize_form)
+            # free the records already read
+            element.clear()
+            while element.getprevious() is not None:
+                del element.getparent()[0]
+
+    def _element_to_record(self, element, strict, normalize_form):
+        record = Record()
+        field = None
+        for child in element.iterdescendants():
+            tag = child.tag
+            if tag[0] == "{":
+                uri, _, name = tag[1:].partition("}")
+                if strict and uri != MARC_XML_NS:
+                    continue
+            elif strict:
+                continue
+            else:
+                name = tag
+
+            # like XmlHandler, the text following the last child if any
+            value = (child[-1].tail if len(child) else child.text) or ""
+            if normalize_form is not None:
+                value = unicodedata.normalize(normalize_form, value)
+
+            if name == "leader":
+                record.leader = value
+            elif name == "controlfield":
+                field = _new_field(child.attrib["tag"])
+                field.data = value
+                record.add_field(field)
+            elif name == "datafield":
+                field = _new_field(
+                    child.attrib["tag"],
+                    [child.get("ind1", " "), child.get("ind2", " ")],
+                )
+                record.add_field(field)
+            elif name == "subfield":
+                field.subfields.append(child.attrib["code"])
+                field.subfields.append(value)
+        return record
+
+    def record_to_xml_node(self, record, quiet=False, namespace=False):
+        """Return `record` as an lxml element."""
+        marc8 = MARC8ToUnicode(quiet=quiet)
+
+        def translate(data):
+            # an empty text is left unset, as lxml would write an end tag
+            if not isinstance(data, str):
+                data = marc8.translate(data)
+            return data or None
+
+        sub_element = self.etree.SubElement
+        if namespace:
+            prefix = "{%s}" % MARC_XML_NS
+            root = self.etree.Element(
+                prefix + "record", nsmap={None: MARC_XML_NS, "xsi": XSI_NS}
+            )
+            root.set("{%s}schemaLocation" % XSI_NS, MARC_XML_SCHEMA)
+        else:
+            prefix = ""
+            root = self.etree.Element("record")
+        leader = sub_element(root, prefix + "leader")
+        leader.text = str(record.leader) or None
+        for field in record:
+            if field.is_control_field():
+                control_field = sub_element(root, prefix + "controlfield")
+                control_field.set("tag", field.tag)
+                control_field.text = translate(field.data)
+            else:
+                data_field = sub_element(root, prefix + "datafield")
+                data_field.set("ind1", field.indicators[0])
+                data_field.set("ind2", field.indicators[1])
+                data_field.set("tag", field.tag)
+                for subfield in field:
+                    data_subfield = sub_element(data_field, prefix + "subfield")
+                    data_subfield.set("code", subfield[0])
+                    data_subfield.text = translate(subfield[1])
+
+        return root
+
+    def record_to_xml(self, record, quiet=False, namespace=False, encoding="us-ascii"):
+        """Return `record` as a ``<record>`` element, in bytes of `encoding`."""
+        # the namespace declarations are written by ElementTree, in its order
+        if not namespace:
+            try:
+                node = self.record_to_xml_node(record, quiet)
+            except ValueError:
+                # control characters, refused by lxml
+                node = None
+            if node is not None:
+                text = self.etree.tostring(node, encoding="unicode")
+                # lxml escapes carriage returns in text and tabs in attributes
+                if "&#13;" not in text and "&#9;" not in text:
+                    return text.replace("/>", " />").encode(
+                        encoding, "xmlcharrefreplace"
+                    )
+        node = StdlibXmlBackend.record_to_xml_node(self, record, quiet, namespace)
+        return ET.tostring(node, encoding=encoding)
+
+
+# the backends, fastest first
+XML_BACKENDS = {"lxml": LxmlBackend, "stdlib": StdlibXmlBackend}
+
+_backends = {}
+_default_backend = None
+
+
+def xml_backend(name=None):
+    """Return the XML backend called `name`, by default the fastest installed.
+
+    Raises ValueError for an unknown backend, ImportError for a backend whose
+    library is not installed.
+    """
+    if name is None:
+        name = _default_backend
+    if name is None:
+        for name in XML_BACKENDS:
+            try:
+                return xml_backend(name)
+            except ImportError:
+                continue
+    if name not in _backends:
+        if name not in XML_BACKENDS:
+            raise ValueError("unknown XML backend: %r" % (name,))
+        _backends[name] = XML_BACKENDS[name]()
+    return _backends[name]
+
+
+def set_xml_backend(name=None):
+    """Use the XML backend called `name` by default, or the fastest if None."""
+    global _default_backend
+    if name is not None:
+        xml_backend(name)
+    _default_backend = name
+
+
+def map_xml(function, *files, backend=None):
     """Map a function onto the file.
 
     So that for each record that is parsed the function will get called with the
@@ -124,13 +454,13 @@ def map_xml(function, *files):
 
         map_xml(do_it, 'marc.xml')
     """
-    handler = XmlHandler()
-    handler.process_record = function
+    backend = xml_backend(backend)
     for xml_file in files:
-        parse_xml(xml_file, handler)
+        for record in backend.iter_records(xml_file):
+            function(record)
 
 
-def parse_xml_to_array(xml_file, strict=False, normalize_form=None):
+def parse_xml_to_array(xml_file, strict=False, normalize_form=None, backend=None):
     """Parse an XML file and return the records as an array.
 
     Instead of passing in a file path you can also pass in an open file handle, or a file
@@ -139,53 +469,235 @@ def parse_xml_to_array(xml_file, strict=False, normalize_form=None):
     normalize_form are 'NFC', 'NFKC', 'NFD', and 'NFKD'. See
     unicodedata.normalize for more info on these.
     """
-    handler = XmlHandler(strict, normalize_form)
-    parse_xml(xml_file, handler)
-    return handler.records
+    return list(xml_backend(backend).iter_records(xml_file, strict, normalize_form))
 
 
-def record_to_xml(record, quiet=False, namespace=False):
-    """From MARC to XML."""
-    node = record_to_xml_node(record, quiet, namespace)
-    return ET.tostring(node)
+class XmlFragmentReader:
+    """Iterate over the raw ``<record>`` elements of a MARCXML document.
 
+    Records are located by scanning the bytes for their start and end tags,
+    prefixed or not, without parsing the XML; each one is yielded as an
+    ``(offset, fragment)`` tuple. Once the first record is found `header`
+    holds everything before it (XML declaration, root start tag) and `footer`
+    the end tags of the elements it is in, so that a group of fragments can be
+    wrapped back into a document using the same namespace prefixes:
 
-def record_to_xml_node(record, quiet=False, namespace=False):
-    """Converts a record object to a chunk of XML.
+    .. code-block:: python
 
-    If you would like to include the marcxml namespace in the root tag set namespace to
-    True.
+        fragments = XmlFragmentReader(open('batch.xml', 'rb'))
+        for offset, fragment in fragments:
+            doc = fragments.header + fragment + fragments.footer
+
+    Comments, CDATA sections, processing instructions and the document type
+    declaration are skipped, empty ``<record/>`` elements are records and
+    records within a record are part of it. A record, or any of these, left
+    unclosed at the end of the file raises ExpatError, as parsing the whole
+    document would.
     """
-    # helper for converting non-unicode data to unicode
-    # TODO: maybe should set g0 and g1 appropriately using 066 $a and $b?
-    marc8 = MARC8ToUnicode(quiet=quiet)
 
-    def translate(data):
-        if type(data) == str:
-            return data
+    # the record tags, and the markup that can hold one without being one
+    markup = re.compile(
+        rb"<(!--|!\[CDATA\[|\?|!DOCTYPE|/?(?:[\w.-]+:)?record(?=[\s/>]))"
+    )
+    markup_ends = {
+        b"!--": re.compile(rb".*?-->", re.S),
+        b"![CDATA[": re.compile(rb".*?\]\]>", re.S),
+        b"?": re.compile(rb".*?\?>", re.S),
+        b"!DOCTYPE": re.compile(
+            rb"""(?:[^\[>"']|"[^"]*"|'[^']*')*(?:\[.*?\]\s*)?>""", re.S
+        ),
+    }
+    # the end of a tag, whose group is "/" for an empty element
+    tag_end = re.compile(rb"""(?:[^>"']|"[^"]*"|'[^']*')*?(/?)>""")
+
+    def __init__(self, xml_file, block_size=1 << 20):
+        """Pass in a file name or a binary file-like object."""
+        if hasattr(xml_file, "read"):
+            self.file_handle = xml_file
         else:
-            return marc8.translate(data)
-
-    root = ET.Element("record")
-    if namespace:
-        root.set("xmlns", MARC_XML_NS)
-        root.set("xmlns:xsi", XSI_NS)
-        root.set("xsi:schemaLocation", MARC_XML_SCHEMA)
-    leader = ET.SubElement(root, "leader")
-    leader.text = str(record.leader)
-    for field in record:
-        if field.is_control_field():
-            control_field = ET.SubElement(root, "controlfield")
-            control_field.set("tag", field.tag)
-            control_field.text = translate(field.data)
+            self.file_handle = open(xml_file, "rb")
+        self.block_size = block_size
+        self.header = None
+        self.footer = None
+        self._buffer = b""
+        # offsets in the file of the buffer and of the first byte still needed
+        self._base = 0
+        self._keep = 0
+        self._eof = False
+
+    def __iter__(self):
+        return self
+
+    def close(self):
+        """Close the handle."""
+        if self.file_handle:
+            self.file_handle.close()
+            self.file_handle = None
+
+    def _fill(self):
+        """Read one more block, returns False at the end of the file."""
+        if self._eof:
+            return False
+        data = self.file_handle.read(self.block_size)
+        if not data:
+            self._eof = True
+            return False
+        # drop what is no longer needed before growing the buffer
+        self._buffer = self._buffer[self._keep - self._base :] + data
+        self._base = self._keep
+        return True
+
+    def _find(self, find, offset):
+        """Call `find`, the search or match method of a pattern, at `offset`.
+
+        More of the file is read until there is a match; None is returned at
+        the end of the file.
+        """
+        while True:
+            match = find(self._buffer, offset - self._base)
+            if match is not None or not self._fill():
+                return match
+
+    def _set_header(self, header):
+        """Keep what comes before the first record and close what it is in."""
+        names = []
+        parser = expat.ParserCreate()
+        parser.StartElementHandler = lambda name, attributes: names.append(name)
+        parser.EndElementHandler = lambda name: names.pop()
+        parser.Parse(header, False)
+        if names:
+            self.header = header
+            self.footer = b"".join(
+                b"</%s>" % name.encode("utf-8") for name in reversed(names)
+            )
         else:
-            data_field = ET.SubElement(root, "datafield")
-            data_field.set("ind1", field.indicators[0])
-            data_field.set("ind2", field.indicators[1])
-            data_field.set("tag", field.tag)
-            for subfield in field:
-                data_subfield = ET.SubElement(data_field, "subfield")
-                data_subfield.set("code", subfield[0])
-                data_subfield.text = translate(subfield[1])
-
-    return root
+            # a lone record, wrap it in a collection
+            self.header = header + b'<collection xmlns="%s">' % MARC_XML_NS.encode()
+            self.footer = b"</collection>"
+
+    def __next__(self):
+        offset = self._keep
+        record = None
+        depth = 0
+        while True:
+            match = self._find(self.markup.search, offset)
+            if match is None:
+                if record is not None:
+                    raise expat.ExpatError("unclosed record at offset %d" % record)
+                if self.header is None:
+                    self.header, self.footer = self._buffer, b""
+                raise StopIteration
+            start = self._base + match.start()
+            token = match.group(1)
+            end = self._find(
+                self.markup_ends.get(token, self.tag_end).match,
+                self._base + match.end(),
+            )
+            if end is None:
+                raise expat.ExpatError("unclosed markup at offset %d" % start)
+            offset = self._base + end.end()
+            if token in self.markup_ends:
+                continue
+            if token.startswith(b"/"):
+                depth -= 1
+            elif not end.group(1):
+                depth += 1
+            if record is None:
+                if depth < 0:
+                    # the end tag of an element that isn't a record
+                    depth = 0
+                    continue
+                record = start
+                if self.header is None:
+                    self._set_header(self._buffer[: start - self._base])
+                self._keep = start
+            if depth == 0:
+                self._keep = offset
+                return record, self._buffer[record - self._base : offset - self._base]
+
+
+def _parse_document(document, strict, normalize_form, backend=None):
+    """Parse the records of a document made by _documents."""
+    return parse_xml_to_array(BytesIO(document), strict, normalize_form, backend)
+
+
+def _documents(fragments, batch_size):
+    """Group the records of an XmlFragmentReader in documents of `batch_size` bytes."""
+    batch = []
+    size = 0
+    for offset, fragment in fragments:
+        batch.append(fragment)
+        size += len(fragment)
+        if size >= batch_size:
+            yield fragments.header + b"".join(batch) + fragments.footer
+            batch = []
+            size = 0
+    if batch:
+        yield fragments.header + b"".join(batch) + fragments.footer
+
+
+def parse_xml_parallel(
+    xml_file,
+    workers=None,
+    strict=False,
+    normalize_form=None,
+    batch_size=1 << 20,
+    block_size=1 << 22,
+    backend=None,
+):
+    """Parse a MARCXML file in `workers` processes, yield its records in order.
+
+    The file, a path or a binary file-like object, is read by blocks of
+    `block_size` bytes in which the records are located by an
+    :class:`XmlFragmentReader`. They are sent to the processes by groups of
+    about `batch_size` bytes, wrapped in the root element of the file, and
+    parsed like by :func:`parse_xml_to_array`, with the same `strict`,
+    `normalize_form` and `backend` options. By default there is one process
+    per CPU.
+
+    .. code-block:: python
+
+        for record in parse_xml_parallel('big.xml', workers=4):
+            print(record.title())
+    """
+    # the processes use the backend of this one
+    backend = xml_backend(backend).name
+    fragments = XmlFragmentReader(xml_file, block_size)
+    try:
+        documents = _documents(fragments, batch_size)
+        if workers == 1:
+            for document in documents:
+                yield from _parse_document(document, strict, normalize_form, backend)
+            return
+        with multiprocessing.Pool(workers) as pool:
+            # at most two documents per process are waiting or being parsed
+            window = 2 * (workers or multiprocessing.cpu_count())
+            pending = deque()
+            for document in documents:
+                pending.append(
+                    pool.apply_async(
+                        _parse_document, (document, strict, normalize_form, backend)
+                    )
+                )
+                if len(pending) >= window:
+                    yield from pending.popleft().get()
+            while pending:
+                yield from pending.popleft().get()
+    finally:
+        if fragments.file_handle is not xml_file:
+            fragments.close()
+
+
+def record_to_xml(record, quiet=False, namespace=False, backend=None):
+    """From MARC to XML."""
+    return xml_backend(backend).record_to_xml(record, quiet, namespace)
+
+
+def record_to_xml_node(record, quiet=False, namespace=False, backend="stdlib"):
+    """Converts a record object to a chunk of XML.
+
+    If you would like to include the marcxml namespace in the root tag set namespace to
+    True. The node is an :mod:`xml.etree.ElementTree` element, or one of the
+    tree API of `backend`, such as ``lxml``, or of the default backend if None.
+    """
+    return xml_backend(backend).record_to_xml_node(record, quiet, namespace)
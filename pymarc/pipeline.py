@@ -0,0 +1,380 @@
+# This file is part of pymarc. It is subject to the license terms in the
+# LICENSE file found in the top-level directory of this distribution and at
+# https://opensource.org/licenses/BSD-2-Clause. pymarc may be copied, modified,
+# propagated, or distributed according to the terms contained in the LICENSE
+# file.
+
+"""Map and filter stages run on the records of many files, in parallel.
+
+A :class:`Pipeline` reads any mix of MARC21, MARCXML, MARC-in-JSON and
+MARCMaker files, runs its stages on each record in a pool of threads or
+processes, and streams the results to a writer or a callable as they come:
+
+.. code-block:: python
+
+    from pymarc import Pipeline, XMLWriter
+
+    def has_isbn(record):
+        return '020' in record
+
+    def strip_notes(record):
+        record.remove_fields('500')
+        return record
+
+    writer = XMLWriter(open('books.xml', 'wb'))
+    pipeline = Pipeline(workers=4, processes=True)
+    pipeline.filter(has_isbn).map(strip_notes)
+    pipeline.run('dump.mrc', 'extra.xml', 'more.json', writer=writer)
+    writer.close()
+
+Only a few batches of records are in flight at once, whatever the size of the
+files, and no result is kept once it is handed over.
+"""
+
+import collections
+from io import BytesIO, StringIO
+import multiprocessing
+from multiprocessing.pool import ThreadPool
+import os
+import queue
+from xml.parsers.expat import ExpatError
+
+from pymarc.exceptions import RecordLengthInvalid
+from pymarc.marcxml import XmlFragmentReader, parse_xml_to_array
+from pymarc.reader import JSONReader, MARCMakerReader, iter_marc_chunks
+from pymarc.record import Record
+from pymarc.stats import Stats
+
+FORMATS = ("marc", "xml", "json", "ndjson", "mrk")
+
+EXTENSIONS = {
+    ".dat": "marc",
+    ".marc": "marc",
+    ".mrc": "marc",
+    ".xml": "xml",
+    ".json": "json",
+    ".jsonl": "ndjson",
+    ".ndjson": "ndjson",
+    ".mrk": "mrk",
+    ".txt": "mrk",
+}
+
+# records sent at once to a worker
+BATCH_SIZE = 256
+
+# the kinds of stages
+MAP = "map"
+FILTER = "filter"
+
+
+def guess_format(path, default="marc"):
+    """Return the format of the file `path` from its extension."""
+    return EXTENSIONS.get(os.path.splitext(path)[1].lower(), default)
+
+
+def sniff_format(file_handle, default="marc"):
+    """Return the format of a binary file from its first bytes.
+
+    The bytes are peeked at, which only buffered files like those returned by
+    open() allow; `default` is returned for the others.
+    """
+    peek = getattr(file_handle, "peek", None)
+    if peek is None:
+        return default
+    start = peek(256).lstrip(b"\xef\xbb\xbf \t\r\n")[:1]
+    if start == b"<":
+        return "xml"
+    if start in (b"[", b"{"):
+        return "json"
+    if start == b"=":
+        return "mrk"
+    return default
+
+
+def _units(file_handle, format, options):
+    """Yield the records of a file as raw data, decoded by _decode.
+
+    MARC21, MARCXML and NDJSON records are yielded undecoded, so that the
+    decoding can be done by worker processes. JSON and MARCMaker files are
+    parsed as they are read: their records, or the exception raised in
+    permissive mode, are yielded.
+    """
+    if format == "marc":
+        try:
+            yield from iter_marc_chunks(file_handle)
+        except RecordLengthInvalid as ex:
+            # the records after this one can't be located
+            yield ex
+    elif format == "xml":
+        reader = XmlFragmentReader(file_handle)
+        try:
+            for offset, fragment in reader:
+                yield reader.header + fragment + reader.footer
+        except ExpatError as ex:
+            # the file ends inside a record
+            yield ex
+    elif format == "ndjson":
+        for line in file_handle:
+            if line.strip():
+                yield line
+    elif format == "json":
+        yield from JSONReader(file_handle, stream=True)
+    else:
+        reader = MARCMakerReader(
+            file_handle, force_utf8=options["force_utf8"], permissive=True
+        )
+        for record in reader:
+            yield record if record is not None else reader.current_exception
+
+
+def _decode(unit, format, options, stats):
+    """Return the record of a unit yielded by _units.
+
+    The anomalies of a MARC21 record are counted in `stats`.
+    """
+    if isinstance(unit, Exception):
+        raise unit
+    if isinstance(unit, Record):
+        return unit
+    if format == "marc":
+        return Record(
+            unit,
+            force_utf8=options["force_utf8"],
+            hide_utf8_warnings=True,
+            utf8_handling=options["utf8_handling"],
+            file_encoding=options["file_encoding"],
+            stats=stats,
+        )
+    if format == "xml":
+        return parse_xml_to_array(BytesIO(unit))[0]
+    return next(iter(JSONReader(StringIO(unit.decode("utf-8")))))
+
+
+def _batches(units, size):
+    batch = []
+    for unit in units:
+        batch.append(unit)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+_job = None
+
+
+def _init_worker(job):
+    global _job
+    _job = job
+
+
+def _run_batch(format, units, job=None):
+    """Decode `units` and run the stages of the job on their records.
+
+    Return the results kept and the Stats of the batch, counting the records
+    decoded and those which failed to, skipped in permissive mode. The job of
+    a worker process is set by _init_worker.
+    """
+    stages, options, permissive, timing = job or _job
+    results = []
+    stats = Stats(timing=timing)
+    for unit in units:
+        try:
+            value = _decode(unit, format, options, stats)
+        except Exception as ex:
+            if not permissive:
+                raise
+            stats.count_error(ex)
+            continue
+        stats.count_record()
+        for kind, function in stages:
+            if kind == MAP:
+                value = function(value)
+            elif not function(value):
+                break
+        else:
+            results.append(value)
+    return results, stats
+
+
+class Pipeline:
+    """Map and filter stages run on the records of many files.
+
+    The stages are run in order on each record: a map stage replaces the
+    record, or the value returned by the previous stage, by what its function
+    returns; a filter stage drops the values for which its function returns
+    false. Records are read in batches of `batch_size` by the calling thread
+    and sent to a pool of `workers` threads, or processes if `processes` is
+    true, at most two batches per worker being in flight. With processes,
+    the stages and the results must be picklable, and the functions defined
+    at the top level of a module.
+
+    The results are yielded in the order of the records, unless `ordered` is
+    false: they are then yielded as soon as their batch is done. With one
+    worker everything is run by the calling thread.
+
+    Records that fail to decode raise their exception, unless `permissive`
+    is true: they are then counted in `failures` and skipped. The records
+    decoded, the failures and the anomalies found are also counted in
+    ``pipeline.stats``, a :class:`Stats <pymarc.stats.Stats>` object, which
+    can be passed as `stats`; unlike `failures`, it isn't reset by each run.
+    `force_utf8`, `utf8_handling` and
+    `file_encoding` are the options of :class:`MARCReader
+    <pymarc.reader.MARCReader>`.
+    """
+
+    def __init__(
+        self,
+        workers=1,
+        processes=False,
+        ordered=True,
+        batch_size=BATCH_SIZE,
+        permissive=False,
+        force_utf8=False,
+        utf8_handling="strict",
+        file_encoding="iso8859-1",
+        stats=None,
+    ):
+        """Create a pipeline without stages."""
+        self.stages = []
+        self.workers = workers
+        self.processes = processes
+        self.ordered = ordered
+        self.batch_size = batch_size
+        self.permissive = permissive
+        self.options = {
+            "force_utf8": force_utf8,
+            "utf8_handling": utf8_handling,
+            "file_encoding": file_encoding,
+        }
+        self.failures = 0
+        self.stats = Stats() if stats is None else stats
+
+    def map(self, function):
+        """Add a stage replacing each value by ``function(value)``."""
+        self.stages.append((MAP, function))
+        return self
+
+    def filter(self, predicate):
+        """Add a stage keeping the values for which ``predicate(value)`` is true."""
+        self.stages.append((FILTER, predicate))
+        return self
+
+    def _inputs(self, inputs):
+        """Yield the (format, unit) of the records of `inputs`."""
+        for source in inputs:
+            format = None
+            if isinstance(source, tuple):
+                source, format = source
+            if isinstance(source, (str, os.PathLike)):
+                file_handle = open(source, "rb")
+                format = format or guess_format(os.fspath(source), None)
+            elif hasattr(source, "read"):
+                file_handle = None
+            else:
+                # records, e.g. a reader, which yields None when permissive
+                for record in source:
+                    if record is not None:
+                        yield None, record
+                continue
+            try:
+                handle = file_handle or source
+                format = format or sniff_format(handle)
+                for unit in _units(handle, format, self.options):
+                    yield format, unit
+            finally:
+                if file_handle is not None:
+                    file_handle.close()
+
+    def _input_batches(self, inputs):
+        """Yield the (format, units) of the batches of records of `inputs`."""
+        batch = []
+        batch_format = None
+        for format, unit in self._inputs(inputs):
+            if format != batch_format or len(batch) >= self.batch_size:
+                if batch:
+                    yield batch_format, batch
+                batch = []
+                batch_format = format
+            batch.append(unit)
+        if batch:
+            yield batch_format, batch
+
+    def results(self, *inputs):
+        """Yield the results of the stages for the records of `inputs`.
+
+        Each input is a path, a binary file object, a (path or file object,
+        format) tuple or an iterable of records, e.g. a reader. The format of
+        a file, one of FORMATS, is guessed from the extension of its path or
+        else from its first bytes.
+        """
+        self.failures = 0
+        job = (self.stages, self.options, self.permissive, self.stats.timing)
+        batches = self._input_batches(inputs)
+        if self.workers <= 1:
+            for format, units in batches:
+                yield from self._done(_run_batch(format, units, job))
+            return
+        if self.processes:
+            pool = multiprocessing.Pool(self.workers, _init_worker, (job,))
+            job = None
+        else:
+            pool = ThreadPool(self.workers)
+        with pool:
+            yield from self._run(pool, batches, job)
+
+    def _run(self, pool, batches, job):
+        """Yield the results of `batches` run by `pool`, a bounded number at once."""
+        window = 2 * self.workers
+        if self.ordered:
+            pending = collections.deque()
+            for format, units in batches:
+                pending.append(pool.apply_async(_run_batch, (format, units, job)))
+                if len(pending) >= window:
+                    yield from self._done(pending.popleft().get())
+            while pending:
+                yield from self._done(pending.popleft().get())
+            return
+
+        done = queue.Queue()
+        in_flight = 0
+        for format, units in batches:
+            pool.apply_async(
+                _run_batch,
+                (format, units, job),
+                callback=done.put,
+                error_callback=done.put,
+            )
+            in_flight += 1
+            if in_flight >= window:
+                in_flight -= 1
+                yield from self._done(done.get())
+        while in_flight:
+            in_flight -= 1
+            yield from self._done(done.get())
+
+    def _done(self, outcome):
+        """Return the results of a batch, add up its counters."""
+        if isinstance(outcome, BaseException):
+            raise outcome
+        results, stats = outcome
+        self.failures += sum(stats.errors.values())
+        self.stats.update(stats)
+        return results
+
+    def run(self, *inputs, writer=None, consumer=None):
+        """Run the stages on the records of `inputs`, see :meth:`results`.
+
+        Each result is written with `writer`, a :class:`Writer
+        <pymarc.writer.Writer>` which is left open, or passed to `consumer`.
+        Return the number of results.
+        """
+        count = 0
+        for result in self.results(*inputs):
+            if writer is not None:
+                writer.write(result)
+            if consumer is not None:
+                consumer(result)
+            count += 1
+        return count
@@ -6,13 +6,21 @@
 
 """Pymarc Reader."""
 import os
-import sys
+import re
 import json
+from time import perf_counter
 
 from io import BytesIO, StringIO
 
-from pymarc import Record, Field
-from pymarc.exceptions import PymarcException, RecordLengthInvalid
+from pymarc import Record
+from pymarc.field import _new_field
+from pymarc.exceptions import (
+    MARCMakerLineInvalid,
+    PymarcException,
+    RecordLengthInvalid,
+)
+from pymarc.marcjson import dict_to_record, iter_json_objects
+from pymarc.stats import Stats
 
 
 class Reader:
@@ -95,8 +103,27 @@ class MARCReader(Reader):
                 )
             else:
                 # do something with record
+
+    The records and bytes read, the errors and the anomalies found in the
+    records are counted in ``reader.stats``, a :class:`Stats
+    <pymarc.stats.Stats>` object. Pass your own to time the reading, to attach
+    hooks to it, or to log each anomaly as it is found:
+
+    .. code-block:: python
+
+        reader = MARCReader(file('file.dat'), stats=Stats(timing=True))
+        reader = MARCReader(
+            file('file.dat'), stats=Stats(anomalies=Anomalies(log=True))
+        )
+
+    With `keep_raw` the fields of UTF-8 records keep their raw bytes, to be
+    fingerprinted faster, see :func:`Record.fingerprint
+    <pymarc.record.Record.fingerprint>`.
     """
 
+    # offset of the next record, from where the reader started reading
+    _offset = 0
+
     _current_chunk = None
     _current_exception = None
 
@@ -119,6 +146,8 @@ class MARCReader(Reader):
         utf8_handling="strict",
         file_encoding="iso8859-1",
         permissive=False,
+        stats=None,
+        keep_raw=False,
     ):
         """The constructor to which you can pass either raw marc or a file-like object.
 
@@ -132,6 +161,8 @@ class MARCReader(Reader):
         self.utf8_handling = utf8_handling
         self.file_encoding = file_encoding
         self.permissive = permissive
+        self.stats = Stats() if stats is None else stats
+        self.keep_raw = keep_raw
         if hasattr(marc_target, "read") and callable(marc_target.read):
             self.file_handle = marc_target
         else:
@@ -144,19 +175,21 @@ class MARCReader(Reader):
             self.file_handle = None
 
     def __next__(self):
-        first5 = self.file_handle.read(5)
-        if not first5:
-            raise StopIteration
-        if len(first5) < 5:
-            raise RecordLengthInvalid
-
+        stats = self.stats
+        if stats.timing:
+            start = perf_counter()
         try:
-            length = int(first5)
-        except ValueError:
-            raise RecordLengthInvalid
-
-        chunk = self.file_handle.read(length - 5)
-        chunk = first5 + chunk
+            chunk = read_marc_chunk(self.file_handle)
+        except RecordLengthInvalid as ex:
+            stats.count_error(ex)
+            raise
+        if stats.timing:
+            stats.add_time("io", perf_counter() - start)
+        if chunk is None:
+            raise StopIteration
+        stats.count_bytes(len(chunk))
+        stats.anomalies.offset = self._offset
+        self._offset += len(chunk)
         self._current_chunk = chunk
         self._current_exception = None
         try:
@@ -167,16 +200,65 @@ class MARCReader(Reader):
                 hide_utf8_warnings=self.hide_utf8_warnings,
                 utf8_handling=self.utf8_handling,
                 file_encoding=self.file_encoding,
+                stats=stats,
+                keep_raw=self.keep_raw,
             )
         except (PymarcException, UnicodeDecodeError, ValueError) as ex:
+            stats.count_error(ex)
             if self.permissive:
                 self._current_exception = ex
                 record = None
             else:
                 raise ex
+        else:
+            stats.count_record()
         return record
 
 
+def read_marc_chunk(file_handle):
+    """Read the next record in transmission format from `file_handle`.
+
+    Only the record length in the first 5 bytes of the leader is used to frame
+    the record, nothing is decoded. Returns the raw bytes of the record or
+    ``None`` at the end of the file.
+    """
+    first5 = file_handle.read(5)
+    if not first5:
+        return None
+    if len(first5) < 5:
+        raise RecordLengthInvalid
+
+    try:
+        length = int(first5)
+    except ValueError:
+        raise RecordLengthInvalid
+
+    return first5 + file_handle.read(length - 5)
+
+
+def iter_marc_chunks(marc_target):
+    """Iterate over the raw records of a file in transmission format.
+
+    `marc_target` is either raw MARC or an object that responds to read(), as for
+    :class:`MARCReader <pymarc.reader.MARCReader>`.
+
+    .. code-block:: python
+
+        with open('file.dat', 'rb') as fh:
+            for chunk in iter_marc_chunks(fh):
+                print(len(chunk))
+    """
+    if hasattr(marc_target, "read") and callable(marc_target.read):
+        file_handle = marc_target
+    else:
+        file_handle = BytesIO(marc_target)
+    while True:
+        chunk = read_marc_chunk(file_handle)
+        if chunk is None:
+            return
+        yield chunk
+
+
 def map_records(f, *files):
     """Applies a given function to each record in a batch.
 
@@ -187,9 +269,13 @@ def map_records(f, *files):
         def print_title(r):
             print(r['245'])
         map_records(print_title, file('marc.dat'))
+
+    The values returned by `f` are dropped as it goes; see :class:`Pipeline
+    <pymarc.pipeline.Pipeline>` to collect them, or to run `f` in parallel.
     """
     for file in files:
-        list(map(f, MARCReader(file)))
+        for record in MARCReader(file):
+            f(record)
 
 
 class JSONReader(Reader):
@@ -199,7 +285,9 @@ class JSONReader(Reader):
         """The constructor to which you can pass either raw marc or a file-like object.
 
         Basically the argument you pass in should be raw JSON in transmission format or
-        an object that responds to read().
+        an object that responds to read(). With `stream` set the records are decoded
+        one at a time as they are read, see :func:`pymarc.marcjson.iter_json_objects`,
+        rather than all loaded in `records`.
         """
         self.encoding = encoding
         if hasattr(marc_target, "read") and callable(marc_target.read):
@@ -209,35 +297,226 @@ class JSONReader(Reader):
                 self.file_handle = open(marc_target, "r")
             else:
                 self.file_handle = StringIO(marc_target)
+        self.stream = stream
         if stream:
-            sys.stderr.write(
-                "Streaming not yet implemented, your data will be loaded into memory\n"
-            )
-        self.records = json.load(self.file_handle, strict=False)
+            self.records = None
+        else:
+            self.records = json.load(self.file_handle, strict=False)
 
     def __iter__(self):
-        if hasattr(self.records, "__iter__") and not isinstance(self.records, dict):
+        if self.stream:
+            self.iter = iter_json_objects(self.file_handle)
+        elif hasattr(self.records, "__iter__") and not isinstance(self.records, dict):
             self.iter = iter(self.records)
         else:
             self.iter = iter([self.records])
         return self
 
     def __next__(self):
-        jobj = next(self.iter)
-        rec = Record()
-        rec.leader = jobj["leader"]
-        for field in jobj["fields"]:
-            k, v = list(field.items())[0]
-            if "subfields" in v and hasattr(v, "update"):
-                # flatten m-i-j dict to list in pymarc
-                subfields = []
-                for sub in v["subfields"]:
-                    for code, value in sub.items():
-                        subfields.extend((code, value))
-                fld = Field(
-                    tag=k, subfields=subfields, indicators=[v["ind1"], v["ind2"]]
+        return dict_to_record(next(self.iter))
+
+
+# LC mnemonics for the characters MARCMaker can't write as is, see
+# http://www.loc.gov/marc/mnemonics.html
+MARCMAKER_MNEMONICS = {
+    "dollar": "$",
+    "bsol": "\\",
+    "lcub": "{",
+    "rcub": "}",
+    "verbar": "|",
+    "esc": "\x1b",
+}
+
+mnemonic_regex = re.compile(r"\{(?:([a-z]+)|U\+([0-9A-Fa-f]{4,6}))\}")
+
+
+def _replace_mnemonic(match):
+    name, code_point = match.groups()
+    if code_point:
+        return chr(int(code_point, 16))
+    return MARCMAKER_MNEMONICS.get(name, match.group(0))
+
+
+def marcmaker_unescape(text, unknown=None):
+    """Replace the mnemonics of MARCMaker text, like ``{dollar}``, by their character.
+
+    ``{U+20AC}`` stands for any Unicode character. Unknown mnemonics are left
+    as is, and passed to `unknown`, a callable, if it is given.
+    """
+    if "{" not in text:
+        return text
+    if unknown is None:
+        return mnemonic_regex.sub(_replace_mnemonic, text)
+
+    def replace(match):
+        name = match.group(1)
+        if name and name not in MARCMAKER_MNEMONICS:
+            unknown(match.group(0))
+        return _replace_mnemonic(match)
+
+    return mnemonic_regex.sub(replace, text)
+
+
+class MARCMakerReader(Reader):
+    r"""An iterator class for reading MARCMaker text (.mrk) files.
+
+    This is the format written by :class:`TextWriter <pymarc.writer.TextWriter>`
+    and ``str(record)``: one field per line, ``=LDR`` first, records separated
+    by a blank line.
+
+    .. code-block:: text
+
+        =LDR  00000nam\\2200000\a\4500
+        =001  12345
+        =245  10$aMoney {dollar}1 :$bunder the mattress.
+
+    In the leader, control fields and indicators ``\`` stands for a blank.
+    The ``{dollar}``, ``{bsol}``, ``{lcub}``, ``{rcub}``, ``{verbar}`` and
+    ``{esc}`` mnemonics, and ``{U+XXXX}``, are replaced by their character.
+    Other mnemonics are kept as they are and counted as ``unknown mnemonic``
+    anomalies in ``stats``. A line not starting with ``=`` continues the field
+    of the previous line.
+
+    .. code-block:: python
+
+        from pymarc import MARCMakerReader, MARCWriter
+
+        with open('file.mrk', 'rb') as fh, open('file.dat', 'wb') as out:
+            writer = MARCWriter(out)
+            for record in MARCMakerReader(fh, force_utf8=True):
+                writer.write(record)
+
+    `marc_target` is a text or binary file-like object, or a string of
+    MARCMaker text; bytes are decoded with `encoding`. Lines are read one at
+    a time so files of any size can be streamed. Records get the
+    ``force_utf8`` option of :class:`Record <pymarc.record.Record>`, so that
+    they are serialized as UTF-8 whatever their leader says. With
+    `permissive`, invalid records are returned as ``None`` like
+    :class:`MARCReader`.
+    """
+
+    _current_exception = None
+
+    @property
+    def current_exception(self):
+        """Current exception."""
+        return self._current_exception
+
+    def __init__(
+        self,
+        marc_target,
+        encoding="utf-8",
+        force_utf8=False,
+        permissive=False,
+        stats=None,
+    ):
+        """The constructor to which you can pass either text or a file-like object."""
+        super(MARCMakerReader, self).__init__()
+        if hasattr(marc_target, "read") and callable(marc_target.read):
+            self.file_handle = marc_target
+        elif isinstance(marc_target, bytes):
+            self.file_handle = BytesIO(marc_target)
+        else:
+            self.file_handle = StringIO(marc_target)
+        self.encoding = encoding
+        self.force_utf8 = force_utf8
+        self.permissive = permissive
+        self.stats = Stats() if stats is None else stats
+        self.line_number = 0
+        self._lines = iter(self.file_handle)
+        self._next_line = None
+
+    def close(self):
+        """Close the handle."""
+        if self.file_handle:
+            self.file_handle.close()
+            self.file_handle = None
+
+    def _read_line(self):
+        """Return the next line without its line ending, None at the end."""
+        if self._next_line is not None:
+            line, self._next_line = self._next_line, None
+            return line
+        line = next(self._lines, None)
+        if line is None:
+            return None
+        if isinstance(line, bytes):
+            line = line.decode(self.encoding)
+        if self.line_number == 0:
+            line = line.lstrip("\ufeff")
+        self.line_number += 1
+        return line.rstrip("\r\n")
+
+    def _read_record(self):
+        """Return the (line number, text) fields of the next record."""
+        fields = []
+        while True:
+            line = self._read_line()
+            if line is None:
+                return fields
+            if not line.strip():
+                if fields:
+                    return fields
+            elif line.startswith("=LDR") and fields:
+                # a record without blank line before the next one
+                self._next_line = line
+                return fields
+            elif line.startswith("="):
+                fields.append([self.line_number, line])
+            elif fields:
+                fields[-1][1] += line
+            else:
+                raise MARCMakerLineInvalid(self.line_number, line)
+
+    def __next__(self):
+        self._current_exception = None
+        try:
+            lines = self._read_record()
+            if not lines:
+                raise StopIteration
+            record = self._parse(lines)
+        except (PymarcException, UnicodeDecodeError, ValueError) as ex:
+            self.stats.count_error(ex)
+            if self.permissive:
+                self._current_exception = ex
+                record = None
+            else:
+                raise ex
+        else:
+            self.stats.count_record()
+        return record
+
+    def _parse(self, lines):
+        """Build a record from the (line number, text) of its fields."""
+        line_number, line = lines[0]
+        if line.startswith("=LDR"):
+            record = Record(
+                leader=line[6:].replace("\\", " "), force_utf8=self.force_utf8
+            )
+            lines = lines[1:]
+        else:
+            record = Record(force_utf8=self.force_utf8)
+
+        def unknown(mnemonic):
+            self.stats.count_warning("unknown mnemonic", tag, mnemonic)
+
+        for line_number, line in lines:
+            tag = line[1:4]
+            if len(tag) != 3 or line[4:6] != "  ":
+                raise MARCMakerLineInvalid(line_number, line)
+            value = line[6:]
+            if tag < "010" and tag.isdigit():
+                field = _new_field(
+                    tag, data=marcmaker_unescape(value.replace("\\", " "), unknown)
                 )
             else:
-                fld = Field(tag=k, data=v)
-            rec.add_field(fld)
-        return rec
+                subfields = []
+                for subfield in value[2:].split("$")[1:]:
+                    if subfield:
+                        subfields.append(subfield[0])
+                        subfields.append(marcmaker_unescape(subfield[1:], unknown))
+                field = _new_field(
+                    tag, list(value[0:2].replace("\\", " ").ljust(2)), subfields
+                )
+            record.add_field(field)
+        return record
@@ -5,37 +5,121 @@
 # file.
 
 """Pymarc Record."""
+import bisect
+import hashlib
 from itertools import zip_longest
 import json
-import logging
+from json.encoder import encode_basestring, encode_basestring_ascii
+from operator import itemgetter
 import re
+from time import perf_counter
 import unicodedata
-import warnings
 
 
 from pymarc.constants import DIRECTORY_ENTRY_LEN, END_OF_RECORD, LEADER_LEN
 from pymarc.exceptions import (
-    BadSubfieldCodeWarning,
     BaseAddressInvalid,
     BaseAddressNotFound,
     FieldNotFound,
     NoFieldsFound,
     RecordDirectoryInvalid,
-    RecordLeaderInvalid,
 )
 from pymarc.field import (
     END_OF_FIELD,
+    END_OF_FIELD_BYTES,
     SUBFIELD_INDICATOR,
-    Field,
     RawField,
+    _field_from_text,
+    _field_text,
+    _new_field,
     map_marc8_field,
 )
 from pymarc.leader import Leader
-from pymarc.marc8 import marc8_to_unicode
+from pymarc.marc8 import MARC8ToUnicode, marc8_to_unicode
+from pymarc.stats import ANOMALY_LOGGER
 
 
 isbn_regex = re.compile(r"([0-9\-xX]+)")
 
+# tag, field length and starting character position of a directory entry
+directory_entry_regex = re.compile(r"(...)([0-9]{4})([0-9]{5})", re.S)
+
+# a subfield indicator followed by a non ASCII byte or by no code at all
+bad_subfield_code_regex = re.compile(rb"\x1f(?:[\x80-\xff\x1d\x1e\x1f]|\Z)")
+
+# subfield codes by byte value, for the codes known to be ASCII
+_SUBFIELD_CODES = tuple(chr(i) for i in range(128))
+
+SUBFIELD_INDICATOR_BYTES = SUBFIELD_INDICATOR.encode("ascii")
+END_OF_RECORD_BYTES = END_OF_RECORD.encode("ascii")
+
+# sort key of the fields with a non numeric tag, see Record._sort_fields
+NON_NUMERIC_TAG = float("inf")
+
+# the attributes of a record kept by _pack_record
+_RECORD_STATE = frozenset(("leader", "fields", "pos", "force_utf8"))
+
+# flags of a packed record
+FORCE_UTF8 = 1
+STR_LEADER = 2
+
+# the options of json.dumps that as_json applies itself, see _json_text
+_JSON_OPTIONS = frozenset(("ensure_ascii", "separators"))
+
+
+def _sort_key(tag, mode):
+    """Returns the key of `tag` for add_ordered_field or add_grouped_field."""
+    if not tag.isdigit():
+        return NON_NUMERIC_TAG
+    if mode == "grouped":
+        return int(tag[0])
+    return int(tag)
+
+
+def _json_text(record, ensure_ascii=True, separators=None):
+    """Return ``json.dumps(record.as_dict(), ...)`` without building the dictionary.
+
+    The strings are escaped like json.dumps does, by the same functions.
+    Raises TypeError if a value isn't a string.
+    """
+    encode = encode_basestring_ascii if ensure_ascii else encode_basestring
+    item, key = separators or (", ", ": ")
+    subfield = "{%s" + key + "%s}"
+    fields = []
+    append = fields.append
+    for field in record.fields:
+        if field.is_control_field():
+            append("{%s%s%s}" % (encode(field.tag), key, encode(field.data)))
+        else:
+            subfields = item.join(
+                [
+                    subfield % (encode(code), encode(value))
+                    for code, value in zip_longest(*[iter(field.subfields)] * 2)
+                ]
+            )
+            append(
+                '{%s%s{"subfields"%s[%s]%s"ind1"%s%s%s"ind2"%s%s}}'
+                % (
+                    encode(field.tag),
+                    key,
+                    key,
+                    subfields,
+                    item,
+                    key,
+                    encode(field.indicator1),
+                    item,
+                    key,
+                    encode(field.indicator2),
+                )
+            )
+    return '{"leader"%s%s%s"fields"%s[%s]}' % (
+        key,
+        encode(str(record.leader)),
+        item,
+        key,
+        item.join(fields),
+    )
+
 
 class Record:
     """A class for representing a MARC record.
@@ -75,6 +159,9 @@ class Record:
     MARC records in a file.
     """
 
+    # see _sort_keys
+    _sort_cache = None
+
     def __init__(
         self,
         data="",
@@ -84,9 +171,13 @@ class Record:
         utf8_handling="strict",
         leader=" " * LEADER_LEN,
         file_encoding="iso8859-1",
+        stats=None,
+        keep_raw=False,
     ):
         """Initialize a Record."""
-        self.leader = Leader(leader[0:10] + "22" + leader[12:20] + "4500")
+        self.leader = Leader(str(leader))
+        self.leader[10:12] = "22"
+        self.leader[20:24] = "4500"
         self.fields = list()
         self.pos = 0
         self.force_utf8 = force_utf8
@@ -98,9 +189,31 @@ class Record:
                 hide_utf8_warnings=hide_utf8_warnings,
                 utf8_handling=utf8_handling,
                 encoding=file_encoding,
+                stats=stats,
+                keep_raw=keep_raw,
             )
         elif force_utf8:
-            self.leader = self.leader[0:9] + "a" + self.leader[10:]
+            self.leader.coding_scheme = "a"
+
+    def __reduce_ex__(self, protocol):
+        """Pickle the record compactly, as its fields in transmission format.
+
+        The pickle holds the leader and the record in UTF-8 transmission
+        format, from which the fields are rebuilt without decoding or
+        normalizing them. Records which can't be rebuilt exactly this way, see
+        `_pack_record`, are pickled as usual.
+        """
+        packed = _pack_record(self)
+        if packed is None:
+            return super().__reduce_ex__(protocol)
+        leader, data, flags = packed
+        return _unpack_record, (leader, data, flags, self.pos)
+
+    def __copy__(self):
+        """Return a shallow copy of the record, like copy.copy does by default."""
+        record = self.__class__.__new__(self.__class__)
+        record.__dict__.update(self.__dict__)
+        return record
 
     def __str__(self):
         """Will return a prettified version of the record in MARCMaker format.
@@ -136,20 +249,32 @@ class Record:
         return len(fields) > 0
 
     def __iter__(self):
-        self.__pos = 0
-        return self
+        """Iterate over the fields of the record.
+
+        Each call returns a new iterator, so a record can be iterated over in
+        nested loops or from several threads at once.
+        """
+        return iter(self.fields)
+
+    def iter_tag(self, tag):
+        """Iterate over the fields with tag `tag`.
+
+        .. code-block:: python
 
-    def __next__(self):
-        if self.__pos >= len(self.fields):
-            raise StopIteration
-        self.__pos += 1
-        return self.fields[self.__pos - 1]
+            for field in record.iter_tag('650'):
+                print(field)
+
+        Unlike :func:`get_fields` no list is built.
+        """
+        return (field for field in self.fields if field.tag == tag)
 
     def add_field(self, *fields):
         """Add pymarc.Field objects to a Record object.
 
         Optionally you can pass in multiple fields.
         """
+        if self._sort_cache is not None:
+            self._sort_cache = None
         self.fields.extend(fields)
 
     def add_grouped_field(self, *fields):
@@ -157,54 +282,97 @@ class Record:
 
         Which means, attempting to maintain a loose numeric order per the MARC standard
         for "Organization of the record" (http://www.loc.gov/marc/96principl.html).
-        Optionally you can pass in multiple fields.
+        Optionally you can pass in multiple fields. A field whose tag was
+        changed since it was added keeps its place by its former tag.
         """
         for f in fields:
-            if len(self.fields) == 0 or not f.tag.isdigit():
-                self.fields.append(f)
-                continue
             self._sort_fields(f, "grouped")
 
     def add_ordered_field(self, *fields):
         """Add pymarc.Field objects to a Record object and sort them "ordered".
 
         Which means, attempting to maintain a strict numeric order.
-        Optionally you can pass in multiple fields.
+        Optionally you can pass in multiple fields. A field whose tag was
+        changed since it was added keeps its place by its former tag.
         """
         for f in fields:
-            if len(self.fields) == 0 or not f.tag.isdigit():
-                self.fields.append(f)
-                continue
             self._sort_fields(f, "ordered")
 
-    def _sort_fields(self, field, mode):
-        """Sort fields by `mode`."""
-        if mode == "grouped":
-            tag = int(field.tag[0])
-        else:
-            tag = int(field.tag)
+    def add_grouped_fields(self, fields):
+        """Add an iterable of fields "grouped", like :func:`add_grouped_field`.
 
-        i, last_tag = 0, 0
-        for selff in self.fields:
-            i += 1
-            if not selff.tag.isdigit():
-                self.fields.insert(i - 1, field)
-                break
+        The fields are sorted once rather than inserted one by one.
+        """
+        self._add_sorted_fields(fields, "grouped")
 
-            if mode == "grouped":
-                last_tag = int(selff.tag[0])
-            else:
-                last_tag = int(selff.tag)
+    def add_ordered_fields(self, fields):
+        """Add an iterable of fields "ordered", like :func:`add_ordered_field`.
 
-            if last_tag > tag:
-                self.fields.insert(i - 1, field)
-                break
-            if len(self.fields) == i:
-                self.fields.append(field)
-                break
+        The fields are sorted once rather than inserted one by one.
+
+        .. code-block:: python
+
+            record.add_ordered_fields(
+                Field('650', [' ', '0'], ['a', subject]) for subject in subjects
+            )
+        """
+        self._add_sorted_fields(fields, "ordered")
+
+    def _sort_keys(self, mode):
+        """Returns the cached [mode, fields, keys, in_order] used to insert fields.
+
+        `keys` are the numeric sort keys of the fields for `mode`, and
+        `in_order` tells whether they are sorted, in which case insertion points
+        can be found by bisection. The cache is dropped by the methods adding or
+        removing fields, and rebuilt when `fields` no longer holds the fields
+        the keys were computed for, so that fields added, removed or replaced
+        directly in the list are noticed; a field given another tag keeps its
+        former key.
+        """
+        fields = self.fields
+        cache = self._sort_cache
+        # fields don't define __eq__: the lists are compared by identity
+        if cache is None or cache[0] != mode or cache[1] != fields:
+            keys = [_sort_key(field.tag, mode) for field in fields]
+            in_order = all(a <= b for a, b in zip(keys, keys[1:]))
+            cache = self._sort_cache = [mode, list(fields), keys, in_order]
+        return cache
+
+    def _sort_fields(self, field, mode):
+        """Insert `field` before the first field with a greater key for `mode`.
+
+        Fields with a non numeric tag have the greatest key, so a field with a
+        non numeric tag is appended and any field is inserted before them.
+        """
+        mode, cached_fields, keys, in_order = self._sort_keys(mode)
+        key = _sort_key(field.tag, mode)
+        if in_order:
+            i = bisect.bisect_right(keys, key)
+        else:
+            i = next((i for i, k in enumerate(keys) if k > key), len(keys))
+        self.fields.insert(i, field)
+        cached_fields.insert(i, field)
+        keys.insert(i, key)
+
+    def _add_sorted_fields(self, fields, mode):
+        """Insert many fields as _sort_fields would, with a single sort."""
+        mode, _, keys, in_order = self._sort_keys(mode)
+        if not in_order:
+            for field in fields:
+                self._sort_fields(field, mode)
+            return
+        fields = list(fields)
+        new_keys = [_sort_key(field.tag, mode) for field in fields]
+        # existing fields go first among equal keys; the stable sort keeps the
+        # order of the new fields with equal keys, non numeric ones included
+        merged = sorted(zip(keys + new_keys, self.fields + fields), key=itemgetter(0))
+        self.fields[:] = [field for key, field in merged]
+        self._sort_cache = None
 
     def remove_field(self, *fields):
         """Remove one or more pymarc.Field objects from a Record object."""
+        if self._sort_cache is not None:
+            self._sort_cache = None
         for f in fields:
             try:
                 self.fields.remove(f)
@@ -219,6 +387,8 @@ class Record:
             # remove all the fields marked with tags '200' or '899'.
             self.remove_fields('200', '899')
         """
+        if self._sort_cache is not None:
+            self._sort_cache = None
         self.fields[:] = (field for field in self.fields if field.tag not in tags)
 
     def get_fields(self, *args):
@@ -251,18 +421,33 @@ class Record:
         hide_utf8_warnings=False,
         utf8_handling="strict",
         encoding="iso8859-1",
+        stats=None,
+        keep_raw=False,
     ):
         """Populate the object based on the `marc`` record in transmission format.
 
         The Record constructor actually uses decode_marc() behind the scenes when you
         pass in a chunk of MARC data to it.
+
+        If `stats` is a :class:`Stats <pymarc.stats.Stats>` object, the problems
+        found in the fields are counted in its anomalies and, if it is timing,
+        the time spent is added to its ``directory``, ``decoding`` and
+        ``construction`` phases. Without `stats` the problems are logged.
+
+        With `keep_raw` the data fields of a UTF-8 record decoded strictly keep
+        their raw bytes, from which :func:`fingerprint` hashes them faster.
         """
+        if stats is None:
+            stats = ANOMALY_LOGGER
+        timing = stats.timing
+        if timing:
+            start = perf_counter()
+
         # extract record leader
-        self.leader = marc[0:LEADER_LEN].decode("ascii")
-        if len(self.leader) != LEADER_LEN:
-            raise RecordLeaderInvalid
+        self.leader = Leader.from_bytes(marc)
+        utf8 = self.leader.coding_scheme == "a" or force_utf8
 
-        if self.leader[9] == "a" or self.force_utf8:
+        if utf8 or self.force_utf8:
             encoding = "utf-8"
 
         # extract the byte offset where the record data starts
@@ -279,33 +464,47 @@ class Record:
         # determine the number of fields in record
         if len(directory) % DIRECTORY_ENTRY_LEN != 0:
             raise RecordDirectoryInvalid
-        field_total = len(directory) / DIRECTORY_ENTRY_LEN
+
+        # if asked, fields of a UTF-8 record decoded strictly keep their raw
+        # bytes, which can then be hashed directly by fingerprint()
+        keep_raw = keep_raw and to_unicode and utf8 and utf8_handling == "strict"
+
+        # how field data is decoded only depends on the leader and options
+        if not to_unicode:
+            decoder = _RawDecoder()
+        elif utf8:
+            decoder = _Utf8Decoder(encoding, utf8_handling)
+        elif encoding == "iso8859-1":
+            decoder = _Marc8Decoder(encoding, hide_utf8_warnings)
+        else:
+            decoder = _FieldDecoder(encoding)
+
+        # one search checks the subfield codes of all the fields: if none is
+        # empty or non ASCII they can be split off without further checks
+        if bad_subfield_code_regex.search(marc, base_address) is None:
+            split_subfields = decoder.subfields
+        else:
+            split_subfields = decoder.split_subfields
+
+        entries = _parse_directory(directory)
+        if timing:
+            parsed = perf_counter()
+            decoding = [0.0]
+            split_subfields = _timed(split_subfields, decoding)
 
         # add fields to our record using directory offsets
         field_count = 0
-        while field_count < field_total:
-            entry_start = field_count * DIRECTORY_ENTRY_LEN
-            entry_end = entry_start + DIRECTORY_ENTRY_LEN
-            entry = directory[entry_start:entry_end]
-            entry_tag = entry[0:3]
-            entry_length = int(entry[3:7])
-            entry_offset = int(entry[7:12])
-            entry_data = marc[
-                base_address
-                + entry_offset : base_address
-                + entry_offset
-                + entry_length
-                - 1
-            ]
+        for entry_tag, entry_length, entry_offset in entries:
+            entry_start = base_address + entry_offset
+            entry_data = marc[entry_start : entry_start + entry_length - 1]
             # assume controlfields are numeric; replicates ruby-marc behavior
             if entry_tag < "010" and entry_tag.isdigit():
                 if to_unicode:
-                    field = Field(tag=entry_tag, data=entry_data.decode(encoding))
+                    field = _new_field(entry_tag, data=entry_data.decode(encoding))
                 else:
-                    field = RawField(tag=entry_tag, data=entry_data)
+                    field = _new_field(entry_tag, data=entry_data, cls=RawField)
             else:
-                subfields = list()
-                subs = entry_data.split(SUBFIELD_INDICATOR.encode("ascii"))
+                indicators = entry_data.split(SUBFIELD_INDICATOR_BYTES, 1)[0]
 
                 # The MARC spec requires there to be two indicators in a
                 # field. However experience in the wild has shown that
@@ -317,57 +516,51 @@ class Record:
                 # blank spaces, and any more than 2 are dropped on the floor.
 
                 first_indicator = second_indicator = " "
-                subs[0] = subs[0].decode("ascii")
-                if len(subs[0]) == 0:
-                    logging.warning("missing indicators: %s", entry_data)
+                indicators = indicators.decode("ascii")
+                if len(indicators) == 0:
+                    stats.count_warning("missing indicators", entry_tag, entry_data)
                     first_indicator = second_indicator = " "
-                elif len(subs[0]) == 1:
-                    logging.warning("only 1 indicator found: %s", entry_data)
-                    first_indicator = subs[0][0]
+                elif len(indicators) == 1:
+                    stats.count_warning("only 1 indicator", entry_tag, entry_data)
+                    first_indicator = indicators[0]
                     second_indicator = " "
-                elif len(subs[0]) > 2:
-                    logging.warning("more than 2 indicators found: %s", entry_data)
-                    first_indicator = subs[0][0]
-                    second_indicator = subs[0][1]
+                elif len(indicators) > 2:
+                    stats.count_warning("more than 2 indicators", entry_tag, entry_data)
+                    first_indicator = indicators[0]
+                    second_indicator = indicators[1]
                 else:
-                    first_indicator = subs[0][0]
-                    second_indicator = subs[0][1]
-
-                for subfield in subs[1:]:
-                    skip_bytes = 1
-                    if len(subfield) == 0:
-                        continue
-                    try:
-                        code = subfield[0:1].decode("ascii")
-                    except UnicodeDecodeError:
-                        warnings.warn(BadSubfieldCodeWarning())
-                        code, skip_bytes = normalize_subfield_code(subfield)
-                    data = subfield[skip_bytes:]
-
-                    if to_unicode:
-                        if self.leader[9] == "a" or force_utf8:
-                            data = data.decode("utf-8", utf8_handling)
-                        elif encoding == "iso8859-1":
-                            data = marc8_to_unicode(data, hide_utf8_warnings)
-                        else:
-                            data = data.decode(encoding)
-                    subfields.append(code)
-                    subfields.append(data)
+                    first_indicator = indicators[0]
+                    second_indicator = indicators[1]
+
+                subfields, problems = split_subfields(entry_data[len(indicators) :])
+                for problem in problems:
+                    stats.count_warning(problem, entry_tag, entry_data)
                 if to_unicode:
-                    field = Field(
-                        tag=entry_tag,
-                        indicators=[first_indicator, second_indicator],
-                        subfields=subfields,
+                    field = _new_field(
+                        entry_tag, [first_indicator, second_indicator], subfields
                     )
+                    if (
+                        keep_raw
+                        and not problems
+                        and len(indicators) == 2
+                        and field.tag == entry_tag
+                    ):
+                        field._raw = (entry_data, field.indicators[:], subfields[:])
                 else:
-                    field = RawField(
-                        tag=entry_tag,
-                        indicators=[first_indicator, second_indicator],
-                        subfields=subfields,
+                    field = _new_field(
+                        entry_tag,
+                        [first_indicator, second_indicator],
+                        subfields,
+                        cls=RawField,
                     )
             self.add_field(field)
             field_count += 1
 
+        if timing:
+            stats.add_time("directory", parsed - start)
+            stats.add_time("decoding", decoding[0])
+            stats.add_time("construction", perf_counter() - parsed - decoding[0])
+
         if field_count == 0:
             raise NoFieldsFound
 
@@ -424,6 +617,34 @@ class Record:
     # alias for backwards compatibility
     as_marc21 = as_marc
 
+    def fingerprint(self, ignore_tags=()):
+        """Returns a stable digest of the content of the record.
+
+        The digest is computed over the record serialized as UTF-8 MARC21,
+        ignoring the record length and base address (leader positions 0-4 and
+        12-16) which :func:`as_marc` recomputes anyway. Fields whose tag is in
+        `ignore_tags` are left out, e.g. to ignore the 005 timestamp:
+
+        .. code-block:: python
+
+            if old.fingerprint(ignore_tags=['005']) != new.fingerprint(['005']):
+                print('record changed')
+
+        Unmodified fields read from a UTF-8 record with `keep_raw` set are
+        hashed straight from their raw bytes, see :func:`Field.fingerprint
+        <pymarc.field.Field.fingerprint>`.
+        """
+        leader = str(self.leader)
+        digest = hashlib.blake2b(
+            (leader[5:12] + leader[17:]).encode("utf-8"), digest_size=16
+        )
+        for field in self.fields:
+            if field.tag in ignore_tags:
+                continue
+            digest.update(field.tag.encode("utf-8"))
+            digest.update(field._canonical())
+        return digest.hexdigest()
+
     def as_dict(self):
         """Turn a MARC record into a dictionary, which is used for ``as_json``."""
         record = {}
@@ -445,9 +666,19 @@ class Record:
     def as_json(self, **kwargs):
         """Serialize a record as JSON.
 
+        The keyword arguments are those of ``json.dumps``. With none but
+        `ensure_ascii` and `separators` the text is written directly from the
+        fields, rather than by dumping ``as_dict()``, with the same result.
+
         See:
         http://dilettantes.code4lib.org/blog/2010/09/a-proposal-to-serialize-marc-in-json/
         """
+        if kwargs.keys() <= _JSON_OPTIONS:
+            try:
+                return _json_text(self, **kwargs)
+            except TypeError:
+                # not a string, such as a missing subfield value
+                pass
         return json.dumps(self.as_dict(), **kwargs)
 
     def title(self):
@@ -690,6 +921,27 @@ class Record:
         return None
 
 
+def fingerprints(reader, ignore_tags=()):
+    """Yield a (record, fingerprint) tuple for each record of `reader`.
+
+    `reader` is any iterable of records, like a :class:`MARCReader
+    <pymarc.reader.MARCReader>`, which hashes faster with `keep_raw` set.
+    Records skipped by a permissive reader are yielded as (None, None).
+
+    .. code-block:: python
+
+        with open('today.dat', 'rb') as fh:
+            reader = MARCReader(fh, keep_raw=True)
+            for record, digest in fingerprints(reader, ['005']):
+                print(record['001'].data, digest)
+    """
+    for record in reader:
+        if record is None:
+            yield None, None
+        else:
+            yield record, record.fingerprint(ignore_tags)
+
+
 def map_marc8_record(record):
     """Map MARC-8 record."""
     record.fields = map(map_marc8_field, record.fields)
@@ -710,3 +962,225 @@ def normalize_subfield_code(subfield):
     decomposed = unicodedata.normalize("NFKD", text_subfield)
     without_diacritics = decomposed.encode("ascii", "ignore").decode("ascii")
     return without_diacritics[0], skip_bytes
+
+
+def _pack_record(record):
+    """Return the leader, transmission format and flags of `record`, or None.
+
+    The fields are written as they are in UTF-8, see `_field_text`, after a
+    leader with the actual record length, base address and coding scheme;
+    the leader of the record is returned apart, as a string. None is returned
+    for a record that _unpack_record wouldn't rebuild exactly: one of a
+    subclass of Record or with other attributes, or of a field that can't be
+    packed, or too long for transmission format.
+    """
+    if type(record) is not Record or record.__dict__.keys() != _RECORD_STATE:
+        return None
+    leader = record.leader
+    if type(leader) is str:
+        flags = STR_LEADER
+    elif type(leader) is Leader:
+        flags = 0
+        leader = str(leader)
+    else:
+        return None
+    if record.force_utf8 is True:
+        flags |= FORCE_UTF8
+    elif record.force_utf8 is not False:
+        return None
+    # only ASCII characters are encoded in one byte
+    if len(leader.encode("utf-8", "replace")) != LEADER_LEN:
+        return None
+    if type(record.fields) is not list:
+        return None
+
+    directory = []
+    data = []
+    offset = 0
+    for field in record.fields:
+        text = _field_text(field)
+        if text is None:
+            return None
+        try:
+            tag = field.tag.encode("ascii")
+            field_data = text.encode("utf-8") + END_OF_FIELD_BYTES
+        except UnicodeEncodeError:
+            return None
+        if len(tag) != 3 or len(field_data) > 9999 or offset > 99999:
+            return None
+        directory.append(b"%s%04d%05d" % (tag, len(field_data), offset))
+        data.append(field_data)
+        offset += len(field_data)
+    directory.append(END_OF_FIELD_BYTES)
+    data.append(END_OF_RECORD_BYTES)
+    directory = b"".join(directory)
+    data = b"".join(data)
+    base_address = LEADER_LEN + len(directory)
+    length = base_address + len(data)
+    if length > 99999:
+        return None
+    head = "%05d%sa%s%05d%s" % (
+        length,
+        leader[5:9],
+        leader[10:12],
+        base_address,
+        leader[17:],
+    )
+    return leader, head.encode("ascii") + directory + data, flags
+
+
+def _unpack_record(leader, data, flags=0, pos=0):
+    """Return the record packed by `_pack_record`."""
+    record = Record.__new__(Record)
+    record.leader = leader if flags & STR_LEADER else Leader(leader)
+    record.fields = []
+    record.pos = pos
+    record.force_utf8 = bool(flags & FORCE_UTF8)
+    base_address = int(data[12:17])
+    directory = data[LEADER_LEN : base_address - 1].decode("ascii")
+    append = record.fields.append
+    for tag, length, offset in _parse_directory(directory):
+        start = base_address + offset
+        append(_field_from_text(tag, data[start : start + length - 1].decode("utf-8")))
+    return record
+
+
+def _parse_directory(directory):
+    """Return the (tag, length, offset) of the entries of a record directory.
+
+    The whole directory is matched at once; a directory with entries not
+    made of digits where expected is parsed entry by entry instead, leaving
+    int() to accept or reject them.
+    """
+    entries = directory_entry_regex.findall(directory)
+    if len(entries) * DIRECTORY_ENTRY_LEN != len(directory):
+        return _parse_directory_entries(directory)
+    return [(tag, int(length), int(offset)) for tag, length, offset in entries]
+
+
+def _timed(function, elapsed):
+    """Wrap `function` to add the time spent in it to ``elapsed[0]``."""
+
+    def timed(*args):
+        start = perf_counter()
+        try:
+            return function(*args)
+        finally:
+            elapsed[0] += perf_counter() - start
+
+    return timed
+
+
+def _parse_directory_entries(directory):
+    """Return the (tag, length, offset) of the entries of a record directory."""
+    entries = []
+    for entry_start in range(0, len(directory), DIRECTORY_ENTRY_LEN):
+        entry = directory[entry_start : entry_start + DIRECTORY_ENTRY_LEN]
+        entries.append((entry[0:3], int(entry[3:7]), int(entry[7:12])))
+    return entries
+
+
+class _FieldDecoder:
+    """Decodes the subfields of the data fields of a record.
+
+    Record.decode_marc picks one decoder per record, from its leader and
+    options, instead of testing them for every subfield.
+    """
+
+    def __init__(self, encoding, errors="strict"):
+        self.encoding = encoding
+        self.errors = errors
+
+    def decode(self, data):
+        """Decode the value of a subfield."""
+        return data.decode(self.encoding, self.errors)
+
+    def subfields(self, data):
+        """Return the subfields found in `data`, the field data after the indicators.
+
+        The subfields are returned as a flat list of codes and values, along
+        with the kinds of problem found, which are collected by the reader:
+        none if the field was well formed, with no empty subfield and only
+        ASCII subfield codes. Record.decode_marc only calls it once
+        bad_subfield_code_regex has checked the codes, otherwise it calls
+        split_subfields.
+        """
+        subfields = data.split(SUBFIELD_INDICATOR_BYTES)
+        del subfields[0]
+        decode = self.decode
+        codes = _SUBFIELD_CODES
+        result = []
+        try:
+            for subfield in subfields:
+                result += (codes[subfield[0]], decode(subfield[1:]))
+        except IndexError:
+            # an empty subfield at the end of a truncated field
+            return self.split_subfields(data)
+        return result, ()
+
+    def split_subfields(self, data):
+        """Return the subfields found in `data`, checking their codes one by one."""
+        subfields = []
+        problems = []
+        for subfield in data.split(SUBFIELD_INDICATOR_BYTES)[1:]:
+            skip_bytes = 1
+            if len(subfield) == 0:
+                problems.append("empty subfield")
+                continue
+            try:
+                code = subfield[0:1].decode("ascii")
+            except UnicodeDecodeError:
+                problems.append("bad subfield code")
+                code, skip_bytes = normalize_subfield_code(subfield)
+            subfields.append(code)
+            subfields.append(self.decode(subfield[skip_bytes:]))
+        return subfields, problems
+
+
+class _RawDecoder(_FieldDecoder):
+    """Keeps the subfield values as bytes, for RawField."""
+
+    def __init__(self):
+        super().__init__(None)
+
+    def decode(self, data):
+        """Return `data` unchanged."""
+        return data
+
+
+class _Marc8Decoder(_FieldDecoder):
+    """Decodes MARC-8 with one converter for the whole record."""
+
+    def __init__(self, encoding, hide_utf8_warnings=False):
+        super().__init__(encoding)
+        self.converter = MARC8ToUnicode(quiet=hide_utf8_warnings)
+
+    def decode(self, data):
+        """Decode the value of a subfield from MARC-8."""
+        return marc8_to_unicode(data, converter=self.converter)
+
+
+class _Utf8Decoder(_FieldDecoder):
+    """Decodes UTF-8 a whole field at once.
+
+    The subfield indicator is ASCII, so it cannot be part of a multibyte
+    sequence: decoding the field then splitting it gives the same values as
+    decoding each subfield. Fields which do not decode strictly go through
+    split_subfields.
+    """
+
+    def subfields(self, data):
+        """Return the subfields found in `data`, see _FieldDecoder.subfields."""
+        try:
+            text = data.decode(self.encoding, self.errors)
+        except UnicodeDecodeError:
+            return self.split_subfields(data)
+        subfields = text.split(SUBFIELD_INDICATOR)
+        del subfields[0]
+        result = []
+        try:
+            for subfield in subfields:
+                result += (subfield[0], subfield[1:])
+        except IndexError:
+            return self.split_subfields(data)
+        return result, ()
@@ -0,0 +1,159 @@
+# This file is part of pymarc. It is subject to the license terms in the
+# LICENSE file found in the top-level directory of this distribution and at
+# https://opensource.org/licenses/BSD-2-Clause. pymarc may be copied, modified,
+# propagated, or distributed according to the terms contained in the LICENSE
+# file.
+
+"""External merge sort of MARC files.
+
+Files that do not fit in memory are sorted on disk: records are read in
+batches of at most `buffer_size`, each batch is sorted by key and written to a
+temporary run file as raw transmission format, then the runs are merged with
+:func:`heapq.merge` into the output. At most `max_runs` runs are merged at
+once, more runs are first merged by groups into longer runs. Records are never
+re-encoded, the bytes written out are the bytes read in, unless they are given
+to a writer.
+"""
+
+import heapq
+import os
+import pickle
+import tempfile
+
+from pymarc.record import Record
+from pymarc.reader import iter_marc_chunks
+from pymarc.writer import Writer
+
+
+def field_key(path):
+    """Build a sort key function from a field path.
+
+    A path is a tag optionally followed by a subfield code: ``'001'`` sorts on
+    the value of the first 001 field, ``'245a'`` on the first 245 $a. Records
+    lacking the field sort first, as an empty string.
+
+    .. code-block:: python
+
+        key = field_key('245a')
+        key(record)  # 'The pragmatic programmer : '
+    """
+    tag, code = path[:3], path[3:4]
+
+    def key(record):
+        field = record[tag]
+        if field is None:
+            return ""
+        if code:
+            return field[code] or ""
+        return field.value()
+
+    return key
+
+
+def _write_run(entries, tmpdir):
+    """Write the sorted `entries` to a new temporary run file, return its path."""
+    fd, path = tempfile.mkstemp(prefix="pymarc-sort-", suffix=".run", dir=tmpdir)
+    try:
+        with os.fdopen(fd, "wb") as fh:
+            for entry in entries:
+                pickle.dump(entry, fh, pickle.HIGHEST_PROTOCOL)
+    except BaseException:
+        os.remove(path)
+        raise
+    return path
+
+
+def _read_run(path):
+    """Yield the (key, sequence, chunk) entries of a run file."""
+    with open(path, "rb") as fh:
+        while True:
+            try:
+                yield pickle.load(fh)
+            except EOFError:
+                return
+
+
+def sort_records(
+    marc_target,
+    out,
+    key="001",
+    buffer_size=100000,
+    reverse=False,
+    tmpdir=None,
+    max_runs=64,
+    **kwargs
+):
+    """Sort the records read from `marc_target` by `key` and write them to `out`.
+
+    * `marc_target` is raw MARC or a binary file-like object.
+    * `out` is a binary file-like object, to which the records are copied as
+      they were read, or a :class:`Writer <pymarc.writer.Writer>`, to whose
+      ``write`` the records are passed decoded again; it is not closed.
+    * `key` is a callable taking a :class:`Record <pymarc.record.Record>` or a
+      field path understood by :func:`field_key`.
+    * `buffer_size` is the maximum number of records held in memory at once.
+    * `tmpdir` is where the temporary run files are written.
+    * `max_runs` is the maximum number of run files read at once.
+
+    Other keyword arguments are passed to :class:`Record
+    <pymarc.record.Record>` when decoding the records to compute their key.
+    The sort is stable: records with equal keys keep their input order.
+
+    .. code-block:: python
+
+        with open('big.dat', 'rb') as fh, open('sorted.dat', 'wb') as out:
+            sort_records(fh, out, key='001', buffer_size=50000)
+    """
+    if max_runs < 2:
+        raise ValueError("max_runs must be at least 2")
+    if not callable(key):
+        key = field_key(key)
+    if isinstance(out, Writer):
+
+        def write(chunk):
+            out.write(Record(chunk, **kwargs))
+
+    else:
+        write = out.write
+
+    runs = []
+    batch = []
+    try:
+        for sequence, chunk in enumerate(iter_marc_chunks(marc_target)):
+            sort_key = key(Record(chunk, **kwargs))
+            if sort_key is None:
+                sort_key = ""
+            if reverse:
+                # keep equal keys in input order once the sort is reversed
+                sequence = -sequence
+            batch.append((sort_key, sequence, chunk))
+            if len(batch) >= buffer_size:
+                batch.sort(reverse=reverse)
+                runs.append(_write_run(batch, tmpdir))
+                batch = []
+
+        if not runs:
+            # everything fit in memory, no need to go through the disk
+            batch.sort(reverse=reverse)
+            for entry in batch:
+                write(entry[2])
+            return
+
+        if batch:
+            batch.sort(reverse=reverse)
+            runs.append(_write_run(batch, tmpdir))
+            batch = []
+        while len(runs) > max_runs:
+            # merge the oldest runs into a new one, each record goes through
+            # about log(len(runs), max_runs) merges
+            group = runs[:max_runs]
+            merged = heapq.merge(*[_read_run(path) for path in group], reverse=reverse)
+            runs.append(_write_run(merged, tmpdir))
+            del runs[:max_runs]
+            for path in group:
+                os.remove(path)
+        for entry in heapq.merge(*[_read_run(path) for path in runs], reverse=reverse):
+            write(entry[2])
+    finally:
+        for path in runs:
+            os.remove(path)
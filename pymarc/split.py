@@ -0,0 +1,271 @@
+# This file is part of pymarc. It is subject to the license terms in the
+# LICENSE file found in the top-level directory of this distribution and at
+# https://opensource.org/licenses/BSD-2-Clause. pymarc may be copied, modified,
+# propagated, or distributed according to the terms contained in the LICENSE
+# file.
+
+"""Split MARC, MARCXML and NDJSON files into shards, and join them back.
+
+Records are never decoded: MARC21 records are framed with the record length
+of their leader, MARCXML records are located with
+:class:`XmlFragmentReader <pymarc.marcxml.XmlFragmentReader>` and NDJSON has
+one record per line. The bytes of each record are copied as is, a missing end
+of line after the last NDJSON record being added.
+
+.. code-block:: python
+
+    from pymarc.split import split_file, join_shards
+
+    # 8 shards, records dispatched on a hash of their 001
+    paths = split_file('dump.mrc', 'shards/part-%02d.mrc', shards=8)
+
+    # back to the original order
+    with open('joined.mrc', 'wb') as out:
+        join_shards(paths, out)
+
+Next to each shard a manifest (the shard path plus ``.manifest``) lists, one
+line per record, its sequence number in the source file, its byte offset and
+its length.
+"""
+
+import heapq
+import json
+import re
+import zlib
+
+from pymarc.constants import DIRECTORY_ENTRY_LEN, LEADER_LEN, SUBFIELD_INDICATOR
+from pymarc.marcxml import XmlFragmentReader
+from pymarc.reader import read_marc_chunk
+
+FORMATS = ("marc", "xml", "ndjson")
+
+SUBFIELD_INDICATOR_BYTES = SUBFIELD_INDICATOR.encode("ascii")
+
+
+class _Records:
+    """Iterate over the (offset, bytes) of the records of a file."""
+
+    header = b""
+    footer = b""
+
+    def __init__(self, file_handle, format):
+        if format not in FORMATS:
+            raise ValueError("unknown format %r" % format)
+        self.format = format
+        self.file_handle = file_handle
+        if format == "xml":
+            self._records = XmlFragmentReader(file_handle)
+        else:
+            self._records = self._read()
+
+    def _read(self):
+        offset = 0
+        if self.format == "marc":
+            chunk = read_marc_chunk(self.file_handle)
+            while chunk is not None:
+                yield offset, chunk
+                offset += len(chunk)
+                chunk = read_marc_chunk(self.file_handle)
+        else:
+            for line in self.file_handle:
+                if line.strip():
+                    # only the last line can lack its end of line
+                    yield offset, line if line.endswith(b"\n") else line + b"\n"
+                offset += len(line)
+
+    def __iter__(self):
+        for offset, data in self._records:
+            if self.format == "xml":
+                self.header = self._records.header
+                self.footer = self._records.footer
+            yield offset, data
+
+
+def _marc_key(chunk, tag, code):
+    """Extract the value of a field from a raw MARC21 record."""
+    base_address = int(chunk[12:17])
+    for entry_start in range(LEADER_LEN, base_address - 1, DIRECTORY_ENTRY_LEN):
+        if chunk[entry_start : entry_start + 3] != tag:
+            continue
+        length = int(chunk[entry_start + 3 : entry_start + 7])
+        start = base_address + int(chunk[entry_start + 7 : entry_start + 12])
+        data = chunk[start : start + length - 1]
+        if not code:
+            return data
+        for subfield in data.split(SUBFIELD_INDICATOR_BYTES)[1:]:
+            if subfield[:1] == code:
+                return subfield[1:]
+    return b""
+
+
+def _xml_key(fragment, tag, code):
+    """Extract the value of a field from a raw MARCXML record."""
+    if not code:
+        match = re.search(
+            rb"<(?:[\w.-]+:)?controlfield[^>]*\btag=[\"']%s[\"'][^>]*>([^<]*)<" % tag,
+            fragment,
+        )
+        return match.group(1) if match else b""
+    match = re.search(
+        rb"<(?:[\w.-]+:)?datafield[^>]*\btag=[\"']%s[\"'][^>]*>(.*?)</(?:[\w.-]+:)?datafield"
+        % tag,
+        fragment,
+        re.S,
+    )
+    if match:
+        match = re.search(
+            rb"<(?:[\w.-]+:)?subfield[^>]*\bcode=[\"']%s[\"'][^>]*>([^<]*)<" % code,
+            match.group(1),
+        )
+    return match.group(1) if match else b""
+
+
+def _ndjson_key(line, tag, code):
+    """Extract the value of a field from a MARC-in-JSON line."""
+    tag = tag.decode("ascii")
+    for field in json.loads(line)["fields"]:
+        if tag not in field:
+            continue
+        value = field[tag]
+        if not code:
+            return value.encode("utf-8") if isinstance(value, str) else b""
+        for subfield in value.get("subfields", []):
+            if code.decode("ascii") in subfield:
+                return subfield[code.decode("ascii")].encode("utf-8")
+    return b""
+
+
+KEY_EXTRACTORS = {"marc": _marc_key, "xml": _xml_key, "ndjson": _ndjson_key}
+
+
+class _Shard:
+    """An output shard and its manifest."""
+
+    def __init__(self, path, header):
+        self.path = path
+        self.file_handle = open(path, "wb")
+        self.file_handle.write(header)
+        self.manifest = open(path + ".manifest", "w")
+        self.records = 0
+        self.bytes = 0
+
+    def write(self, sequence, offset, data):
+        self.file_handle.write(data)
+        self.manifest.write("%d\t%d\t%d\n" % (sequence, offset, len(data)))
+        self.records += 1
+        self.bytes += len(data)
+
+    def close(self, footer):
+        self.file_handle.write(footer)
+        self.file_handle.close()
+        self.manifest.close()
+
+
+def split_file(
+    source,
+    path_template,
+    format="marc",
+    records=None,
+    size=None,
+    shards=None,
+    key="001",
+):
+    """Split `source` into shards and return the list of their paths.
+
+    * `source` is a file name or a binary file-like object.
+    * `path_template` gives the shard paths, formatted with the shard number,
+      e.g. ``'part-%03d.mrc'``.
+    * `format` is one of 'marc', 'xml' or 'ndjson'.
+
+    Exactly one of the following selects how records are dispatched:
+
+    * `records`: a new shard every `records` records.
+    * `size`: a new shard before exceeding `size` bytes of records.
+    * `shards`: `shards` shards, on a CRC32 of `key`, a tag optionally followed
+      by a subfield code (``'001'``, ``'035a'``), so that records with the same
+      key end up in the same shard.
+
+    MARCXML shards are complete documents reusing the root element of the
+    source.
+    """
+    if sum(option is not None for option in (records, size, shards)) != 1:
+        raise ValueError("pass exactly one of records, size or shards")
+    if hasattr(source, "read"):
+        file_handle = source
+    else:
+        file_handle = open(source, "rb")
+
+    reader = _Records(file_handle, format)
+    extract = KEY_EXTRACTORS[format]
+    tag, code = key[:3].encode("ascii"), key[3:4].encode("ascii")
+    outputs = {}
+    current = 0
+    try:
+        for sequence, (offset, data) in enumerate(reader):
+            if shards is not None:
+                current = zlib.crc32(extract(data, tag, code)) % shards
+            elif current in outputs:
+                shard = outputs[current]
+                if (records is not None and shard.records >= records) or (
+                    size is not None and shard.bytes + len(data) > size
+                ):
+                    shard.close(reader.footer)
+                    current += 1
+            if current not in outputs:
+                outputs[current] = _Shard(path_template % current, reader.header)
+            outputs[current].write(sequence, offset, data)
+    finally:
+        for shard in outputs.values():
+            if not shard.file_handle.closed:
+                shard.close(reader.footer)
+        if file_handle is not source:
+            file_handle.close()
+    return [outputs[number].path for number in sorted(outputs)]
+
+
+def record_offsets(source, format="marc", key="001"):
+    """Yield the (key, offset, length) of the records of `source`.
+
+    `source` is a binary file-like object, `format` and `key` are as for
+    :func:`split_file`. Keys are returned as bytes, records are not decoded,
+    which makes it a cheap way to build an index of a large file.
+    """
+    records = _Records(source, format)
+    extract = KEY_EXTRACTORS[format]
+    tag, code = key[:3].encode("ascii"), key[3:4].encode("ascii")
+    for offset, data in records:
+        yield extract(data, tag, code), offset, len(data)
+
+
+def _read_manifest(path):
+    """Yield the sequence numbers listed in the manifest of a shard."""
+    with open(path + ".manifest") as manifest:
+        for line in manifest:
+            yield int(line.split("\t", 1)[0])
+
+
+def _sequenced(path, format, readers):
+    """Yield the (sequence, bytes) of the records of a shard."""
+    with open(path, "rb") as file_handle:
+        reader = _Records(file_handle, format)
+        readers.append(reader)
+        for sequence, (offset, data) in zip(_read_manifest(path), reader):
+            yield sequence, data
+
+
+def join_shards(paths, out, format="marc"):
+    """Join the shards made by :func:`split_file` into `out` in the original order.
+
+    `out` is a binary file-like object, it is not closed. Returns the number of
+    records written.
+    """
+    readers = []
+    count = 0
+    for sequence, data in heapq.merge(*[_sequenced(p, format, readers) for p in paths]):
+        if count == 0:
+            out.write(readers[0].header)
+        out.write(data)
+        count += 1
+    if count:
+        out.write(readers[0].footer)
+    return count
@@ -0,0 +1,286 @@
+# This file is part of pymarc. It is subject to the license terms in the
+# LICENSE file found in the top-level directory of this distribution and at
+# https://opensource.org/licenses/BSD-2-Clause. pymarc may be copied, modified,
+# propagated, or distributed according to the terms contained in the LICENSE
+# file.
+
+"""Counters of the records read and written.
+
+Every :class:`MARCReader <pymarc.reader.MARCReader>` and every writer keeps a
+:class:`Stats` object in its ``stats`` attribute:
+
+.. code-block:: python
+
+    reader = MARCReader(open('file.dat', 'rb'), permissive=True)
+    for record in reader:
+        ...
+    print(reader.stats.records, reader.stats.bytes)
+    print(reader.stats.errors)      # Counter({'RecordDirectoryInvalid': 2})
+    print(reader.stats.warnings)    # Counter({'missing indicators': 12})
+    print(reader.stats.anomalies.by_tag())    # Counter({'650': 10, '245': 2})
+
+Timing is optional, as it costs a few clock reads per field. With ``timing``
+set, ``stats.times`` holds the seconds spent reading the file (``io``),
+parsing leaders and directories (``directory``), decoding the subfields
+(``decoding``) and building the fields (``construction``); writers time
+``encoding`` and ``io``.
+
+Hooks are callables receiving each event as ``(event, value, label)``: the
+events are ``records``, ``bytes``, ``errors`` and ``warnings``, whose label
+is the exception name or the kind of warning, and ``seconds``, whose label is
+the phase. They send the counters wherever they are needed:
+
+.. code-block:: python
+
+    import prometheus_client
+
+    RECORDS = prometheus_client.Counter('marc_records', 'Records read')
+    ERRORS = prometheus_client.Counter('marc_errors', 'Bad records', ['error'])
+
+    def prometheus(event, value, label):
+        if event == 'records':
+            RECORDS.inc(value)
+        elif event == 'errors':
+            ERRORS.labels(label).inc(value)
+
+    stats = Stats(hooks=[prometheus, LoggingHook()])
+    reader = MARCReader(open('file.dat', 'rb'), stats=stats)
+
+A :class:`Stats` object can be shared by several readers or writers, to add
+up their counters, or the counters of another be added with
+:meth:`Stats.update`, e.g. those filled in a worker process.
+
+The problems found in the records a reader decodes, such as missing
+indicators, are collected in ``stats.anomalies``, an :class:`Anomalies` object
+counting them by kind and tag and keeping the offsets of a few of the records
+they were found in. They are not logged, unless asked for:
+
+.. code-block:: python
+
+    reader = MARCReader(fh, stats=Stats(anomalies=Anomalies(log=True)))
+"""
+
+from collections import Counter
+import logging
+import warnings
+
+from pymarc.exceptions import BadSubfieldCodeWarning
+
+READER_PHASES = ("io", "directory", "decoding", "construction")
+WRITER_PHASES = ("encoding", "io")
+
+# how each kind of anomaly is logged, with the data of its field
+LOG_MESSAGES = {
+    "missing indicators": "missing indicators: %s",
+    "only 1 indicator": "only 1 indicator found: %s",
+    "more than 2 indicators": "more than 2 indicators found: %s",
+    "unknown mnemonic": "unknown MARCMaker mnemonic: %s",
+}
+
+# the kinds of anomaly reported as a warning rather than logged
+WARNINGS = {"bad subfield code": BadSubfieldCodeWarning}
+
+
+def log_anomaly(kind, data=None):
+    """Log an anomaly found in field `data`, or warn about it."""
+    if kind in LOG_MESSAGES:
+        logging.warning(LOG_MESSAGES[kind], data)
+    elif kind in WARNINGS:
+        warnings.warn(WARNINGS[kind]())
+
+
+class Anomalies:
+    """Counts of the anomalies found in the records, by kind and tag.
+
+    For each kind of anomaly the offsets of the first `samples` records it
+    was found in are kept in ``samples``; offsets are counted from where the
+    reader started reading. If `log` is set every anomaly is also logged as it
+    is found, see :func:`log_anomaly`.
+    """
+
+    def __init__(self, samples=10, log=False):
+        """Create an empty collection."""
+        self.sample_size = samples
+        self.log = log
+        self.counts = Counter()
+        self.samples = {}
+        # offset of the record being decoded, set by the reader
+        self.offset = None
+
+    def __len__(self):
+        return sum(self.counts.values())
+
+    def add(self, kind, tag=None, data=None):
+        """Count an anomaly of `kind` in field `tag`, whose data is `data`."""
+        self.counts[kind, tag] += 1
+        offset = self.offset
+        if offset is not None:
+            samples = self.samples.setdefault(kind, [])
+            if len(samples) < self.sample_size and offset not in samples[-1:]:
+                samples.append(offset)
+        if self.log:
+            log_anomaly(kind, data)
+
+    def update(self, other):
+        """Add the counts and samples of `other`, another Anomalies."""
+        self.counts.update(other.counts)
+        for kind, offsets in other.samples.items():
+            samples = self.samples.setdefault(kind, [])
+            samples.extend(offsets[: self.sample_size - len(samples)])
+
+    def by_kind(self):
+        """Return the counts of each kind of anomaly."""
+        counts = Counter()
+        for (kind, tag), count in self.counts.items():
+            counts[kind] += count
+        return counts
+
+    def by_tag(self):
+        """Return the counts of anomalies in the fields of each tag."""
+        counts = Counter()
+        for (kind, tag), count in self.counts.items():
+            counts[tag] += count
+        return counts
+
+    def as_dict(self):
+        """Return the counts by kind then tag, and the samples, as a dictionary."""
+        counts = {}
+        for (kind, tag), count in sorted(self.counts.items(), key=str):
+            counts.setdefault(kind, {})[tag] = count
+        return {"counts": counts, "samples": dict(self.samples)}
+
+
+class _AnomalyLogger:
+    """Stands for the Stats of a record decoded without one: logs the anomalies."""
+
+    timing = False
+
+    def count_warning(self, kind, tag=None, data=None):
+        log_anomaly(kind, data)
+
+
+ANOMALY_LOGGER = _AnomalyLogger()
+
+
+class Stats:
+    """Counters of records, bytes, errors and warnings, and optional timings.
+
+    ``bytes`` counts the bytes read or written, the text of the JSON and text
+    writers being counted once encoded in UTF-8.
+    """
+
+    def __init__(self, timing=False, hooks=None, anomalies=None):
+        """Create zeroed counters, timing the phases if `timing` is set."""
+        self.timing = timing
+        self.hooks = list(hooks or ())
+        self.records = 0
+        self.bytes = 0
+        self.errors = Counter()
+        self.anomalies = Anomalies() if anomalies is None else anomalies
+        self.times = Counter()
+
+    def __repr__(self):
+        return "<Stats records=%d bytes=%d errors=%d warnings=%d>" % (
+            self.records,
+            self.bytes,
+            sum(self.errors.values()),
+            len(self.anomalies),
+        )
+
+    @property
+    def warnings(self):
+        """The counts of each kind of anomaly, see :class:`Anomalies`."""
+        return self.anomalies.by_kind()
+
+    def add_hook(self, hook):
+        """Call `hook` with every following event."""
+        self.hooks.append(hook)
+
+    def _emit(self, event, value, label=None):
+        for hook in self.hooks:
+            hook(event, value, label)
+
+    def count_record(self):
+        """Count a record read or written."""
+        self.records += 1
+        if self.hooks:
+            self._emit("records", 1)
+
+    def count_bytes(self, size):
+        """Count `size` bytes read or written."""
+        self.bytes += size
+        if self.hooks:
+            self._emit("bytes", size)
+
+    def count_error(self, exception):
+        """Count a record that could not be read because of `exception`."""
+        name = type(exception).__name__
+        self.errors[name] += 1
+        if self.hooks:
+            self._emit("errors", 1, name)
+
+    def count_warning(self, kind, tag=None, data=None):
+        """Count a recoverable problem found in a record, such as a missing indicator."""
+        self.anomalies.add(kind, tag, data)
+        if self.hooks:
+            self._emit("warnings", 1, kind)
+
+    def add_time(self, phase, seconds):
+        """Add `seconds` to the time spent in `phase`."""
+        self.times[phase] += seconds
+        if self.hooks:
+            self._emit("seconds", seconds, phase)
+
+    def update(self, other):
+        """Add the counters of `other`, e.g. filled in a worker process.
+
+        The hooks are called with the totals of `other`, one event per label.
+        """
+        self.records += other.records
+        self.bytes += other.bytes
+        self.errors.update(other.errors)
+        self.anomalies.update(other.anomalies)
+        self.times.update(other.times)
+        if self.hooks:
+            if other.records:
+                self._emit("records", other.records)
+            if other.bytes:
+                self._emit("bytes", other.bytes)
+            for name, count in other.errors.items():
+                self._emit("errors", count, name)
+            for kind, count in other.warnings.items():
+                self._emit("warnings", count, kind)
+            for phase, seconds in other.times.items():
+                self._emit("seconds", seconds, phase)
+
+    def as_dict(self):
+        """Return the counters as a dictionary, which can be dumped as JSON."""
+        return {
+            "records": self.records,
+            "bytes": self.bytes,
+            "errors": dict(self.errors),
+            "warnings": dict(self.warnings),
+            "anomalies": self.anomalies.as_dict(),
+            "times": dict(self.times),
+        }
+
+
+class LoggingHook:
+    """A hook logging the events to `logger`, at `level`."""
+
+    def __init__(self, logger="pymarc", level=logging.DEBUG, events=None):
+        """Log the `events` named, or all of them."""
+        if isinstance(logger, str):
+            logger = logging.getLogger(logger)
+        self.logger = logger
+        self.level = level
+        self.events = events
+
+    def __call__(self, event, value, label):
+        """Log an event."""
+        if self.events is not None and event not in self.events:
+            return
+        if label is None:
+            self.logger.log(self.level, "%s: %s", event, value)
+        else:
+            self.logger.log(self.level, "%s: %s (%s)", event, value, label)
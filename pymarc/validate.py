@@ -0,0 +1,273 @@
+# This file is part of pymarc. It is subject to the license terms in the
+# LICENSE file found in the top-level directory of this distribution and at
+# https://opensource.org/licenses/BSD-2-Clause. pymarc may be copied, modified,
+# propagated, or distributed according to the terms contained in the LICENSE
+# file.
+
+"""Structural validation of files of records in transmission format.
+
+The checks are done on the raw bytes, nothing is decoded: the record length
+and base address of the leader, the directory, the field and record
+terminators. Records are delimited by their terminator rather than by their
+length, so that one wrong length doesn't hide the records following it.
+
+.. code-block:: python
+
+    from pymarc.validate import validate_file
+
+    report = validate_file('dump.mrc', workers=4)
+    print(report.records, report.invalid)
+    for problem in report.problems:
+        print(problem.offset, problem.code, problem.tag, problem.detail)
+    json.dump(report.as_dict(), sys.stdout)
+
+Large files are split in shards of `shard_size` bytes checked in parallel by
+`workers` processes; the problems are reported in file order.
+"""
+
+from collections import Counter, namedtuple
+import mmap
+import multiprocessing
+import os
+import re
+
+from pymarc.constants import DIRECTORY_ENTRY_LEN, LEADER_LEN
+
+END_OF_FIELD = 0x1E
+END_OF_RECORD = b"\x1d"
+
+# bytes checked by one worker at a time
+SHARD_SIZE = 32 * 1024 * 1024
+
+# the problems found, see CODES
+RECORD_TOO_SHORT = "record-too-short"
+LENGTH_NOT_NUMERIC = "length-not-numeric"
+LENGTH_MISMATCH = "length-mismatch"
+BASE_ADDRESS_NOT_NUMERIC = "base-address-not-numeric"
+BASE_ADDRESS_INVALID = "base-address-invalid"
+DIRECTORY_NOT_TERMINATED = "directory-not-terminated"
+DIRECTORY_LENGTH_INVALID = "directory-length-invalid"
+DIRECTORY_ENTRY_INVALID = "directory-entry-invalid"
+NO_FIELDS = "no-fields"
+FIELD_OUT_OF_BOUNDS = "field-out-of-bounds"
+FIELD_NOT_TERMINATED = "field-not-terminated"
+FIELD_OVERLAP = "field-overlap"
+RECORD_NOT_TERMINATED = "record-not-terminated"
+TRAILING_DATA = "trailing-data"
+
+CODES = {
+    RECORD_TOO_SHORT: "the record is shorter than a leader and a directory",
+    LENGTH_NOT_NUMERIC: "the record length in the leader is not a number",
+    LENGTH_MISMATCH: "the record length in the leader is not its actual length",
+    BASE_ADDRESS_NOT_NUMERIC: "the base address in the leader is not a number",
+    BASE_ADDRESS_INVALID: "the base address is outside of the record",
+    DIRECTORY_NOT_TERMINATED: "the directory doesn't end with a field terminator",
+    DIRECTORY_LENGTH_INVALID: "the directory is not a whole number of entries",
+    DIRECTORY_ENTRY_INVALID: "the length or offset of an entry is not a number",
+    NO_FIELDS: "the directory is empty",
+    FIELD_OUT_OF_BOUNDS: "a field extends past the end of the record",
+    FIELD_NOT_TERMINATED: "a field doesn't end with a field terminator",
+    FIELD_OVERLAP: "a field overlaps the previous one",
+    RECORD_NOT_TERMINATED: "the last record doesn't end with a record terminator",
+    TRAILING_DATA: "only white space follows the last record",
+}
+
+Problem = namedtuple("Problem", ["offset", "code", "tag", "detail"])
+Problem.__doc__ = """A problem found in the record at `offset`.
+
+`code` is one of the keys of CODES, `tag` is the tag of the field concerned
+if any, `detail` gives the values found.
+"""
+
+# tag, field length and starting character position of a directory entry
+directory_entry_regex = re.compile(rb"(...)([0-9]{4})([0-9]{5})", re.S)
+
+
+def _check_record(data, start, stop, problems):
+    """Check the record in ``data[start:stop]``, terminator included."""
+    length = stop - start
+
+    def problem(code, tag=None, detail=None):
+        problems.append(Problem(start, code, tag, detail))
+
+    if length < LEADER_LEN + 2:
+        problem(RECORD_TOO_SHORT, detail="%d bytes" % length)
+        return
+
+    declared = data[start : start + 5]
+    if not declared.isdigit():
+        problem(LENGTH_NOT_NUMERIC, detail=repr(declared))
+    elif int(declared) != length:
+        problem(LENGTH_MISMATCH, detail="%d, actually %d" % (int(declared), length))
+
+    base_address = data[start + 12 : start + 17]
+    if not base_address.isdigit():
+        problem(BASE_ADDRESS_NOT_NUMERIC, detail=repr(base_address))
+        return
+    base_address = int(base_address)
+    if base_address <= LEADER_LEN or base_address >= length:
+        problem(BASE_ADDRESS_INVALID, detail=str(base_address))
+        return
+    if data[start + base_address - 1] != END_OF_FIELD:
+        problem(DIRECTORY_NOT_TERMINATED)
+
+    directory = data[start + LEADER_LEN : start + base_address - 1]
+    if len(directory) % DIRECTORY_ENTRY_LEN:
+        problem(DIRECTORY_LENGTH_INVALID, detail="%d bytes" % len(directory))
+    entries = directory_entry_regex.findall(directory)
+    if len(entries) * DIRECTORY_ENTRY_LEN != len(directory):
+        # find the invalid entries, one by one
+        entries = []
+        for position in range(0, len(directory), DIRECTORY_ENTRY_LEN):
+            entry = directory[position : position + DIRECTORY_ENTRY_LEN]
+            match = directory_entry_regex.fullmatch(entry)
+            if match:
+                entries.append(match.groups())
+            elif len(entry) == DIRECTORY_ENTRY_LEN:
+                problem(
+                    DIRECTORY_ENTRY_INVALID,
+                    entry[:3].decode("ascii", "replace"),
+                    repr(entry[3:]),
+                )
+    if not entries:
+        problem(NO_FIELDS)
+        return
+
+    # the data of the fields ends before the record terminator
+    end_of_data = length - 1
+    fields = []
+    for tag, field_length, offset in entries:
+        field_start = base_address + int(offset)
+        field_end = field_start + int(field_length)
+        if field_end > end_of_data:
+            problem(
+                FIELD_OUT_OF_BOUNDS,
+                tag.decode("ascii", "replace"),
+                "ends at %d of %d" % (field_end, end_of_data),
+            )
+        elif field_end == field_start or data[start + field_end - 1] != END_OF_FIELD:
+            problem(FIELD_NOT_TERMINATED, tag.decode("ascii", "replace"))
+        else:
+            fields.append((field_start, field_end, tag))
+
+    fields.sort()
+    previous_end = base_address
+    for field_start, field_end, tag in fields:
+        if field_start < previous_end:
+            problem(
+                FIELD_OVERLAP,
+                tag.decode("ascii", "replace"),
+                "starts at %d before %d" % (field_start, previous_end),
+            )
+        previous_end = max(previous_end, field_end)
+
+
+def _check_range(data, start, end):
+    """Check the records of `data` starting from `start` until `end`.
+
+    Returns the number of records and the problems found.
+    """
+    if start > 0:
+        # the first record starts after the terminator of the previous one
+        position = data.find(END_OF_RECORD, start - 1)
+        if position == -1:
+            return 0, []
+        start = position + 1
+    records = 0
+    problems = []
+    while start < end:
+        stop = data.find(END_OF_RECORD, start)
+        if stop == -1:
+            if data[start:].strip():
+                records += 1
+                problems.append(Problem(start, RECORD_NOT_TERMINATED, None, None))
+                # checked as if the terminator was there
+                _check_record(data, start, len(data) + 1, problems)
+            else:
+                problems.append(Problem(start, TRAILING_DATA, None, None))
+            break
+        records += 1
+        _check_record(data, start, stop + 1, problems)
+        start = stop + 1
+    return records, problems
+
+
+def validate_record(data):
+    """Return the problems found in `data`, a record in transmission format."""
+    problems = []
+    _check_record(data, 0, len(data), problems)
+    return problems
+
+
+def _check_shard(shard):
+    path, start, end = shard
+    with open(path, "rb") as fh, mmap.mmap(
+        fh.fileno(), 0, access=mmap.ACCESS_READ
+    ) as data:
+        return _check_range(data, start, end)
+
+
+class Report:
+    """The problems found in a file by :func:`validate_file`."""
+
+    def __init__(self, records=0, problems=None):
+        """Create a report, of `records` records."""
+        self.records = records
+        self.problems = problems or []
+
+    @property
+    def invalid(self):
+        """The number of records with a problem."""
+        return len(
+            set(
+                problem.offset
+                for problem in self.problems
+                if problem.code != TRAILING_DATA
+            )
+        )
+
+    def counts(self):
+        """Return the number of problems of each code."""
+        return Counter(problem.code for problem in self.problems)
+
+    def as_dict(self):
+        """Return the report as a dictionary, which can be dumped as JSON."""
+        return {
+            "records": self.records,
+            "invalid": self.invalid,
+            "counts": dict(self.counts()),
+            "problems": [problem._asdict() for problem in self.problems],
+        }
+
+
+def validate_file(source, workers=1, shard_size=SHARD_SIZE):
+    """Check the structure of the records of `source`, return a :class:`Report`.
+
+    `source` is the path of a file, or its content as bytes. A file is mapped
+    in memory and split in shards of `shard_size` bytes, checked by `workers`
+    processes.
+    """
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return Report(*_check_range(bytes(source), 0, len(source)))
+
+    size = os.path.getsize(source)
+    if size == 0:
+        return Report()
+    shard_size = max(1, min(shard_size, -(-size // workers)))
+    shards = [
+        (source, start, min(start + shard_size, size))
+        for start in range(0, size, shard_size)
+    ]
+    report = Report()
+    if workers > 1 and len(shards) > 1:
+        with multiprocessing.Pool(min(workers, len(shards))) as pool:
+            results = pool.imap(_check_shard, shards)
+            for records, problems in results:
+                report.records += records
+                report.problems.extend(problems)
+    else:
+        for shard in shards:
+            records, problems = _check_shard(shard)
+            report.records += records
+            report.problems.extend(problems)
+    return report
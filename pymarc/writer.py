@@ -5,25 +5,54 @@
 # file.
 
 """Pymarc Writer."""
-import json
-import xml.etree.ElementTree as ET
+from time import perf_counter
 
-import pymarc
 from pymarc import Record, WriteNeedsRecord
+from pymarc.marcxml import xml_backend
+from pymarc.stats import Stats
 
 
 class Writer(object):
-    """Base Writer object."""
+    """Base Writer object.
 
-    def __init__(self, file_handle):
+    The records and bytes written are counted in ``writer.stats``, a
+    :class:`Stats <pymarc.stats.Stats>` object; pass your own to time the
+    ``encoding`` and ``io`` of the records or to attach hooks to it.
+    """
+
+    def __init__(self, file_handle, stats=None):
         """Init."""
         self.file_handle = file_handle
+        self.stats = Stats() if stats is None else stats
 
     def write(self, record):
         """Write."""
         if not isinstance(record, Record):
             raise WriteNeedsRecord
 
+    def _write(self, record):
+        """Serialize `record`, write it and count it.
+
+        Only for the writers defining ``_serialize(record)``, which returns the
+        data written for `record`. Text is counted as its UTF-8 bytes.
+        """
+        stats = self.stats
+        if stats.timing:
+            start = perf_counter()
+            data = self._serialize(record)
+            encoded = perf_counter()
+            self.file_handle.write(data)
+            stats.add_time("encoding", encoded - start)
+            stats.add_time("io", perf_counter() - encoded)
+        else:
+            data = self._serialize(record)
+            self.file_handle.write(data)
+        if isinstance(data, str):
+            stats.count_bytes(len(data.encode("utf-8", "surrogatepass")))
+        else:
+            stats.count_bytes(len(data))
+        stats.count_record()
+
     def close(self, close_fh=True):
         """Closes the writer.
 
@@ -60,20 +89,29 @@ class JSONWriter(Writer):
         print(string)
     """
 
-    def __init__(self, file_handle):
-        """You need to pass in a text file like object."""
-        super(JSONWriter, self).__init__(file_handle)
+    def __init__(self, file_handle, stats=None, ensure_ascii=True):
+        """You need to pass in a text file like object.
+
+        If `ensure_ascii` is false the characters that are not ASCII are
+        written as they are rather than escaped.
+        """
+        super(JSONWriter, self).__init__(file_handle, stats)
+        self.ensure_ascii = ensure_ascii
         self.write_count = 0
         self.file_handle.write("[")
 
     def write(self, record):
         """Writes a record."""
         Writer.write(self, record)
-        if self.write_count > 0:
-            self.file_handle.write(",")
-        json.dump(record.as_dict(), self.file_handle, separators=(",", ":"))
+        self._write(record)
         self.write_count += 1
 
+    def _serialize(self, record):
+        data = record.as_json(separators=(",", ":"), ensure_ascii=self.ensure_ascii)
+        if self.write_count > 0:
+            return "," + data
+        return data
+
     def close(self, close_fh=True):
         """Closes the writer.
 
@@ -113,14 +151,17 @@ class MARCWriter(Writer):
         writer.close(close_fh=False)
     """
 
-    def __init__(self, file_handle):
+    def __init__(self, file_handle, stats=None):
         """You need to pass in a byte file like object."""
-        super(MARCWriter, self).__init__(file_handle)
+        super(MARCWriter, self).__init__(file_handle, stats)
 
     def write(self, record):
         """Writes a record."""
         Writer.write(self, record)
-        self.file_handle.write(record.as_marc())
+        self._write(record)
+
+    def _serialize(self, record):
+        return record.as_marc()
 
 
 class TextWriter(Writer):
@@ -147,19 +188,22 @@ class TextWriter(Writer):
         print(string)
     """
 
-    def __init__(self, file_handle):
+    def __init__(self, file_handle, stats=None):
         """You need to pass in a text file like object."""
-        super(TextWriter, self).__init__(file_handle)
+        super(TextWriter, self).__init__(file_handle, stats)
         self.write_count = 0
 
     def write(self, record):
         """Writes a record."""
         Writer.write(self, record)
-        if self.write_count > 0:
-            self.file_handle.write("\n")
-        self.file_handle.write(str(record))
+        self._write(record)
         self.write_count += 1
 
+    def _serialize(self, record):
+        if self.write_count > 0:
+            return "\n" + str(record)
+        return str(record)
+
 
 class XMLWriter(Writer):
     """A class for writing records as a MARCXML collection.
@@ -192,17 +236,24 @@ class XMLWriter(Writer):
         writer.close(close_fh=False)  # Important!
     """
 
-    def __init__(self, file_handle):
-        """You need to pass in a binary file like object."""
-        super(XMLWriter, self).__init__(file_handle)
+    def __init__(self, file_handle, stats=None, backend=None):
+        """You need to pass in a binary file like object.
+
+        The records are written by the XML `backend`, by default the fastest
+        installed, see :func:`pymarc.marcxml.xml_backend`.
+        """
+        super(XMLWriter, self).__init__(file_handle, stats)
+        self.backend = xml_backend(backend)
         self.file_handle.write(b'<?xml version="1.0" encoding="UTF-8"?>')
         self.file_handle.write(b'<collection xmlns="http://www.loc.gov/MARC21/slim">')
 
     def write(self, record):
         """Writes a record."""
         Writer.write(self, record)
-        node = pymarc.record_to_xml_node(record)
-        self.file_handle.write(ET.tostring(node, encoding="utf-8"))
+        self._write(record)
+
+    def _serialize(self, record):
+        return self.backend.record_to_xml(record, encoding="utf-8")
 
     def close(self, close_fh=True):
         """Closes the writer.
@@ -34,6 +34,7 @@ setup(
     author_email="ehs@pobox.com",
     license="http://www.opensource.org/licenses/bsd-license.php",
     packages=["pymarc"],
+    entry_points={"console_scripts": ["pymarc = pymarc.cli:main"]},
     description="Read, write and modify MARC bibliographic data",
     long_description=long_description,
     long_description_content_type="text/markdown",
@@ -0,0 +1,239 @@
+# This file is part of pymarc. It is subject to the license terms in the
+# LICENSE file found in the top-level directory of this distribution and at
+# https://opensource.org/licenses/BSD-2-Clause. pymarc may be copied, modified,
+# propagated, or distributed according to the terms contained in the LICENSE
+# file.
+
+import copy
+import pickle
+import unittest
+
+import pymarc
+from pymarc.batch import RecordBatch, batches, read_batches
+
+try:
+    from multiprocessing import shared_memory
+except ImportError:
+    shared_memory = None
+
+
+def read_records(path="test/marc.dat"):
+    with open(path, "rb") as fh:
+        return list(pymarc.MARCReader(fh))
+
+
+class PickleTest(unittest.TestCase):
+    def assertSameRecord(self, record, other):
+        self.assertIs(type(other), type(record))
+        self.assertEqual(other.__dict__.keys(), record.__dict__.keys())
+        self.assertIs(type(other.leader), type(record.leader))
+        self.assertEqual(str(other.leader), str(record.leader))
+        self.assertEqual(other.force_utf8, record.force_utf8)
+        self.assertEqual(str(other), str(record))
+        self.assertEqual(other.as_marc(), record.as_marc())
+
+    def test_pickle_records(self):
+        for path in ("test/marc.dat", "test/utf8_with_leader_flag.dat"):
+            for record in read_records(path):
+                other = pickle.loads(pickle.dumps(record))
+                self.assertSameRecord(record, other)
+
+    def test_pickle_xml_records(self):
+        for record in pymarc.parse_xml_to_array("test/batch.xml"):
+            other = pickle.loads(pickle.dumps(record))
+            self.assertIsInstance(other.leader, str)
+            self.assertSameRecord(record, other)
+
+    def test_pickle_is_compact(self):
+        record = read_records()[0]
+        compact = pickle.dumps(record)
+        default = pickle.dumps(record.__dict__)
+        self.assertLess(len(compact), len(default))
+
+    def test_pickle_fallback(self):
+        record = pymarc.Record(force_utf8=True)
+        record.add_field(pymarc.Field("001", data="1"))
+        record.add_field(pymarc.Field("245", ["1", "0"], ["a", "café ☃"]))
+        self.assertSameRecord(record, pickle.loads(pickle.dumps(record)))
+
+        # a record with other attributes, a subfield holding a subfield
+        # delimiter and a field too long are pickled as usual
+        record.note = "kept"
+        self.assertEqual(pickle.loads(pickle.dumps(record)).note, "kept")
+        del record.note
+        record.add_field(pymarc.Field("500", [" ", " "], ["a", "a\x1fbc"]))
+        self.assertEqual(
+            pickle.loads(pickle.dumps(record))["500"].subfields, ["a", "a\x1fbc"]
+        )
+        record.remove_fields("500")
+        record.add_field(pymarc.Field("520", [" ", " "], ["a", "x" * 10000]))
+        self.assertSameRecord(record, pickle.loads(pickle.dumps(record)))
+
+    def test_pickle_fields(self):
+        field = pymarc.Field("245", ["1", "0"], ["a", "Python /", "c", "Lutz."])
+        other = pickle.loads(pickle.dumps(field))
+        self.assertEqual(other.__dict__, field.__dict__)
+        field = pymarc.Field("008", data="830523s1982")
+        self.assertEqual(pickle.loads(pickle.dumps(field)).__dict__, field.__dict__)
+
+    def test_copy(self):
+        record = read_records()[0]
+        shallow = copy.copy(record)
+        self.assertIs(shallow.fields, record.fields)
+        deep = copy.deepcopy(record)
+        self.assertIsNot(deep.fields, record.fields)
+        self.assertEqual(str(deep), str(record))
+        field = record["245"]
+        self.assertIs(copy.copy(field).subfields, field.subfields)
+
+
+class RecordBatchTest(unittest.TestCase):
+    def setUp(self):
+        self.records = read_records()
+        record = pymarc.Record()
+        record.add_field(pymarc.Field("245", ["0", "0"], ["a", "a\x1fb"]))
+        self.records.append(record)
+
+    def assertSameRecords(self, records):
+        self.assertEqual(
+            [str(record) for record in records],
+            [str(record) for record in self.records],
+        )
+
+    def test_batch(self):
+        batch = RecordBatch(self.records)
+        self.assertEqual(len(batch), len(self.records))
+        self.assertSameRecords(batch)
+        self.assertEqual(str(batch[-1]), str(self.records[-1]))
+        self.assertEqual(str(batch[3]), str(self.records[3]))
+        self.assertRaises(IndexError, batch.__getitem__, len(self.records))
+
+    def test_from_buffer(self):
+        buffer = RecordBatch(self.records).to_bytes()
+        batch = RecordBatch.from_buffer(buffer)
+        self.assertSameRecords(batch)
+        batch.append(self.records[0])
+        self.assertEqual(str(batch[-1]), str(self.records[0]))
+        self.assertRaises(ValueError, RecordBatch.from_buffer, bytes(64))
+
+    def test_pickle(self):
+        batch = pickle.loads(pickle.dumps(RecordBatch(self.records)))
+        self.assertSameRecords(batch)
+
+    def test_batches(self):
+        sizes = [len(batch) for batch in batches(self.records, 8)]
+        self.assertEqual(sizes, [8, 8, 5])
+
+    @unittest.skipIf(shared_memory is None, "requires Python 3.8")
+    def test_shared_memory(self):
+        shm = RecordBatch(self.records).to_shared_memory()
+        try:
+            batch = RecordBatch.from_shared_memory(shm.name)
+            self.assertSameRecords(batch)
+            batch.close()
+            self.assertEqual(len(batch), 0)
+        finally:
+            shm.close()
+            shm.unlink()
+
+
+class ColumnsTest(unittest.TestCase):
+    def setUp(self):
+        with open("test/marc.dat", "rb") as fh:
+            self.data = fh.read()
+        self.records = list(pymarc.MARCReader(self.data))
+        self.batch = next(read_batches(self.data, size=100))
+
+    def test_read_batches(self):
+        self.assertEqual(len(self.batch), 20)
+        self.assertEqual(
+            [str(record) for record in self.batch],
+            [str(record) for record in self.records],
+        )
+        sizes = [len(batch) for batch in read_batches(self.data, size=8)]
+        self.assertEqual(sizes, [8, 8, 4])
+        record = self.batch.record(0, to_unicode=False)
+        self.assertIsInstance(record["245"], pymarc.RawField)
+
+    def test_read_batches_invalid(self):
+        data = b"00026cam  22000257a 4500" + b"" + self.data
+        self.assertRaises(pymarc.NoFieldsFound, list, read_batches(data))
+        batch = next(read_batches(data, permissive=True))
+        self.assertEqual(len(batch), 20)
+
+    def test_get_subfields(self):
+        expected = [
+            [
+                value
+                for field in record.get_fields("650")
+                for value in field.get_subfields("a")
+            ]
+            for record in self.records
+        ]
+        self.assertEqual(self.batch.get_subfields("650", "a"), expected)
+        # the records were decoded from MARC-8, they are packed as UTF-8
+        packed = RecordBatch(self.records)
+        self.assertEqual(packed.get_subfields("650", "a"), expected)
+        self.assertEqual(self.batch.get_subfields("999", "a"), [[]] * 20)
+
+    def test_get_data(self):
+        expected = [record["001"].data for record in self.records]
+        self.assertEqual(self.batch.get_data("001"), expected)
+        self.assertEqual(RecordBatch(self.records).get_data("001"), expected)
+        self.assertEqual(self.batch.get_data("009"), [None] * 20)
+
+    def test_has_tag(self):
+        record = pymarc.Record()
+        record.add_field(pymarc.Field("245", ["0", "0"], ["a", "a\x1fb"]))
+        batch = RecordBatch(self.records[:2] + [record])
+        self.assertEqual(batch.has_tag("245"), [True, True, True])
+        self.assertEqual(batch.has_tag("010"), [True, True, False])
+        # a tag found across two directory entries isn't a field
+        self.assertEqual(batch.has_tag("10 "), [False, False, False])
+        # nor is part of a tag
+        for tag in ("24", "45", "2", ""):
+            self.assertEqual(batch.has_tag(tag), [False, False, False])
+        self.assertEqual(batch.get_subfields("24", "a"), [[], [], []])
+        self.assertEqual(batch.get_data("00"), [None, None, None])
+
+    def test_tags_present(self):
+        present = self.batch.tags_present()
+        self.assertEqual(present["245"], 20)
+        self.assertEqual(
+            present["650"], sum("650" in record for record in self.records)
+        )
+        self.assertEqual(present, RecordBatch(self.records).tags_present())
+
+    def test_filter(self):
+        mask = [record["001"].data.endswith("4") for record in self.records]
+        selected = self.batch.filter(mask)
+        self.assertEqual(
+            [record["001"].data for record in selected],
+            [r["001"].data for r, keep in zip(self.records, mask) if keep],
+        )
+        self.assertEqual(
+            selected.get_subfields("245", "a"),
+            [v for v, keep in zip(self.batch.get_subfields("245", "a"), mask) if keep],
+        )
+        taken = self.batch.take([-1, 0])
+        self.assertEqual(taken.get_leaders(), self.batch.get_leaders()[::-19])
+
+    def test_from_buffer(self):
+        batch = RecordBatch.from_buffer(self.batch.to_bytes())
+        self.assertEqual(batch.get_data("001"), self.batch.get_data("001"))
+        self.assertEqual(
+            batch.get_subfields("245", "a"), self.batch.get_subfields("245", "a")
+        )
+        self.assertEqual(str(batch[5]), str(self.records[5]))
+
+
+def suite():
+    pickle_suite = unittest.makeSuite(PickleTest, "test")
+    batch_suite = unittest.makeSuite(RecordBatchTest, "test")
+    columns_suite = unittest.makeSuite(ColumnsTest, "test")
+    test_suite = unittest.TestSuite((pickle_suite, batch_suite, columns_suite))
+    return test_suite
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,220 @@
+# This file is part of pymarc. It is subject to the license terms in the
+# LICENSE file found in the top-level directory of this distribution and at
+# https://opensource.org/licenses/BSD-2-Clause. pymarc may be copied, modified,
+# propagated, or distributed according to the terms contained in the LICENSE
+# file.
+
+import contextlib
+import io
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+import pymarc
+from pymarc.cli import guess_format, main
+
+
+class CliTest(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def path(self, name):
+        return os.path.join(self.tmpdir, name)
+
+    def run_main(self, *argv):
+        out = io.StringIO()
+        err = io.StringIO()
+        with contextlib.redirect_stdout(out), contextlib.redirect_stderr(err):
+            status = main(list(argv))
+        return status, out.getvalue(), err.getvalue()
+
+    def test_guess_format(self):
+        self.assertEqual(guess_format("dump.MRC"), "marc")
+        self.assertEqual(guess_format("dump.xml"), "xml")
+        self.assertEqual(guess_format("dump.jsonl"), "ndjson")
+        self.assertEqual(guess_format("dump.mrk"), "mrk")
+        self.assertEqual(guess_format("dump"), "marc")
+
+    def test_count(self):
+        status, out, err = self.run_main(
+            "count", "test/marc.dat", "test/batch.xml", "test/batch.json"
+        )
+        self.assertEqual((status, out, err), (0, "24\n", ""))
+
+    def test_count_workers(self):
+        status, out, err = self.run_main("count", "-j", "2", "test/marc.dat")
+        self.assertEqual((status, out), (0, "20\n"))
+
+    def test_convert_round_trip(self):
+        source = "test/marc.dat"
+        for name in ("out.xml", "out.mrk", "out.ndjson", "out.json", "out.mrc"):
+            status, out, err = self.run_main("convert", source, self.path(name))
+            self.assertEqual(status, 0, err)
+            source = self.path(name)
+        with open("test/marc.dat", "rb") as fh, open(source, "rb") as result:
+            self.assertEqual(result.read(), fh.read())
+
+    def test_cat(self):
+        output = self.path("out.mrc")
+        status, out, err = self.run_main(
+            "cat", "test/marc.dat", "-r", "3", "-r", "1", "-t", "marc", "-o", output
+        )
+        with open(output, "rb") as fh:
+            records = list(pymarc.MARCReader(fh))
+        with open("test/marc.dat", "rb") as fh:
+            expected = list(pymarc.MARCReader(fh))
+        self.assertEqual(
+            [r.as_marc() for r in records],
+            [expected[0].as_marc(), expected[2].as_marc()],
+        )
+
+    def test_cat_ids(self):
+        ids = self.path("ids.txt")
+        with open(ids, "w") as fh:
+            fh.write("11778504\n\n12515882\n")
+        output = self.path("out.ndjson")
+        status, out, err = self.run_main(
+            "cat",
+            "test/marc.dat",
+            "--id-file",
+            ids,
+            "--id",
+            "13610512",
+            "-o",
+            output,
+            "-t",
+            "ndjson",
+        )
+        with open(output) as fh:
+            records = [json.loads(line) for line in fh]
+        self.assertEqual(
+            [r["fields"][0]["001"] for r in records],
+            ["11778504", "12515882", "13610512"],
+        )
+
+    def test_head(self):
+        output = self.path("out.json")
+        status, out, err = self.run_main(
+            "head", "-n", "2", "test/marc.dat", "-t", "json", "-o", output
+        )
+        self.assertEqual(status, 0)
+        with open(output) as fh:
+            records = json.load(fh)
+        self.assertEqual(len(records), 2)
+        self.assertEqual(records[0]["fields"][0], {"001": "11778504"})
+
+    def test_grep(self):
+        status, out, err = self.run_main(
+            "grep", "-c", "-i", "PYTHON", "-k", "245a", "test/marc.dat"
+        )
+        self.assertEqual(out, "14\n")
+        status, out, err = self.run_main(
+            "grep", "-c", "-v", "-i", "python", "-k", "245a", "test/marc.dat"
+        )
+        self.assertEqual(out, "6\n")
+        output = self.path("out.mrk")
+        self.run_main("grep", "Programming Python", "test/marc.dat", "-o", output)
+        with open(output) as fh:
+            records = list(pymarc.MARCMakerReader(fh))
+        self.assertTrue(records)
+        for record in records:
+            self.assertIn("Programming Python", str(record))
+
+    def test_grep_fixed_strings(self):
+        status, out, err = self.run_main(
+            "grep", "-c", "-i", "P.THON", "-k", "245a", "test/marc.dat"
+        )
+        self.assertEqual(out, "14\n")
+        status, out, err = self.run_main(
+            "grep", "-c", "-F", "-i", "P.THON", "-k", "245a", "test/marc.dat"
+        )
+        self.assertEqual(out, "0\n")
+        status, out, err = self.run_main(
+            "grep", "-c", "--fixed-strings", "Python (", "test/marc.dat"
+        )
+        self.assertEqual((status, err), (0, ""))
+
+    def test_ndjson_lines_kept(self):
+        with open("test/batch.json") as fh:
+            records = json.load(fh)
+        # lines as json.dumps writes them, ending with CR LF, the last without
+        lines = [json.dumps(record).encode("utf-8") for record in records]
+        source = self.path("in.ndjson")
+        with open(source, "wb") as fh:
+            fh.write(b"\r\n".join(lines))
+        output = self.path("out.ndjson")
+        status, out, err = self.run_main("convert", source, output)
+        self.assertEqual(status, 0, err)
+        with open(output, "rb") as fh:
+            self.assertEqual(fh.read(), b"\r\n".join(lines) + b"\n")
+        status, out, err = self.run_main(
+            "grep", "-t", "ndjson", "Ray Charles", source, "-o", output
+        )
+        with open(output, "rb") as fh:
+            self.assertEqual(fh.read(), lines[0] + b"\r\n")
+
+    def test_stats(self):
+        status, out, err = self.run_main("stats", "--json", "test/marc.dat")
+        report = json.loads(out)
+        self.assertEqual(report["records"], 20)
+        self.assertEqual(report["type_of_record"], {"a": 20})
+        self.assertEqual(report["tags"]["001"]["occurrences"], 20)
+        self.assertEqual(report["tags"]["245"]["subfields"]["a"], 20)
+        status, out, err = self.run_main("stats", "test/marc.dat")
+        self.assertTrue(out.startswith("records: 20\n"))
+
+    def test_index(self):
+        output = self.path("index.tsv")
+        status, out, err = self.run_main("index", "test/marc.dat", "-o", output)
+        with open(output) as fh:
+            lines = [line.rstrip("\n").split("\t") for line in fh]
+        self.assertEqual(len(lines), 20)
+        self.assertEqual(lines[0], ["11778504", "0", "1060"])
+        self.assertEqual(lines[1][1], "1060")
+
+    def test_split(self):
+        status, out, err = self.run_main(
+            "split", "test/marc.dat", self.path("part-%d.mrc"), "--records", "8"
+        )
+        self.assertEqual(status, 0)
+        self.assertEqual(len(out.split()), 3)
+
+    def test_validate(self):
+        status, out, err = self.run_main("validate", "test/marc.dat")
+        self.assertEqual((status, out, err), (0, "", ""))
+        status, out, err = self.run_main("validate", "--json", "test/bad_records.mrc")
+        self.assertEqual(status, 1)
+        report = json.loads(out)["test/bad_records.mrc"]
+        self.assertEqual(report["invalid"], 6)
+        self.assertEqual(report["problems"][0]["code"], "base-address-invalid")
+        self.assertEqual(err, "8 records, 6 failed\n")
+
+    def test_failures(self):
+        status, out, err = self.run_main("count", "test/bad_records.mrc")
+        self.assertEqual(status, 1)
+        self.assertIn("BaseAddressInvalid", err)
+        status, out, err = self.run_main(
+            "count", "--permissive", "test/bad_records.mrc"
+        )
+        self.assertEqual(status, 1)
+        self.assertEqual(out, "2\n")
+        self.assertEqual(err, "9 records, 7 failed\n")
+
+    def test_progress(self):
+        status, out, err = self.run_main("count", "--progress", "test/marc.dat")
+        self.assertEqual(status, 0)
+        self.assertIn("20 records, 0 failed", err)
+
+
+def suite():
+    test_suite = unittest.makeSuite(CliTest, "test")
+    return test_suite
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,126 @@
+# This file is part of pymarc. It is subject to the license terms in the
+# LICENSE file found in the top-level directory of this distribution and at
+# https://opensource.org/licenses/BSD-2-Clause. pymarc may be copied, modified,
+# propagated, or distributed according to the terms contained in the LICENSE
+# file.
+
+import os
+import tempfile
+import unittest
+
+import pymarc
+from pymarc import dedup
+
+
+def make_record(control_number, isbn=None, oclc=None, title="Python /"):
+    record = pymarc.Record()
+    record.add_field(pymarc.Field("001", data=control_number))
+    if isbn:
+        record.add_field(pymarc.Field("020", [" ", " "], ["a", isbn]))
+    if oclc:
+        record.add_field(pymarc.Field("035", [" ", " "], ["a", oclc]))
+    record.add_field(pymarc.Field("100", ["1", " "], ["a", "Lutz, Mark."]))
+    record.add_field(pymarc.Field("245", ["1", "0"], ["a", title]))
+    record.add_field(pymarc.Field("260", [" ", " "], ["c", "c2001."]))
+    return record
+
+
+class MatchKeysTest(unittest.TestCase):
+    def test_isbn_keys(self):
+        record = make_record("1", isbn="0-596-00128-x (pbk.)")
+        record.add_field(pymarc.Field("020", [" ", " "], ["a", "9780596001285"]))
+        self.assertEqual(dedup.isbn_keys(record), ["059600128X", "9780596001285"])
+
+    def test_oclc_keys(self):
+        record = make_record("1", oclc="(OCoLC)ocm00012345")
+        self.assertEqual(dedup.oclc_keys(record), ["12345"])
+        record = make_record("1", oclc="(DLC)12345")
+        self.assertEqual(dedup.oclc_keys(record), [])
+
+    def test_issn_keys(self):
+        record = make_record("1")
+        record.add_field(pymarc.Field("022", [" ", " "], ["a", "1234-567x"]))
+        self.assertEqual(dedup.issn_keys(record), ["1234567X"])
+
+    def test_title_author_year_keys(self):
+        record = make_record("1", title="Programming Pythön :")
+        self.assertEqual(
+            dedup.title_author_year_keys(record),
+            ["programming python/lutz mark/2001"],
+        )
+
+
+class MatchIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.catalog = [
+            make_record("a1", isbn="0596001282", title="Programming Python"),
+            make_record("a2", oclc="(OCoLC)42", title="Learning Python"),
+        ]
+        self.vendor = [
+            make_record("v1", isbn="0-596-00128-2", title="Other"),
+            make_record("v2", oclc="(OCoLC)ocn0042", title="Learning Python."),
+            make_record("v3", title="Programming python"),
+            make_record("v4", title="Unrelated"),
+        ]
+
+    def check(self, index):
+        matches = list(dedup.find_matches(index, iter(self.vendor)))
+        found = sorted((m.record_id, m.matched_id, m.matcher) for m in matches)
+        self.assertEqual(
+            found,
+            [
+                ("v1", "a1", "isbn"),
+                ("v2", "a2", "oclc"),
+                ("v2", "a2", "title_author_year"),
+                ("v3", "a1", "title_author_year"),
+            ],
+        )
+        exact = dedup.find_matches(index, iter(self.vendor), kinds=[dedup.EXACT])
+        self.assertEqual(sorted(m.record_id for m in exact), ["v1", "v2"])
+
+    def test_in_memory(self):
+        index = dedup.build_index(iter(self.catalog))
+        self.assertEqual(len(index), 4)
+        self.check(index)
+
+    def test_spill(self):
+        index = dedup.build_index(iter(self.catalog), max_keys=1)
+        path = index.path
+        self.assertTrue(os.path.exists(path))
+        self.check(index)
+        index.close()
+        self.assertFalse(os.path.exists(path))
+
+    def test_path(self):
+        fd, path = tempfile.mkstemp()
+        os.close(fd)
+        # the keys of the second record reach max_keys and are spilled to path
+        index = dedup.build_index(iter(self.catalog), path=path, max_keys=3)
+        self.assertEqual(len(index), 4)
+        self.check(index)
+        index.close()
+        self.assertTrue(os.path.exists(path))
+        # where another index finds them
+        index = dedup.MatchIndex(path=path)
+        self.check(index)
+        index.close()
+        os.remove(path)
+
+    def test_from_file(self):
+        with open("test/marc.dat", "rb") as fh:
+            index = dedup.build_index(fh)
+        with open("test/marc.dat", "rb") as fh:
+            matches = list(dedup.find_matches(index, fh, kinds=[dedup.EXACT]))
+        self.assertTrue(matches)
+        self.assertTrue(all(m.record_id == m.matched_id for m in matches))
+
+
+def suite():
+    keys_suite = unittest.makeSuite(MatchKeysTest, "test")
+    index_suite = unittest.makeSuite(MatchIndexTest, "test")
+    test_suite = unittest.TestSuite((keys_suite, index_suite))
+    return test_suite
+
+
+if __name__ == "__main__":
+    unittest.main()
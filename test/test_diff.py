@@ -0,0 +1,125 @@
+# This file is part of pymarc. It is subject to the license terms in the
+# LICENSE file found in the top-level directory of this distribution and at
+# https://opensource.org/licenses/BSD-2-Clause. pymarc may be copied, modified,
+# propagated, or distributed according to the terms contained in the LICENSE
+# file.
+
+import copy
+import json
+import unittest
+from io import BytesIO, StringIO
+
+import pymarc
+from pymarc import diff
+
+
+class DiffRecordsTest(unittest.TestCase):
+    def setUp(self):
+        with open("test/marc.dat", "rb") as fh:
+            self.old = next(pymarc.MARCReader(fh))
+        self.new = copy.deepcopy(self.old)
+
+    def assertPatches(self, patch):
+        # a patch survives a json round trip and rebuilds the new record
+        patch = json.loads(json.dumps(patch))
+        patched = diff.apply_patch(copy.deepcopy(self.old), patch)
+        self.assertEqual(patched.as_marc(), self.new.as_marc())
+
+    def test_equal(self):
+        self.assertEqual(diff.diff_records(self.old, self.new), [])
+
+    def test_leader(self):
+        self.new.leader = (
+            "00000" + str(self.old.leader)[5:6] + "x" + str(self.old.leader)[7:]
+        )
+        patch = diff.diff_records(self.old, self.new)
+        self.assertEqual(patch, [["L", str(self.new.leader)]])
+        self.assertPatches(patch)
+        patched = diff.apply_patch(copy.deepcopy(self.old), patch)
+        self.assertIsInstance(patched.leader, pymarc.Leader)
+        self.assertEqual(patched.leader.type_of_record, "x")
+
+    def test_add_remove_fields(self):
+        self.new.remove_fields("020")
+        self.new.add_ordered_field(
+            pymarc.Field("500", [" ", " "], ["a", "A new note."])
+        )
+        self.new.fields.insert(0, pymarc.Field("003", data="DLC"))
+        patch = diff.diff_records(self.old, self.new)
+        ops = [(op[0], op[2] if op[0] == "-" else list(op[2])[0]) for op in patch]
+        self.assertIn(("-", "020"), ops)
+        self.assertIn(("+", "500"), ops)
+        self.assertIn(("+", "003"), ops)
+        self.assertPatches(patch)
+
+    def test_change_subfields(self):
+        field = self.new["245"]
+        field["a"] = "The zombie programmer :"
+        field.add_subfield("h", "[electronic resource]", 1)
+        field.delete_subfield("c")
+        field.indicator1 = "0"
+        self.new["001"].data = "changed"
+        patch = diff.diff_records(self.old, self.new)
+        self.assertEqual([op[0] for op in patch], ["~", "~"])
+        self.assertEqual(patch[0], ["~", 0, "001", [["=", "changed"]]])
+        self.assertEqual(patch[1][2], "245")
+        self.assertEqual(patch[1][3][0], ["i", "0", field.indicator2])
+        self.assertPatches(patch)
+
+    def test_reorder(self):
+        self.new.fields.reverse()
+        self.assertPatches(diff.diff_records(self.old, self.new))
+
+    def test_bad_patch(self):
+        with self.assertRaises(ValueError):
+            diff.apply_patch(self.old, [["-", 0, "245"]])
+
+
+class DiffFilesTest(unittest.TestCase):
+    def setUp(self):
+        with open("test/marc.dat", "rb") as fh:
+            out = BytesIO()
+            pymarc.sort_records(fh, out, key="001")
+        self.old_raw = out.getvalue()
+        records = list(pymarc.MARCReader(self.old_raw))
+        del records[3]
+        records[0]["245"]["a"] = "Changed"
+        extra = copy.deepcopy(records[-1])
+        extra["001"].data = "zzz"
+        records.append(extra)
+        self.new_raw = b"".join(r.as_marc() for r in records)
+
+    def test_roundtrip(self):
+        patch = StringIO()
+        count = diff.diff_files(self.old_raw, self.new_raw, patch)
+        lines = [json.loads(line) for line in patch.getvalue().splitlines()]
+        self.assertEqual(count, 3)
+        self.assertEqual(
+            sorted(line["op"] for line in lines), ["add", "change", "delete"]
+        )
+
+        out = BytesIO()
+        writer = pymarc.MARCWriter(out)
+        diff.patch_file(self.old_raw, StringIO(patch.getvalue()), writer)
+        new_records = list(pymarc.MARCReader(self.new_raw))
+        patched = list(pymarc.MARCReader(out.getvalue()))
+        self.assertEqual(len(patched), len(new_records))
+        for expected, record in zip(new_records, patched):
+            self.assertEqual(diff.diff_records(expected, record), [])
+
+    def test_unsorted(self):
+        with open("test/marc.dat", "rb") as fh:
+            unsorted = fh.read()
+        with self.assertRaises(ValueError):
+            diff.diff_files(unsorted, unsorted, StringIO())
+
+
+def suite():
+    records_suite = unittest.makeSuite(DiffRecordsTest, "test")
+    files_suite = unittest.makeSuite(DiffFilesTest, "test")
+    test_suite = unittest.TestSuite((records_suite, files_suite))
+    return test_suite
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -4,10 +4,11 @@
 # propagated, or distributed according to the terms contained in the LICENSE
 # file.
 
+import pickle
 import unittest
 import sys
 
-from pymarc.field import Field
+from pymarc.field import Field, RawField, _new_field
 
 
 class FieldTest(unittest.TestCase):
@@ -131,6 +132,42 @@ class FieldTest(unittest.TestCase):
         f = Field(tag="42", indicators=["", ""])
         self.assertEqual(f.tag, "042")
 
+    def test_tag_interned(self):
+        tags = [Field(tag, data="x").tag for tag in ("001", 1, "1", " 1")]
+        self.assertEqual(tags, ["001"] * 4)
+        self.assertTrue(all(tag is tags[0] for tag in tags))
+        self.assertIs(Field("".join(["2", "45"]), [0, 1]).tag, self.field.tag)
+        self.assertEqual(Field("1 2", [0, 1]).tag, "1 2")
+        self.assertRaises(TypeError, Field, ["245"])
+
+    def test_new_field(self):
+        field = _new_field("245", ["0", "1"], ["a", "Huckleberry Finn: "])
+        self.assertIs(type(field), Field)
+        self.assertEqual(field.tag, "245")
+        self.assertEqual(field.indicators, ["0", "1"])
+        self.assertEqual(field["a"], "Huckleberry Finn: ")
+        self.assertFalse(field.is_control_field())
+        field = _new_field("8", data="831227")
+        self.assertEqual((field.tag, field.data), ("008", "831227"))
+        self.assertTrue(field.is_control_field())
+        field = _new_field("001", data=b"123", cls=RawField)
+        self.assertIsInstance(field, RawField)
+        self.assertEqual(field.as_marc(), b"123\x1e")
+
+    def test_is_control_field(self):
+        self.assertTrue(self.controlfield.is_control_field())
+        self.assertFalse(self.field.is_control_field())
+        # the kind of a field doesn't change with its tag
+        self.field.tag = "001"
+        self.assertFalse(self.field.is_control_field())
+        other = pickle.loads(pickle.dumps(self.field))
+        self.assertEqual(other.subfields, self.field.subfields)
+        self.assertFalse(other.is_control_field())
+        # nor of a field made without Field()
+        field = Field.__new__(Field)
+        field.tag = "005"
+        self.assertTrue(field.is_control_field())
+
     def test_alphatag(self):
         f = Field(tag="CAT", indicators=[0, 1], subfields=["a", "foo"])
         self.assertEqual(f.tag, "CAT")
@@ -191,6 +228,69 @@ class FieldTest(unittest.TestCase):
             b"99\x1faHuckleberry Finn: \x1fbAn American Odyssey\x1e",
         )
 
+    def test_nested_iteration(self):
+        pairs = [(a, b) for a in self.field for b in self.field]
+        self.assertEqual(len(pairs), 4)
+        self.assertEqual(
+            pairs[1], (("a", "Huckleberry Finn: "), ("b", "An American Odyssey"))
+        )
+
+    def test_pairs(self):
+        self.assertEqual(
+            self.field.pairs(),
+            [("a", "Huckleberry Finn: "), ("b", "An American Odyssey")],
+        )
+        self.assertEqual(self.controlfield.pairs(), [])
+
+    def test_subfield_index(self):
+        field = Field("505", ["0", " "], ["t", "One", "r", "A", "t", "Two", "g", "1"])
+        self.assertEqual(field.get_subfields("t"), ["One", "Two"])
+        self.assertEqual(field.get_subfields("g", "t"), ["One", "Two", "1"])
+        self.assertTrue("r" in field)
+
+        field.add_subfield("t", "Zero", 0)
+        self.assertEqual(field["t"], "Zero")
+        self.assertEqual(field.delete_subfield("r"), "A")
+        self.assertFalse("r" in field)
+        self.assertEqual(field.get_subfields("t"), ["Zero", "One", "Two"])
+
+        # replacing or extending the list directly is noticed too
+        field.subfields.extend(["x", "Extra"])
+        self.assertEqual(field["x"], "Extra")
+        field.subfields = ["a", "New"]
+        self.assertEqual(field.get_subfields("a", "t"), ["New"])
+        with self.assertRaises(KeyError):
+            field["t"] = "Gone"
+
+        # and so are codes changed in place, or pairs swapped
+        field.subfields[0] = "b"
+        self.assertIsNone(field["a"])
+        self.assertEqual(field["b"], "New")
+        field.subfields = ["a", "1", "b", "2"]
+        field.get_subfields("a")
+        field.subfields[0:4] = ["b", "2", "a", "1"]
+        self.assertEqual(field.get_subfields("a", "b"), ["2", "1"])
+        self.assertEqual(field["a"], "1")
+
+    def test_subfield_index_controlfield(self):
+        self.assertIsNone(self.controlfield["a"])
+        self.assertFalse("a" in self.controlfield)
+        self.assertEqual(self.controlfield.get_subfields("a"), [])
+
+    def test_fingerprint(self):
+        digest = self.field.fingerprint()
+        self.assertEqual(digest, self.field.fingerprint())
+        other = Field(
+            tag="245",
+            indicators=["0", "1"],
+            subfields=["a", "Huckleberry Finn: ", "b", "An American Odyssey"],
+        )
+        self.assertEqual(other.fingerprint(), digest)
+        other.tag = "246"
+        self.assertNotEqual(other.fingerprint(), digest)
+        self.field.add_subfield("c", "Mark Twain")
+        self.assertNotEqual(self.field.fingerprint(), digest)
+
 
 def suite():
     test_suite = unittest.makeSuite(FieldTest, "test")
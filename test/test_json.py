@@ -4,8 +4,10 @@
 # propagated, or distributed according to the terms contained in the LICENSE
 # file.
 
+import copy
 import json
 import unittest
+from io import BytesIO, StringIO
 
 import pymarc
 
@@ -100,6 +102,26 @@ class JsonTest(unittest.TestCase):
         for record in self.reader:
             self.assertEqual(dict, json.loads(record.as_json()).__class__)
 
+    def test_as_json_text(self):
+        record = pymarc.Record()
+        record.add_field(
+            pymarc.Field("001", data='a "quoted"\tcontrol\x1f'),
+            pymarc.Field("245", ["1", " "], ["a", "Café 中文 \U0001f600", "c", "\\"]),
+            pymarc.Field("500", [" ", " "], ["a", "no value", "b"]),
+        )
+        records = list(self.reader) + [record]
+        for record in records:
+            for kwargs in (
+                {},
+                {"separators": (",", ":")},
+                {"ensure_ascii": False},
+                {"indent": 2},
+                {"sort_keys": True},
+            ):
+                self.assertEqual(
+                    record.as_json(**kwargs), json.dumps(record.as_dict(), **kwargs)
+                )
+
 
 class JsonParse(unittest.TestCase):
     def setUp(self):
@@ -126,6 +148,71 @@ class JsonParse(unittest.TestCase):
         for from_dat, from_json in zip(self.batch_json, self.batch_xml):
             self.assertEqual(from_dat.as_marc(), from_json.as_marc(), "Icorrect Record")
 
+    def testNotModified(self):
+        with open("test/batch.json") as fh:
+            data = json.load(fh)
+        expected = copy.deepcopy(data)
+        records = pymarc.JsonHandler().elements(data)
+        self.assertEqual(data, expected)
+        self.assertEqual(
+            [record.as_dict() for record in records],
+            [record.as_dict() for record in self.batch_json],
+        )
+
+    def testStreaming(self):
+        with open("test/batch.json", "rb") as fh:
+            data = fh.read()
+        expected = json.loads(data)
+        ndjson = "\n".join(json.dumps(obj, ensure_ascii=False) for obj in expected)
+        # blocks of 7 bytes split the characters encoded on several bytes
+        for json_file in (
+            BytesIO(data),
+            StringIO(data.decode("utf-8")),
+            BytesIO(ndjson.encode("utf-8")),
+            "test/batch.json",
+            ndjson,
+        ):
+            self.assertEqual(
+                list(pymarc.iter_json_objects(json_file, block_size=7)), expected
+            )
+        self.assertEqual(
+            list(pymarc.iter_json_objects(json.dumps(expected[0]))), expected[:1]
+        )
+        self.assertEqual(list(pymarc.iter_json_objects("[]")), [])
+
+        records = list(pymarc.iter_json_records(BytesIO(data), block_size=7))
+        self.assertEqual(
+            [record.as_marc() for record in records],
+            [record.as_marc() for record in self.batch_json],
+        )
+        with open("test/batch.json") as fh:
+            records = list(pymarc.JSONReader(fh, stream=True))
+        self.assertEqual(
+            [record.as_marc() for record in records],
+            [record.as_marc() for record in self.batch_json],
+        )
+
+        with self.assertRaises(json.JSONDecodeError):
+            list(pymarc.iter_json_objects(BytesIO(data[:-10]), block_size=7))
+
+    def testStreamingMalformed(self):
+        with open("test/batch.json") as fh:
+            records = [json.dumps(obj) for obj in json.load(fh)]
+        size = len(records[0])
+        # a colon missing in the second record, followed by many others
+        broken = records[1].replace(":", "", 1)
+        malformed = "[%s, %s, %s]" % (records[0], broken, ", ".join(records * 100))
+        fh = BytesIO(malformed.encode("utf-8"))
+        with self.assertRaises(json.JSONDecodeError):
+            list(pymarc.iter_json_objects(fh, block_size=64, max_size=size))
+        self.assertLess(fh.tell(), 4 * size)
+
+        # an unterminated string
+        fh = BytesIO(b'[{"leader": "' + b"x" * len(malformed))
+        with self.assertRaises(json.JSONDecodeError):
+            list(pymarc.iter_json_objects(fh, block_size=64, max_size=size))
+        self.assertLess(fh.tell(), 4 * size)
+
 
 def suite():
     test_suite = unittest.makeSuite(JsonTest, "test")
@@ -53,6 +53,36 @@ class LeaderTest(unittest.TestCase):
         leader = Leader(LEADER)
         self.assertEqual(str(leader), LEADER)
 
+    def test_set_leader(self):
+        leader = Leader(LEADER)
+        leader.leader = "00000cam  2200000 a 4500"
+        self.assertEqual(str(leader), "00000cam  2200000 a 4500")
+        self.assertEqual(leader.bibliographic_level, "m")
+        self.assertEqual(leader.coding_scheme, " ")
+        with self.assertRaises(RecordLeaderInvalid):
+            leader.leader = LEADER[:-1]
+
+    def test_not_latin1(self):
+        leader = Leader("00000cam\u20ac 2200000 a 4500")
+        self.assertEqual(str(leader), "00000cam? 2200000 a 4500")
+        leader.leader = "00000\u4e2dam  2200000 a 4500"
+        self.assertEqual(leader.record_status, "?")
+        leader[22:24] = "\u20ac0"
+        self.assertEqual(str(leader), "00000?am  2200000 a 45?0")
+
+    def test_equality(self):
+        leader = Leader(LEADER)
+        self.assertEqual(leader, LEADER)
+        self.assertEqual(LEADER, leader)
+        self.assertEqual(leader, Leader(LEADER))
+        self.assertEqual(hash(leader), hash(LEADER))
+        self.assertIn(leader, {LEADER})
+        self.assertNotEqual(leader, LEADER.replace("c", "n"))
+        self.assertNotEqual(leader, LEADER.encode("ascii"))
+        leader.record_status = "n"
+        self.assertNotEqual(leader, LEADER)
+        self.assertEqual(leader, LEADER.replace("c", "n", 1))
+
     def test_add(self):
         leader = Leader(LEADER)
         new_leader = leader[0:9] + "b" + leader[10:]
@@ -81,6 +111,31 @@ class LeaderTest(unittest.TestCase):
             with self.assertRaises(BadLeaderValue):
                 setattr(leader, field, value)
 
+    def test_from_bytes(self):
+        leader = Leader.from_bytes(LEADER.encode("ascii") + b"rest of the record")
+        self.assertEqual(str(leader), LEADER)
+        self.assertEqual(bytes(leader), LEADER.encode("ascii"))
+        self.assertEqual(len(leader), 24)
+
+    def test_from_bytes_errors(self):
+        with self.assertRaises(RecordLeaderInvalid):
+            Leader.from_bytes(b"00475cas")
+        with self.assertRaises(UnicodeDecodeError):
+            Leader.from_bytes(LEADER[:23].encode("ascii") + b"\xe9")
+
+    def test_cached_positions(self):
+        leader = Leader(LEADER)
+        self.assertEqual(leader.type_of_record, "a")
+        self.assertEqual(leader.coding_scheme, "a")
+        leader[5:10] = "cam  "
+        self.assertEqual(leader.type_of_record, "a")
+        self.assertEqual(leader.bibliographic_level, "m")
+        self.assertEqual(leader.coding_scheme, " ")
+        self.assertEqual(str(leader), LEADER[:5] + "cam  " + LEADER[10:])
+        leader.type_of_record = "c"
+        self.assertEqual(leader[6], "c")
+        self.assertEqual(leader.type_of_record, "c")
+
 
 def suite():
     test_suite = unittest.makeSuite(LeaderTest, "test")
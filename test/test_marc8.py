@@ -10,7 +10,15 @@ import os
 from unittest import TestCase, makeSuite
 
 
-from pymarc import Field, MARCReader, MARCWriter, Record, marc8_to_unicode
+from pymarc import (
+    Field,
+    MARC8ToUnicode,
+    MARCReader,
+    MARCWriter,
+    RawField,
+    Record,
+    marc8_to_unicode,
+)
 
 
 class MARC8Test(TestCase):
@@ -194,6 +202,38 @@ class MARC8Test(TestCase):
             marc8_to_unicode(b"ALIF: \xae is U+02BC"), u"ALIF: \u02bc is U+02BC"
         )
 
+    def test_converter_reuse(self):
+        # the character set selected by an escape sequence does not carry
+        # over to the next value decoded with the same converter
+        converter = MARC8ToUnicode()
+        self.assertEqual(
+            marc8_to_unicode(b"CO\x1bb2", converter=converter), u"CO\u2082"
+        )
+        self.assertEqual(marc8_to_unicode(b"2", converter=converter), u"2")
+
+    def test_escape_does_not_leak_between_subfields(self):
+        field = RawField(
+            tag="245",
+            indicators=["0", "0"],
+            subfields=["a", b"CO\x1bb2", "b", b"2"],
+        )
+        record = Record()
+        record.add_field(field)
+        record = Record(record.as_marc())
+        self.assertEqual(record["245"]["a"], u"CO\u2082")
+        self.assertEqual(record["245"]["b"], u"2")
+
+    def test_utf8_replace_whole_field(self):
+        record = Record(force_utf8=True)
+        record.add_field(
+            Field(
+                tag="245", indicators=["0", "0"], subfields=["a", "caf\xe9", "b", "x"]
+            )
+        )
+        marc = record.as_marc().replace(b"caf\xc3\xa9", b"caf\xc3\x1f")
+        record = Record(marc, utf8_handling="replace")
+        self.assertEqual(record["245"].subfields, ["a", u"caf\ufffd", "b", "x"])
+
 
 def suite():
     test_suite = makeSuite(MARC8Test, "test")
@@ -47,6 +47,64 @@ class OrderedFieldsTest(unittest.TestCase):
 
         self.assertEqual(grouped, exp, "Fields are not grouped numerically")
 
+    def test_add_ordered_fields_batch(self):
+        tags = ("999", "888", "111", "abc", "666", "988", "998", "111", "00x", "001")
+        for mode in ("ordered", "grouped"):
+            one_by_one = pymarc.Record()
+            batch = pymarc.Record()
+            for record in (one_by_one, batch):
+                record.add_field(pymarc.Field("500", ["0", "0"], ["a", "first"]))
+            add_one = getattr(one_by_one, "add_%s_field" % mode)
+            add_batch = getattr(batch, "add_%s_fields" % mode)
+            for i, tag in enumerate(tags):
+                add_one(pymarc.Field(tag, ["0", "0"], ["a", str(i)]))
+            add_batch(
+                pymarc.Field(tag, ["0", "0"], ["a", str(i)])
+                for i, tag in enumerate(tags)
+            )
+            self.assertEqual(str(batch), str(one_by_one))
+
+    def test_add_ordered_field_unsorted(self):
+        record = pymarc.Record()
+        for tag in ("500", "100", "abc", "200"):
+            record.add_field(pymarc.Field(tag, ["0", "0"], ["a", "foo"]))
+        record.add_ordered_field(pymarc.Field("300", ["0", "0"], ["a", "foo"]))
+        record.add_ordered_fields([pymarc.Field("150", ["0", "0"], ["a", "foo"])])
+        self.assertEqual(
+            [f.tag for f in record], ["150", "300", "500", "100", "abc", "200"]
+        )
+
+    def test_add_ordered_field_after_changes(self):
+        record = pymarc.Record()
+        for tag in ("100", "500", "700"):
+            record.add_ordered_field(pymarc.Field(tag, ["0", "0"], ["a", "foo"]))
+        record.remove_field(record.fields[1])
+        record.add_field(pymarc.Field("800", ["0", "0"], ["a", "foo"]))
+        record.add_ordered_field(pymarc.Field("600", ["0", "0"], ["a", "foo"]))
+        self.assertEqual([f.tag for f in record], ["100", "600", "700", "800"])
+        record.fields.insert(0, pymarc.Field("900", ["0", "0"], ["a", "foo"]))
+        record.add_ordered_field(pymarc.Field("650", ["0", "0"], ["a", "foo"]))
+        self.assertEqual(
+            [f.tag for f in record], ["650", "900", "100", "600", "700", "800"]
+        )
+        record.fields = record.fields[1:]
+        record.add_ordered_field(pymarc.Field("200", ["0", "0"], ["a", "foo"]))
+        self.assertEqual(
+            [f.tag for f in record], ["200", "900", "100", "600", "700", "800"]
+        )
+
+    def test_add_ordered_field_after_list_edits(self):
+        record = pymarc.Record()
+        for tag in ("100", "500", "700"):
+            record.add_ordered_field(pymarc.Field(tag, ["0", "0"], ["a", "foo"]))
+        record.fields[0] = pymarc.Field("800", ["0", "0"], ["a", "foo"])
+        record.add_ordered_field(pymarc.Field("600", ["0", "0"], ["a", "foo"]))
+        self.assertEqual([f.tag for f in record], ["600", "800", "500", "700"])
+        record.fields.remove(record.fields[1])
+        record.fields.append(pymarc.Field("300", ["0", "0"], ["a", "foo"]))
+        record.add_ordered_field(pymarc.Field("650", ["0", "0"], ["a", "foo"]))
+        self.assertEqual([f.tag for f in record], ["600", "500", "650", "700", "300"])
+
 
 def suite():
     test_suite = unittest.makeSuite(OrderedFieldsTest, "test")
@@ -0,0 +1,133 @@
+# This file is part of pymarc. It is subject to the license terms in the
+# LICENSE file found in the top-level directory of this distribution and at
+# https://opensource.org/licenses/BSD-2-Clause. pymarc may be copied, modified,
+# propagated, or distributed according to the terms contained in the LICENSE
+# file.
+
+from io import BytesIO
+import unittest
+from xml.parsers.expat import ExpatError
+
+import pymarc
+from pymarc.pipeline import Pipeline, guess_format, sniff_format
+
+FILES = ("test/marc.dat", "test/batch.xml", "test/batch.json")
+
+
+def title(record):
+    return record.title()
+
+
+def has_subjects(record):
+    return "650" in record
+
+
+def read_titles():
+    with open("test/marc.dat", "rb") as fh:
+        titles = [record.title() for record in pymarc.MARCReader(fh)]
+    titles += [record.title() for record in pymarc.parse_xml_to_array(FILES[1])]
+    with open(FILES[2]) as fh:
+        titles += [record.title() for record in pymarc.JSONReader(fh.read())]
+    return titles
+
+
+class PipelineTest(unittest.TestCase):
+    def setUp(self):
+        self.titles = read_titles()
+
+    def test_formats(self):
+        self.assertEqual(guess_format("dump.MRC"), "marc")
+        self.assertEqual(guess_format("dump.bin", None), None)
+        for path, format in zip(FILES, ("marc", "xml", "json")):
+            with open(path, "rb") as fh:
+                self.assertEqual(sniff_format(fh), format)
+                self.assertEqual(fh.tell(), 0)
+        self.assertEqual(sniff_format(BytesIO(b"<record/>")), "marc")
+
+    def test_results(self):
+        pipeline = Pipeline().map(title)
+        self.assertEqual(list(pipeline.results(*FILES)), self.titles)
+
+    def test_inputs(self):
+        with open("test/batch.json", "rb") as fh:
+            data = fh.read()
+        with open("test/batch.xml", "rb") as xml, open("test/marc.dat", "rb") as fh:
+            inputs = [pymarc.MARCReader(fh), xml, (BytesIO(data), "json")]
+            titles = list(Pipeline().map(title).results(*inputs))
+        self.assertEqual(titles, self.titles)
+
+    def test_threads(self):
+        pipeline = Pipeline(workers=3, batch_size=4).map(title)
+        self.assertEqual(list(pipeline.results(*FILES)), self.titles)
+        pipeline = Pipeline(workers=3, batch_size=4, ordered=False).map(title)
+        self.assertEqual(sorted(pipeline.results(*FILES)), sorted(self.titles))
+
+    def test_processes(self):
+        pipeline = Pipeline(workers=2, processes=True, batch_size=4).map(title)
+        self.assertEqual(list(pipeline.results(*FILES)), self.titles)
+
+    def test_filter(self):
+        pipeline = Pipeline(workers=2, batch_size=4).filter(has_subjects)
+        with open("test/marc.dat", "rb") as fh:
+            expected = [r.title() for r in pymarc.MARCReader(fh) if "650" in r]
+        self.assertEqual(
+            [record.title() for record in pipeline.results(FILES[0])], expected
+        )
+
+    def test_run(self):
+        output = BytesIO()
+        writer = pymarc.MARCWriter(output)
+        count = Pipeline(workers=2).filter(has_subjects).run(*FILES, writer=writer)
+        self.assertEqual(count, len(list(pymarc.MARCReader(output.getvalue()))))
+        titles = []
+        count = Pipeline().map(title).run(*FILES, consumer=titles.append)
+        self.assertEqual(count, len(self.titles))
+        self.assertEqual(titles, self.titles)
+
+    def test_permissive(self):
+        for workers in (1, 2):
+            pipeline = Pipeline(workers=workers)
+            self.assertRaises(
+                pymarc.BaseAddressInvalid, pipeline.run, "test/bad_records.mrc"
+            )
+        pipeline = Pipeline(workers=2, permissive=True)
+        self.assertEqual(pipeline.run("test/bad_records.mrc"), 2)
+        self.assertEqual(pipeline.failures, 7)
+
+    def test_stats(self):
+        for workers, processes in ((1, False), (2, False), (2, True)):
+            pipeline = Pipeline(workers, processes, permissive=True)
+            pipeline.run("test/bad_records.mrc", "test/bad_indicator.dat")
+            self.assertEqual(pipeline.stats.records, 3)
+            self.assertEqual(sum(pipeline.stats.errors.values()), pipeline.failures)
+            self.assertEqual(pipeline.stats.errors["RecordLengthInvalid"], 2)
+            self.assertEqual(pipeline.stats.warnings, {"missing indicators": 1})
+        # the counters of the runs add up, shared with other pipelines
+        stats = pymarc.Stats()
+        for i in range(2):
+            Pipeline(stats=stats).run(FILES[0])
+        self.assertEqual(stats.records, 40)
+
+    def test_truncated_xml(self):
+        with open(FILES[1], "rb") as fh:
+            raw = fh.read()
+        raw = raw[: raw.rindex(b"</marc:record>")]
+        self.assertRaises(ExpatError, Pipeline().run, (BytesIO(raw), "xml"))
+        pipeline = Pipeline(permissive=True)
+        self.assertEqual(pipeline.run((BytesIO(raw), "xml")), 1)
+        self.assertEqual(pipeline.failures, 1)
+
+    def test_map_records(self):
+        titles = []
+        with open("test/marc.dat", "rb") as fh:
+            pymarc.map_records(lambda record: titles.append(record.title()), fh)
+        self.assertEqual(titles, self.titles[:20])
+
+
+def suite():
+    test_suite = unittest.makeSuite(PipelineTest, "test")
+    return test_suite
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -6,6 +6,7 @@
 # propagated, or distributed according to the terms contained in the LICENSE
 # file.
 
+import io
 import re
 import unittest
 
@@ -170,11 +171,84 @@ class MARCReaderFilePermissiveTest(unittest.TestCase):
                 )
 
 
+class MARCMakerReaderTest(unittest.TestCase):
+    def test_round_trip(self):
+        with open("test/marc.dat", "rb") as fh:
+            records = list(pymarc.MARCReader(fh))
+        text = io.StringIO()
+        writer = pymarc.TextWriter(text)
+        for record in records:
+            writer.write(record)
+        text.seek(0)
+        read = list(pymarc.MARCMakerReader(text))
+        self.assertEqual(len(read), len(records))
+        for record, expected in zip(read, records):
+            self.assertEqual(str(record), str(expected))
+            self.assertEqual(record.as_marc(), expected.as_marc())
+
+    def test_mnemonics_and_blanks(self):
+        text = (
+            "=LDR  00000nam\\\\2200000\\a\\4500\n"
+            "=008  900522s1990\\\\\\\\mau\n"
+            "=245  \\0$aMoney {dollar}1 {lcub}sic{rcub} {bsol} {esc}b2{esc}s$bx\n"
+            "=500  \\\\$aOne {U+20AC} and {unknown}$b{copy}\n"
+        )
+        reader = pymarc.MARCMakerReader(text)
+        (record,) = reader
+        self.assertEqual(str(record.leader), "00000nam  2200000 a 4500")
+        self.assertEqual(record["008"].data, "900522s1990    mau")
+        self.assertEqual(record["245"].indicators, [" ", "0"])
+        self.assertEqual(record["245"]["a"], "Money $1 {sic} \\ \x1bb2\x1bs")
+        self.assertEqual(record["245"]["b"], "x")
+        self.assertEqual(record["500"]["a"], "One \u20ac and {unknown}")
+        self.assertEqual(record["500"]["b"], "{copy}")
+        self.assertEqual(
+            reader.stats.anomalies.counts, {("unknown mnemonic", "500"): 2}
+        )
+
+    def test_records_and_lines(self):
+        text = (
+            b"\xef\xbb\xbf=LDR  00000nam  2200000 a 4500\r\n"
+            b"=001  1\r\n"
+            b"=245  10$aA long title,\r\n"
+            b" split on two lines.\r\n"
+            b"=LDR  00000nam  2200000 a 4500\r\n"
+            b"=001  2\r\n"
+            b"\r\n"
+            b"\r\n"
+            b"=001  3\r\n"
+            b"=245  00$aCaf\xc3\xa9\r\n"
+        )
+        records = list(pymarc.MARCMakerReader(io.BytesIO(text), force_utf8=True))
+        self.assertEqual([r["001"].data for r in records], ["1", "2", "3"])
+        self.assertEqual(records[0]["245"]["a"], "A long title, split on two lines.")
+        self.assertEqual(records[2]["245"]["a"], "Caf\xe9")
+        self.assertEqual(records[2].leader[9], "a")
+        self.assertEqual(
+            next(pymarc.MARCReader(records[2].as_marc()))["245"]["a"], "Caf\xe9"
+        )
+
+    def test_invalid_line(self):
+        text = "=001  1\n=24510$aNo separator\n\n=001  2\n"
+        with self.assertRaises(pymarc.MARCMakerLineInvalid) as context:
+            list(pymarc.MARCMakerReader(text))
+        self.assertEqual(context.exception.line_number, 2)
+
+        reader = pymarc.MARCMakerReader(text, permissive=True)
+        self.assertIsNone(next(reader))
+        self.assertIsInstance(reader.current_exception, pymarc.MARCMakerLineInvalid)
+        self.assertEqual(next(reader)["001"].data, "2")
+        self.assertRaises(StopIteration, next, reader)
+
+
 def suite():
     file_suite = unittest.makeSuite(MARCReaderFileTest, "test")
     string_suite = unittest.makeSuite(MARCReaderStringTest, "test")
     permissive_file_suite = unittest.makeSuite(MARCReaderFilePermissiveTest, "test")
-    test_suite = unittest.TestSuite((file_suite, string_suite, permissive_file_suite))
+    marcmaker_suite = unittest.makeSuite(MARCMakerReaderTest, "test")
+    test_suite = unittest.TestSuite(
+        (file_suite, string_suite, permissive_file_suite, marcmaker_suite)
+    )
     return test_suite
 
 
@@ -9,7 +9,7 @@ import unittest
 from pymarc.exceptions import BaseAddressInvalid, FieldNotFound, RecordLeaderInvalid
 from pymarc.field import Field
 from pymarc.reader import MARCReader
-from pymarc.record import Record
+from pymarc.record import Record, fingerprints
 
 
 class RecordTest(unittest.TestCase):
@@ -499,6 +499,113 @@ class RecordTest(unittest.TestCase):
         transmission_format_leader = transmission_format[0:24]
         self.assertEqual(transmission_format_leader, b"00067fghia2200037rst4500")
 
+    def test_nested_iteration(self):
+        record = Record()
+        record.add_field(Field("001", data="1"), Field("650", [" ", "0"], ["a", "x"]))
+        pairs = [(a.tag, b.tag) for a in record for b in record]
+        self.assertEqual(
+            pairs, [("001", "001"), ("001", "650"), ("650", "001"), ("650", "650")]
+        )
+
+    def test_iter_tag(self):
+        record = Record()
+        subjects = [Field("650", [" ", "0"], ["a", str(i)]) for i in range(3)]
+        record.add_field(Field("001", data="1"), *subjects)
+        self.assertEqual(list(record.iter_tag("650")), subjects)
+        self.assertEqual(list(record.iter_tag("245")), [])
+
+    def test_leader_string(self):
+        with open("test/marc.dat", "rb") as fh:
+            record = next(MARCReader(fh))
+        self.assertEqual(record.leader, "01060cam  22002894a 4500")
+        record.leader.leader = "00000cam  2200000 a 4500"
+        self.assertEqual(record.leader, "00000cam  2200000 a 4500")
+
+    def test_fingerprint(self):
+        with open("test/utf8_with_leader_flag.dat", "rb") as fh:
+            record = next(MARCReader(fh, keep_raw=True))
+        self.assertIsNotNone(record["240"]._raw)
+        digest = record.fingerprint()
+
+        # the raw bytes and the serialized fields give the same digest
+        with open("test/utf8_with_leader_flag.dat", "rb") as fh:
+            other = next(MARCReader(fh))
+        self.assertIsNone(other["240"]._raw)
+        self.assertEqual(other.fingerprint(), digest)
+
+        # record length and base address are not part of the fingerprint
+        record.leader = "99999" + record.leader[5:12] + "99999" + record.leader[17:]
+        self.assertEqual(record.fingerprint(), digest)
+
+        record["240"]["a"] = "Changed"
+        self.assertNotEqual(record.fingerprint(), digest)
+
+    def test_fingerprint_direct_edits(self):
+        with open("test/utf8_with_leader_flag.dat", "rb") as fh:
+            record = next(MARCReader(fh, keep_raw=True))
+        field = record["240"]
+        indicators = field.indicators
+        digest = record.fingerprint()
+        field_digest = field.fingerprint()
+
+        field.indicators = ["9", "9"]
+        self.assertNotEqual(field.fingerprint(), field_digest)
+        self.assertNotEqual(record.fingerprint(), digest)
+        field.indicators = indicators
+        self.assertEqual(record.fingerprint(), digest)
+
+        # the subfields edited in place are hashed like a new field
+        field.subfields[1] = "Changed"
+        self.assertNotEqual(record.fingerprint(), digest)
+        field.subfields += ["z", "More"]
+        new_field = Field("240", field.indicators, list(field.subfields))
+        self.assertEqual(field.fingerprint(), new_field.fingerprint())
+
+    def test_fingerprint_ignore_tags(self):
+        with open("test/marc.dat", "rb") as fh:
+            record = next(MARCReader(fh))
+        digest = record.fingerprint(ignore_tags=["005"])
+        record["005"].data = "20201019000000.0"
+        self.assertEqual(record.fingerprint(ignore_tags=["005"]), digest)
+        self.assertNotEqual(record.fingerprint(), digest)
+
+    def test_fingerprint_not_raw(self):
+        with open("test/bad_indicator.dat", "rb") as fh:
+            record = next(MARCReader(fh, force_utf8=True, keep_raw=True))
+        # the field with missing indicators can't be hashed from its raw bytes
+        self.assertIsNone(record.fields[0]._raw)
+        self.assertIsNotNone(record["245"]._raw)
+        digest = record.fingerprint()
+        for field in record.fields:
+            field._raw = None
+        self.assertEqual(record.fingerprint(), digest)
+
+    def test_fingerprints(self):
+        with open("test/marc.dat", "rb") as fh:
+            digests = [d for r, d in fingerprints(MARCReader(fh, keep_raw=True))]
+        with open("test/marc.dat", "rb") as fh:
+            self.assertEqual(digests, [r.fingerprint() for r in MARCReader(fh)])
+        self.assertEqual(len(set(digests)), len(digests))
+
+    def test_decode_directory_with_spaces(self):
+        record = Record()
+        record.add_field(Field(tag="001", data="12345"))
+        record.add_field(Field(tag="245", indicators=["0", "0"], subfields=["a", "x"]))
+        marc = record.as_marc()
+        # directory entry lengths padded with spaces instead of zeros
+        padded = marc[:24] + marc[24:48].replace(b"0006", b"   6", 1) + marc[48:]
+        self.assertEqual(Record(padded).as_marc(), marc)
+
+    def test_decode_empty_subfield(self):
+        record = Record()
+        record.add_field(
+            Field(tag="245", indicators=["0", "0"], subfields=["a", "x", "b", "y"])
+        )
+        marc = record.as_marc().replace(b"\x1fax\x1fby", b"\x1fax\x1f\x1fy")
+        field = Record(marc)["245"]
+        self.assertEqual(field.subfields, ["a", "x", "y", ""])
+        self.assertIsNone(field._raw)
+
 
 def suite():
     test_suite = unittest.makeSuite(RecordTest, "test")
@@ -0,0 +1,99 @@
+# This file is part of pymarc. It is subject to the license terms in the
+# LICENSE file found in the top-level directory of this distribution and at
+# https://opensource.org/licenses/BSD-2-Clause. pymarc may be copied, modified,
+# propagated, or distributed according to the terms contained in the LICENSE
+# file.
+
+import os
+import tempfile
+import unittest
+from io import BytesIO
+
+import pymarc
+from pymarc.sort import field_key
+
+
+class SortTest(unittest.TestCase):
+    def setUp(self):
+        with open("test/marc.dat", "rb") as fh:
+            self.raw = fh.read()
+        self.chunks = list(pymarc.reader.iter_marc_chunks(self.raw))
+
+    def sorted_titles(self, **kwargs):
+        out = BytesIO()
+        pymarc.sort_records(self.raw, out, **kwargs)
+        return [r.title() for r in pymarc.MARCReader(out.getvalue())]
+
+    def test_in_memory(self):
+        titles = self.sorted_titles(key="245a")
+        self.assertEqual(len(titles), len(self.chunks))
+        self.assertEqual(titles, sorted(titles))
+
+    def test_runs_on_disk(self):
+        tmpdir = tempfile.mkdtemp()
+        titles = self.sorted_titles(key="245a", buffer_size=3, tmpdir=tmpdir)
+        self.assertEqual(titles, self.sorted_titles(key="245a"))
+        self.assertEqual(os.listdir(tmpdir), [])
+        os.rmdir(tmpdir)
+
+    def test_merge_passes(self):
+        tmpdir = tempfile.mkdtemp()
+        expected = self.sorted_titles(key="245a")
+        for max_runs in (2, 3):
+            titles = self.sorted_titles(
+                key="245a", buffer_size=2, tmpdir=tmpdir, max_runs=max_runs
+            )
+            self.assertEqual(titles, expected)
+        self.assertEqual(os.listdir(tmpdir), [])
+        os.rmdir(tmpdir)
+        out = BytesIO()
+        pymarc.sort_records(self.raw, out, key=lambda r: "", buffer_size=2, max_runs=2)
+        self.assertEqual(out.getvalue(), self.raw)
+        with self.assertRaises(ValueError):
+            pymarc.sort_records(self.raw, out, max_runs=1)
+
+    def test_reverse(self):
+        titles = self.sorted_titles(key="245a", buffer_size=4, reverse=True)
+        self.assertEqual(titles, sorted(titles, reverse=True))
+
+    def test_stable(self):
+        out = BytesIO()
+        pymarc.sort_records(self.raw, out, key=lambda r: "", buffer_size=2)
+        self.assertEqual(out.getvalue(), self.raw)
+
+    def test_bytes_unchanged(self):
+        out = BytesIO()
+        pymarc.sort_records(self.raw, out, key="001", buffer_size=3)
+        self.assertEqual(
+            sorted(pymarc.reader.iter_marc_chunks(out.getvalue())),
+            sorted(self.chunks),
+        )
+
+    def test_writer(self):
+        out = BytesIO()
+        writer = pymarc.MARCWriter(out)
+        pymarc.sort_records(self.raw, writer, key="001")
+        self.assertEqual(len(out.getvalue()), len(self.raw))
+        self.assertEqual(writer.stats.records, len(self.chunks))
+
+        out = BytesIO()
+        writer = pymarc.XMLWriter(out)
+        pymarc.sort_records(self.raw, writer, key="245a", buffer_size=3)
+        writer.close(close_fh=False)
+        titles = [r.title() for r in pymarc.parse_xml_to_array(BytesIO(out.getvalue()))]
+        self.assertEqual(titles, self.sorted_titles(key="245a"))
+
+    def test_field_key(self):
+        record = next(pymarc.MARCReader(self.chunks[0]))
+        self.assertEqual(field_key("245a")(record), record["245"]["a"])
+        self.assertEqual(field_key("001")(record), record["001"].data)
+        self.assertEqual(field_key("999a")(record), "")
+
+
+def suite():
+    test_suite = unittest.makeSuite(SortTest, "test")
+    return test_suite
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,133 @@
+# This file is part of pymarc. It is subject to the license terms in the
+# LICENSE file found in the top-level directory of this distribution and at
+# https://opensource.org/licenses/BSD-2-Clause. pymarc may be copied, modified,
+# propagated, or distributed according to the terms contained in the LICENSE
+# file.
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from io import BytesIO
+
+import pymarc
+from pymarc.split import join_shards, record_offsets, split_file
+
+
+class SplitTest(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        with open("test/marc.dat", "rb") as fh:
+            self.raw = fh.read()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def template(self, extension):
+        return os.path.join(self.tmpdir, "part-%02d." + extension)
+
+    def test_records(self):
+        paths = split_file("test/marc.dat", self.template("mrc"), records=3)
+        self.assertEqual(len(paths), 7)
+        with open(paths[0], "rb") as fh:
+            self.assertEqual(len(list(pymarc.MARCReader(fh))), 3)
+        with open(paths[1] + ".manifest") as fh:
+            self.assertEqual(fh.readline().split("\t")[0], "3")
+
+    def test_size(self):
+        paths = split_file(BytesIO(self.raw), self.template("mrc"), size=4000)
+        for path in paths:
+            self.assertLessEqual(os.path.getsize(path), 4000)
+        self.assertEqual(sum(os.path.getsize(p) for p in paths), len(self.raw))
+
+    def test_hash_and_join(self):
+        paths = split_file("test/marc.dat", self.template("mrc"), shards=3)
+        self.assertEqual(len(paths), 3)
+        for path in paths:
+            with open(path + ".manifest") as manifest:
+                for line in manifest:
+                    sequence, offset, length = map(int, line.split("\t"))
+        out = BytesIO()
+        self.assertEqual(join_shards(paths, out), 20)
+        self.assertEqual(out.getvalue(), self.raw)
+
+    def test_hash_on_subfield(self):
+        paths = split_file("test/marc.dat", self.template("mrc"), shards=2, key="245a")
+        titles = {}
+        for number, path in enumerate(paths):
+            with open(path, "rb") as fh:
+                for record in pymarc.MARCReader(fh):
+                    titles.setdefault(record["245"]["a"], set()).add(number)
+        self.assertTrue(all(len(shards) == 1 for shards in titles.values()))
+
+    def test_xml(self):
+        paths = split_file(
+            "test/batch.xml", self.template("xml"), format="xml", records=1
+        )
+        self.assertEqual(len(paths), 2)
+        records = pymarc.parse_xml_to_array(paths[1], strict=True)
+        self.assertEqual(len(records), 1)
+        self.assertEqual(records[0].title(), "The White House")
+
+        paths = split_file(
+            "test/batch.xml", self.template("xml"), format="xml", shards=2
+        )
+        out = BytesIO()
+        join_shards(paths, out, format="xml")
+        out.seek(0)
+        joined = pymarc.parse_xml_to_array(out)
+        expected = pymarc.parse_xml_to_array("test/batch.xml")
+        self.assertEqual([r.as_marc() for r in joined], [r.as_marc() for r in expected])
+
+    def test_ndjson(self):
+        with open("test/batch.json") as fh:
+            records = json.load(fh)
+        lines = b"".join(json.dumps(r).encode("utf-8") + b"\n" for r in records)
+        paths = split_file(
+            BytesIO(lines), self.template("ndjson"), format="ndjson", shards=2
+        )
+        out = BytesIO()
+        self.assertEqual(join_shards(paths, out, format="ndjson"), len(records))
+        self.assertEqual(out.getvalue(), lines)
+
+    def test_ndjson_crlf(self):
+        with open("test/batch.json") as fh:
+            records = json.load(fh)
+        lines = [json.dumps(r).encode("utf-8") + b"\r\n" for r in records]
+        lines[-1] = lines[-1].rstrip()
+        source = BytesIO(b"".join(lines))
+        paths = split_file(source, self.template("ndjson"), format="ndjson", records=1)
+        for path in paths:
+            with open(path + ".manifest") as manifest:
+                length = int(manifest.read().split()[2])
+            with open(path, "rb") as fh:
+                self.assertEqual(len(fh.read()), length)
+        out = BytesIO()
+        self.assertEqual(join_shards(paths, out, format="ndjson"), len(records))
+        self.assertEqual(out.getvalue(), b"".join(lines) + b"\n")
+
+    def test_bad_options(self):
+        with self.assertRaises(ValueError):
+            split_file("test/marc.dat", self.template("mrc"))
+        with self.assertRaises(ValueError):
+            split_file("test/marc.dat", self.template("mrc"), records=1, shards=1)
+
+    def test_record_offsets(self):
+        offsets = list(record_offsets(BytesIO(self.raw)))
+        self.assertEqual(len(offsets), 20)
+        key, offset, length = offsets[1]
+        self.assertEqual(key, b"12515882")
+        self.assertEqual(self.raw[offset : offset + length][:5], b"%05d" % length)
+        with open("test/batch.xml", "rb") as fh:
+            keys = [key for key, offset, length in record_offsets(fh, "xml", "245a")]
+        self.assertEqual(keys, [b"The Great Ray Charles", b"The White House"])
+
+
+def suite():
+    test_suite = unittest.makeSuite(SplitTest, "test")
+    return test_suite
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,221 @@
+# This file is part of pymarc. It is subject to the license terms in the
+# LICENSE file found in the top-level directory of this distribution and at
+# https://opensource.org/licenses/BSD-2-Clause. pymarc may be copied, modified,
+# propagated, or distributed according to the terms contained in the LICENSE
+# file.
+
+import logging
+import unittest
+import warnings
+from io import BytesIO, StringIO
+
+import pymarc
+from pymarc.stats import (
+    READER_PHASES,
+    WRITER_PHASES,
+    Anomalies,
+    LoggingHook,
+    Stats,
+)
+
+
+class StatsTest(unittest.TestCase):
+    def test_reader_counts(self):
+        with open("test/marc.dat", "rb") as fh:
+            size = len(fh.read())
+            fh.seek(0)
+            reader = pymarc.MARCReader(fh)
+            records = list(reader)
+        self.assertEqual(reader.stats.records, len(records))
+        self.assertEqual(reader.stats.bytes, size)
+        self.assertEqual(reader.stats.errors, {})
+        self.assertEqual(reader.stats.times, {})
+
+    def test_reader_errors(self):
+        with open("test/bad_records.mrc", "rb") as fh:
+            reader = pymarc.MARCReader(fh, permissive=True)
+            with self.assertRaises(pymarc.RecordLengthInvalid):
+                for record in reader:
+                    pass
+        self.assertEqual(reader.stats.records, 2)
+        self.assertEqual(reader.stats.errors["RecordDirectoryInvalid"], 1)
+        self.assertEqual(reader.stats.errors["RecordLengthInvalid"], 1)
+        self.assertEqual(sum(reader.stats.errors.values()), 7)
+
+    def test_reader_warnings(self):
+        with open("test/bad_subfield_code.dat", "rb") as fh:
+            reader = pymarc.MARCReader(fh)
+            with warnings.catch_warnings():
+                warnings.simplefilter("error")
+                next(reader)
+        self.assertEqual(reader.stats.warnings["bad subfield code"], 1)
+        self.assertEqual(reader.stats.warnings["more than 2 indicators"], 6)
+        with open("test/bad_indicator.dat", "rb") as fh:
+            reader = pymarc.MARCReader(fh)
+            next(reader)
+        self.assertEqual(dict(reader.stats.warnings), {"missing indicators": 1})
+
+    def test_anomalies(self):
+        with open("test/bad_subfield_code.dat", "rb") as fh:
+            raw = pymarc.read_marc_chunk(fh)
+        reader = pymarc.MARCReader(raw * 3)
+        list(reader)
+        anomalies = reader.stats.anomalies
+        self.assertEqual(len(anomalies), 21)
+        self.assertEqual(anomalies.counts["bad subfield code", "245"], 3)
+        self.assertEqual(anomalies.by_tag()["245"], 3)
+        self.assertEqual(
+            anomalies.samples,
+            {
+                "bad subfield code": [0, len(raw), 2 * len(raw)],
+                "more than 2 indicators": [0, len(raw), 2 * len(raw)],
+            },
+        )
+        self.assertEqual(anomalies.by_kind()["more than 2 indicators"], 18)
+        self.assertEqual(
+            anomalies.as_dict()["counts"]["more than 2 indicators"]["650"], 3
+        )
+
+        stats = Stats(anomalies=Anomalies(samples=2))
+        list(pymarc.MARCReader(raw * 3, stats=stats))
+        self.assertEqual(stats.anomalies.samples["bad subfield code"], [0, len(raw)])
+
+    def test_anomalies_log(self):
+        with open("test/bad_indicator.dat", "rb") as fh:
+            reader = pymarc.MARCReader(fh, stats=Stats(anomalies=Anomalies(log=True)))
+            with self.assertLogs(level=logging.WARNING) as logs:
+                next(reader)
+        self.assertEqual(len(logs.output), 1)
+        self.assertTrue(logs.output[0].startswith("WARNING:root:missing indicators"))
+        self.assertEqual(reader.stats.warnings["missing indicators"], 1)
+
+        with open("test/bad_subfield_code.dat", "rb") as fh:
+            raw = fh.read()
+            with self.assertWarns(pymarc.BadSubfieldCodeWarning):
+                next(pymarc.MARCReader(raw, stats=Stats(anomalies=Anomalies(log=True))))
+            # without a reader the anomalies are logged
+            with self.assertWarns(pymarc.BadSubfieldCodeWarning):
+                pymarc.Record(raw)
+
+    def test_timing(self):
+        stats = Stats(timing=True)
+        with open("test/marc.dat", "rb") as fh:
+            reader = pymarc.MARCReader(fh, stats=stats)
+            records = list(reader)
+        self.assertEqual(sorted(stats.times), sorted(READER_PHASES))
+        self.assertTrue(all(seconds >= 0 for seconds in stats.times.values()))
+
+        stats = Stats(timing=True)
+        writer = pymarc.MARCWriter(BytesIO(), stats=stats)
+        for record in records:
+            writer.write(record)
+        self.assertEqual(sorted(stats.times), sorted(WRITER_PHASES))
+
+    def test_shared_stats(self):
+        stats = Stats()
+        for i in range(2):
+            with open("test/marc.dat", "rb") as fh:
+                list(pymarc.MARCReader(fh, stats=stats))
+        self.assertEqual(stats.records, 40)
+
+    def test_update(self):
+        events = []
+        stats = Stats(hooks=[lambda *event: events.append(event)])
+        other = Stats()
+        with open("test/bad_indicator.dat", "rb") as fh:
+            reader = pymarc.MARCReader(fh, stats=other)
+            next(reader)
+        other.count_error(pymarc.RecordLengthInvalid())
+        stats.update(other)
+        stats.update(other)
+        self.assertEqual(stats.records, 2)
+        self.assertEqual(stats.bytes, 2318)
+        self.assertEqual(stats.errors, {"RecordLengthInvalid": 2})
+        self.assertEqual(stats.warnings, {"missing indicators": 2})
+        self.assertEqual(stats.anomalies.samples, {"missing indicators": [0, 0]})
+        self.assertEqual(
+            events[:4],
+            [
+                ("records", 1, None),
+                ("bytes", 1159, None),
+                ("errors", 1, "RecordLengthInvalid"),
+                ("warnings", 1, "missing indicators"),
+            ],
+        )
+
+    def test_writers(self):
+        with open("test/marc.dat", "rb") as fh:
+            records = list(pymarc.MARCReader(fh))
+        for writer_class, out in (
+            (pymarc.MARCWriter, BytesIO()),
+            (pymarc.XMLWriter, BytesIO()),
+            (pymarc.JSONWriter, StringIO()),
+            (pymarc.TextWriter, StringIO()),
+        ):
+            writer = writer_class(out)
+            header = len(out.getvalue())
+            for record in records:
+                writer.write(record)
+            data = out.getvalue()
+            if isinstance(data, str):
+                data = data.encode("utf-8")
+                header = len(out.getvalue()[:header].encode("utf-8"))
+            self.assertEqual(writer.stats.records, 20)
+            self.assertEqual(writer.stats.bytes, len(data) - header)
+            writer.close(close_fh=False)
+
+    def test_hooks(self):
+        events = []
+        stats = Stats(hooks=[lambda *event: events.append(event)])
+        with open("test/bad_indicator.dat", "rb") as fh:
+            reader = pymarc.MARCReader(fh, stats=stats)
+            next(reader)
+        self.assertEqual(
+            events,
+            [
+                ("bytes", 1159, None),
+                ("warnings", 1, "missing indicators"),
+                ("records", 1, None),
+            ],
+        )
+
+    def test_logging_hook(self):
+        stats = Stats(hooks=[LoggingHook(events=["records", "errors"])])
+        with self.assertLogs("pymarc", logging.DEBUG) as logs:
+            stats.count_bytes(10)
+            stats.count_record()
+            stats.count_error(pymarc.RecordLengthInvalid())
+        self.assertEqual(
+            logs.output,
+            [
+                "DEBUG:pymarc:records: 1",
+                "DEBUG:pymarc:errors: 1 (RecordLengthInvalid)",
+            ],
+        )
+
+    def test_as_dict(self):
+        stats = Stats()
+        stats.count_warning("missing indicators")
+        self.assertEqual(
+            stats.as_dict(),
+            {
+                "records": 0,
+                "bytes": 0,
+                "errors": {},
+                "warnings": {"missing indicators": 1},
+                "anomalies": {
+                    "counts": {"missing indicators": {None: 1}},
+                    "samples": {},
+                },
+                "times": {},
+            },
+        )
+
+
+def suite():
+    test_suite = unittest.makeSuite(StatsTest, "test")
+    return test_suite
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,111 @@
+# This file is part of pymarc. It is subject to the license terms in the
+# LICENSE file found in the top-level directory of this distribution and at
+# https://opensource.org/licenses/BSD-2-Clause. pymarc may be copied, modified,
+# propagated, or distributed according to the terms contained in the LICENSE
+# file.
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import pymarc
+from pymarc import validate
+from pymarc.validate import validate_file, validate_record
+
+
+class ValidateTest(unittest.TestCase):
+    def setUp(self):
+        with open("test/marc.dat", "rb") as fh:
+            self.raw = fh.read()
+        self.chunks = list(pymarc.iter_marc_chunks(self.raw))
+
+    def codes(self, data):
+        return [problem.code for problem in validate_record(data)]
+
+    def test_valid(self):
+        for chunk in self.chunks:
+            self.assertEqual(validate_record(chunk), [])
+        report = validate_file(self.raw)
+        self.assertEqual((report.records, report.invalid), (20, 0))
+
+    def test_leader(self):
+        chunk = self.chunks[0]
+        self.assertEqual(self.codes(b"x" + chunk[1:]), [validate.LENGTH_NOT_NUMERIC])
+        self.assertEqual(self.codes(b"01061" + chunk[5:]), [validate.LENGTH_MISMATCH])
+        self.assertEqual(
+            self.codes(chunk[:12] + b"0000x" + chunk[17:]),
+            [validate.BASE_ADDRESS_NOT_NUMERIC],
+        )
+        self.assertEqual(
+            self.codes(chunk[:12] + b"99999" + chunk[17:]),
+            [validate.BASE_ADDRESS_INVALID],
+        )
+        self.assertEqual(self.codes(chunk[:20] + b"\x1d"), [validate.RECORD_TOO_SHORT])
+
+    def test_directory(self):
+        chunk = self.chunks[0]
+        base_address = int(chunk[12:17])
+        # an entry whose length is not a number
+        problems = validate_record(chunk[:27] + b"x" + chunk[28:])
+        self.assertEqual(problems[0].code, validate.DIRECTORY_ENTRY_INVALID)
+        self.assertEqual(problems[0].tag, chunk[24:27].decode("ascii"))
+        # the directory terminator replaced
+        broken = bytearray(chunk)
+        broken[base_address - 1] = ord("x")
+        self.assertIn(validate.DIRECTORY_NOT_TERMINATED, self.codes(bytes(broken)))
+
+    def test_fields(self):
+        chunk = self.chunks[0]
+        # the first field, 001, made one byte longer
+        length = int(chunk[27:31])
+        longer = chunk[:27] + b"%04d" % (length + 1) + chunk[31:]
+        self.assertEqual(self.codes(longer), [validate.FIELD_NOT_TERMINATED])
+        # the second field pointing at the first one
+        overlapping = chunk[:39] + chunk[27:36] + chunk[48:]
+        problems = validate_record(overlapping)
+        self.assertEqual([p.code for p in problems], [validate.FIELD_OVERLAP])
+        self.assertEqual(problems[0].tag, chunk[36:39].decode("ascii"))
+        # the last field past the end of the record
+        entry = len(chunk[: int(chunk[12:17])]) - 13
+        past = chunk[: entry + 7] + b"99999" + chunk[entry + 12 :]
+        self.assertEqual(self.codes(past), [validate.FIELD_OUT_OF_BOUNDS])
+
+    def test_framing(self):
+        # a wrong length doesn't hide the following records
+        data = b"".join(self.chunks[:2])
+        data = b"01061" + data[5:]
+        report = validate_file(data)
+        self.assertEqual(report.records, 2)
+        self.assertEqual(report.invalid, 1)
+        self.assertEqual(report.problems[0].offset, 0)
+
+        report = validate_file(self.raw[:-1] + b"\n")
+        self.assertEqual(report.counts()[validate.RECORD_NOT_TERMINATED], 1)
+        self.assertEqual(report.problems[0].offset, self.raw.rfind(b"\x1d", 0, -1) + 1)
+        report = validate_file(self.raw + b"\r\n")
+        self.assertEqual(report.invalid, 0)
+        self.assertEqual(report.counts(), {validate.TRAILING_DATA: 1})
+
+    def test_file_shards(self):
+        tmpdir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(tmpdir, "bad.mrc")
+            shutil.copy("test/bad_records.mrc", path)
+            expected = validate_file(path).as_dict()
+            self.assertEqual(expected["records"], 8)
+            self.assertEqual(expected["invalid"], 6)
+            for workers, shard_size in ((1, 100), (2, 127), (3, 1)):
+                report = validate_file(path, workers=workers, shard_size=shard_size)
+                self.assertEqual(report.as_dict(), expected)
+        finally:
+            shutil.rmtree(tmpdir)
+
+
+def suite():
+    test_suite = unittest.makeSuite(ValidateTest, "test")
+    return test_suite
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -222,6 +222,26 @@ class JSONWriterTest(unittest.TestCase):
         finally:
             file_handle.close()
 
+    def test_ensure_ascii(self):
+        record = pymarc.Record()
+        record.add_field(pymarc.Field("245", ["0", "0"], ["a", "Café 中文 \ud800"]))
+        with open("test/utf8_with_leader_flag.dat", "rb") as fh:
+            records = list(pymarc.MARCReader(fh)) + [record]
+        for ensure_ascii in (True, False):
+            file_handle = StringIO()
+            writer = pymarc.JSONWriter(file_handle, ensure_ascii=ensure_ascii)
+            for record in records:
+                writer.write(record)
+            writer.close(close_fh=False)
+            self.assertEqual(
+                file_handle.getvalue(),
+                json.dumps(
+                    [record.as_dict() for record in records],
+                    separators=(",", ":"),
+                    ensure_ascii=ensure_ascii,
+                ),
+            )
+
 
 class MARCWriterTest(unittest.TestCase):
     def test_write(self):
@@ -8,6 +8,35 @@ import pymarc
 import unittest
 
 from io import BytesIO
+from pymarc.marcxml import XmlHandler, parse_xml
+from xml.parsers.expat import ExpatError
+
+try:
+    import lxml  # noqa: F401
+
+    HAVE_LXML = True
+except ImportError:
+    HAVE_LXML = False
+
+XML_FILES = ("test/batch.xml", "test/utf8.xml", "test/bad_tag.xml")
+
+
+def records_by_sax(xml_file, strict=False, normalize_form=None):
+    handler = XmlHandler(strict, normalize_form)
+    parse_xml(xml_file, handler)
+    return handler.records
+
+
+def field_values(record):
+    return [
+        (
+            field.tag,
+            getattr(field, "data", None),
+            getattr(field, "indicators", None),
+            getattr(field, "subfields", None),
+        )
+        for field in record.fields
+    ]
 
 
 class XmlTest(unittest.TestCase):
@@ -106,6 +135,201 @@ class XmlTest(unittest.TestCase):
         a = pymarc.parse_xml_to_array(open("test/bad_tag.xml"))
         self.assertEqual(len(a), 1)
 
+    def test_fragment_reader(self):
+        with open("test/batch.xml", "rb") as fh:
+            raw = fh.read()
+        fragments = pymarc.XmlFragmentReader(BytesIO(raw), block_size=64)
+        found = list(fragments)
+        self.assertEqual(len(found), 2)
+        self.assertEqual(fragments.header, raw[: found[0][0]])
+        self.assertEqual(fragments.footer, b"</marc:collection>")
+        for offset, fragment in found:
+            self.assertTrue(fragment.startswith(b"<marc:record>"))
+            self.assertEqual(raw[offset : offset + len(fragment)], fragment)
+        doc = fragments.header + found[1][1] + fragments.footer
+        records = pymarc.parse_xml_to_array(BytesIO(doc), strict=True)
+        self.assertEqual(records[0].title(), "The White House")
+
+    def test_fragment_reader_lone_record(self):
+        doc = b'<?xml version="1.0"?><record><leader>%s</leader></record>' % (
+            b" " * 24
+        )
+        fragments = pymarc.XmlFragmentReader(BytesIO(doc))
+        ((offset, fragment),) = list(fragments)
+        self.assertEqual(offset, 21)
+        wrapped = fragments.header + fragment + fragments.footer
+        self.assertEqual(len(pymarc.parse_xml_to_array(BytesIO(wrapped))), 1)
+
+    def test_fragment_reader_markup(self):
+        records = [
+            b"<m:record><m:leader>%s</m:leader></m:record>" % (b" " * 24),
+            b'<record xmlns="%s" type="a>b"/>' % pymarc.marcxml.MARC_XML_NS.encode(),
+            b"<m:record><!-- </m:record> --><m:leader><![CDATA[ <record> ]]>"
+            b"</m:leader><x:record><m:record/></x:record></m:record >",
+        ]
+        header = (
+            b'<?xml version="1.0"?><!DOCTYPE m:collection [<!-- <record> -->]>'
+            b'<m:collection xmlns:m="%s"><?pi <record>?><!-- <m:record> -->'
+            % pymarc.marcxml.MARC_XML_NS.encode()
+        )
+        doc = header + b"\n".join(records) + b"<!-- </m:record> --></m:collection>"
+        for block_size in (1, 7, 1 << 20):
+            fragments = pymarc.XmlFragmentReader(BytesIO(doc), block_size=block_size)
+            found = list(fragments)
+            self.assertEqual([fragment for offset, fragment in found], records)
+            for offset, fragment in found:
+                self.assertEqual(doc[offset : offset + len(fragment)], fragment)
+            self.assertEqual(fragments.header, header)
+            self.assertEqual(fragments.footer, b"</m:collection>")
+        wrapped = fragments.header + records[1] + fragments.footer
+        self.assertEqual(len(pymarc.parse_xml_to_array(BytesIO(wrapped))), 1)
+        # the elements the records are in are all closed
+        fragments = pymarc.XmlFragmentReader(BytesIO(b"<a><b>%s</b></a>" % records[0]))
+        self.assertEqual(len(list(fragments)), 1)
+        self.assertEqual(fragments.footer, b"</b></a>")
+
+    def test_fragment_reader_truncated(self):
+        with open("test/batch.xml", "rb") as fh:
+            raw = fh.read()
+        # cut inside the second record
+        raw = raw[: raw.rindex(b"</marc:record>")]
+        fragments = pymarc.XmlFragmentReader(BytesIO(raw), block_size=64)
+        next(fragments)
+        self.assertRaises(ExpatError, next, fragments)
+        self.assertRaises(
+            ExpatError, pymarc.parse_xml_to_array, BytesIO(raw), backend="stdlib"
+        )
+        with self.assertRaises(ExpatError):
+            list(pymarc.parse_xml_parallel(BytesIO(raw), workers=1))
+
+    def test_parse_xml_parallel(self):
+        with open("test/batch.xml", "rb") as fh:
+            raw = fh.read()
+        # a record of another namespace, only kept when not strict
+        other = b"<other:record xmlns:other='x'/>"
+        raw = raw.replace(b"<marc:record>", other + b"<marc:record>", 1)
+        for strict, normalize_form in ((False, None), (True, "NFD")):
+            expected = [
+                record.as_marc()
+                for record in pymarc.parse_xml_to_array(
+                    BytesIO(raw), strict, normalize_form
+                )
+            ]
+            for workers, batch_size in ((1, 1 << 20), (2, 1), (2, 2000)):
+                records = pymarc.parse_xml_parallel(
+                    BytesIO(raw),
+                    workers,
+                    strict,
+                    normalize_form,
+                    batch_size=batch_size,
+                    block_size=64,
+                )
+                self.assertEqual([record.as_marc() for record in records], expected)
+            self.assertEqual(len(expected), 2 if strict else 3)
+
+    def test_parse_xml_parallel_path(self):
+        records = list(pymarc.parse_xml_parallel("test/utf8.xml", workers=2))
+        self.assertEqual(len(records), 1)
+        self.assertEqual(
+            records[0].as_marc(),
+            pymarc.parse_xml_to_array("test/utf8.xml")[0].as_marc(),
+        )
+
+    def assertSameRecords(self, records, expected):
+        self.assertEqual(len(records), len(expected))
+        for record, other in zip(records, expected):
+            self.assertEqual(str(record.leader), str(other.leader))
+            self.assertEqual(record.as_marc(), other.as_marc())
+
+    def test_xml_backend(self):
+        self.assertIn(pymarc.xml_backend().name, pymarc.XML_BACKENDS)
+        self.assertEqual(pymarc.xml_backend("stdlib").name, "stdlib")
+        self.assertRaises(ValueError, pymarc.xml_backend, "sax")
+        try:
+            pymarc.set_xml_backend("stdlib")
+            self.assertEqual(pymarc.xml_backend().name, "stdlib")
+            self.assertEqual(pymarc.XMLWriter(BytesIO()).backend.name, "stdlib")
+        finally:
+            pymarc.set_xml_backend(None)
+
+    def test_stdlib_backend(self):
+        for xml_file in XML_FILES:
+            for strict in (False, True):
+                for normalize_form in (None, "NFD"):
+                    self.assertSameRecords(
+                        pymarc.parse_xml_to_array(
+                            xml_file, strict, normalize_form, backend="stdlib"
+                        ),
+                        records_by_sax(xml_file, strict, normalize_form),
+                    )
+        with open("test/batch.xml") as fh:
+            records = pymarc.parse_xml_to_array(fh, backend="stdlib")
+        self.assertSameRecords(records, records_by_sax("test/batch.xml"))
+
+        records = []
+        pymarc.map_xml(records.append, "test/batch.xml", backend="stdlib")
+        self.assertEqual(len(records), 2)
+
+    @unittest.skipUnless(HAVE_LXML, "lxml is not installed")
+    def test_lxml_backend_read(self):
+        for xml_file in XML_FILES:
+            for strict in (False, True):
+                for normalize_form in (None, "NFD"):
+                    self.assertSameRecords(
+                        pymarc.parse_xml_to_array(
+                            xml_file, strict, normalize_form, backend="lxml"
+                        ),
+                        records_by_sax(xml_file, strict, normalize_form),
+                    )
+        with open("test/batch.xml") as fh:
+            records = pymarc.parse_xml_to_array(fh, backend="lxml")
+        self.assertSameRecords(records, records_by_sax("test/batch.xml"))
+
+    def test_backends_control_fields(self):
+        xml = (
+            b'<collection xmlns="http://www.loc.gov/MARC21/slim"><record>'
+            b"<leader>00000cam  2200000 a 4500</leader>"
+            b'<controlfield tag="001">123</controlfield>'
+            b'<controlfield tag="FMT">BK</controlfield>'
+            b'<datafield tag="245" ind1="1" ind2="0">'
+            b'<subfield code="a">Title</subfield></datafield>'
+            b"</record></collection>"
+        )
+        expected = field_values(records_by_sax(BytesIO(xml))[0])
+        self.assertEqual(expected[1], ("FMT", "BK", [], []))
+        for backend in ("stdlib", "lxml") if HAVE_LXML else ("stdlib",):
+            records = pymarc.parse_xml_to_array(BytesIO(xml), backend=backend)
+            self.assertEqual(field_values(records[0]), expected, backend)
+
+    @unittest.skipUnless(HAVE_LXML, "lxml is not installed")
+    def test_lxml_backend_write(self):
+        with open("test/marc.dat", "rb") as fh:
+            records = list(pymarc.MARCReader(fh))
+        record = pymarc.Record()
+        record.add_field(
+            pymarc.Field("001", data="a\r\nb"),
+            pymarc.Field("245", ["\t", " "], ["a", "", "b", "<&>\"'", "c", "\x01"]),
+        )
+        records.append(record)
+        for record in records:
+            for namespace in (False, True):
+                self.assertEqual(
+                    pymarc.record_to_xml(record, namespace=namespace, backend="lxml"),
+                    pymarc.record_to_xml(record, namespace=namespace, backend="stdlib"),
+                )
+        node = pymarc.record_to_xml_node(records[0], backend="lxml")
+        self.assertEqual(node.tag, "record")
+
+        outputs = []
+        for backend in ("lxml", "stdlib"):
+            out = BytesIO()
+            writer = pymarc.XMLWriter(out, backend=backend)
+            for record in records:
+                writer.write(record)
+            writer.close(close_fh=False)
+            outputs.append(out.getvalue())
+        self.assertEqual(outputs[0], outputs[1])
+
 
 def suite():
     test_suite = unittest.makeSuite(XmlTest, "test")